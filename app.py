@@ -1,27 +1,65 @@
 # app.py (Final version with all 5 objectives, including AST Navigator)
 
 import streamlit as st
-import google.generativeai as genai
 import os
+import uuid
 from dotenv import load_dotenv
 
 # Import all the feature modules for your project
-from code_summarizer.summarizer import summarize_large_code
-from code_summarizer.search import semantic_code_search
-from code_summarizer.graph_generator import build_dependency_graph_from_code
-from code_summarizer.completer import complete_code_ai
+from code_summarizer.engine import Engine
+from code_summarizer.progress import ProgressReporter
+from code_summarizer.graph_generator import build_dependency_graph, render_graph, MAX_RENDERED_NODES
 # IMPORTANT: Importing your new AST-based navigation functions
-from code_summarizer.navigator import extract_functions_and_calls, build_call_graph, graph_to_dot
+from code_summarizer.navigator import functions_and_calls, parse_source
+from code_summarizer.cache import get_response_cache
+from code_summarizer.llm import cache_model_name
+from code_summarizer.scheduler import get_scheduler
+from code_summarizer.repository import index_repository
+from code_summarizer.project_index import get_project_index
+from code_summarizer.summarizer import summarize_chunk, map_concurrently
+from code_summarizer.callgraph import CallGraph
+from code_summarizer.dedup import find_duplicates
+from code_summarizer.tracing import trace
 
 # --- Page Configuration and Setup ---
 st.set_page_config(page_title="AI Code Navigator", page_icon="🧭", layout="wide")
 load_dotenv()
 
 # --- Gemini Configuration ---
+# The engine (and its Gemini client) is created once per server process, not on every rerun.
+@st.cache_resource
+def get_engine():
+    return Engine()
+
+class StreamlitProgress(ProgressReporter):
+    """Shows engine progress as st.info messages and a progress bar."""
+
+    def __init__(self):
+        self.progress_bar = None
+
+    def info(self, message):
+        st.info(message)
+
+    def update(self, fraction, message):
+        if self.progress_bar is None:
+            self.progress_bar = st.progress(0, text=message)
+        self.progress_bar.progress(fraction, text=message)
+
+    def done(self):
+        if self.progress_bar is not None:
+            self.progress_bar.empty()
+            self.progress_bar = None
+
+def start_trace(mode):
+    """Records the stages of one run for the diagnostics panel at the bottom of the page."""
+    run_trace = trace(mode, profile=st.session_state.get("profile_next_run", False))
+    st.session_state.last_trace = run_trace.trace
+    return run_trace
+
 try:
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-except (TypeError, AttributeError):
-    st.error("GEMINI_API_KEY not found. Please create a .env file and add your key.")
+    engine = get_engine()
+except ValueError as e:
+    st.error(str(e))
     st.stop()
 
 # --- Main UI ---
@@ -31,28 +69,69 @@ st.markdown("Select a feature below to begin analyzing your code.")
 if "mode" not in st.session_state:
     st.session_state.mode = None
 
-# --- Feature Selection Buttons for all 5 objectives ---
-cols = st.columns(5)
+# --- Feature Selection Buttons for all 5 objectives, plus whole-repository analysis ---
+cols = st.columns(6)
 if cols[0].button("📝 Code Summary", use_container_width=True): st.session_state.mode = "summarize"
 if cols[1].button("🔍 Semantic Search", use_container_width=True): st.session_state.mode = "search"
 if cols[2].button("📈 Dependency Graph", use_container_width=True): st.session_state.mode = "graph"
 if cols[3].button("✍ Auto-Completion", use_container_width=True): st.session_state.mode = "complete"
 if cols[4].button("🧭 Navigation", use_container_width=True): st.session_state.mode = "navigate" # <-- YOUR NAVIGATION BUTTON
+if cols[5].button("🗂 Repository", use_container_width=True): st.session_state.mode = "repository"
 
 st.markdown("---") # Visual separator
 
+# --- LLM Response Cache Stats ---
+with st.sidebar:
+    st.markdown("### LLM Response Cache")
+    cache_stats = get_response_cache().stats()
+    st.caption(f"Hits: {cache_stats['hits']} · Misses: {cache_stats['misses']} · "
+               f"Stored: {cache_stats['disk_entries']} responses ({cache_stats['disk_bytes'] // 1024} KB)")
+    if st.button("Clear cache", key="clear_cache_btn"):
+        get_response_cache().clear()
+    scheduler_stats = get_scheduler().stats
+    st.caption(f"Model requests: {scheduler_stats['calls']} · Retries: {scheduler_stats['retries']} · "
+               f"Failures: {scheduler_stats['failures']}")
+    st.checkbox("Profile runs with cProfile", key="profile_next_run")
+
 # --- Render UI based on the selected mode ---
 
 # --- SUMMARIZE MODE ---
 if st.session_state.mode == "summarize":
     st.subheader("Code Summarization")
     code_to_summarize = st.text_area("Paste code to summarize:", height=300, key="summarize_input")
+    per_definition = st.checkbox("Summarize per definition (unchanged functions and classes are reused)",
+                                 key="summarize_tree")
     if st.button("Generate Summary", key="summarize_btn"):
-        if code_to_summarize:
-            with st.spinner("AI is analyzing and summarizing..."):
-                summary = summarize_large_code(code_to_summarize)
+        if code_to_summarize and per_definition:
+            with start_trace("summarize"), st.spinner("AI is summarizing each definition..."):
+                try:
+                    st.session_state.summary_root = engine.summary_tree(code_to_summarize, progress=StreamlitProgress())
+                except SyntaxError as e:
+                    st.error(f"Syntax Error: per-definition summaries need valid Python code.\n\nDetails: {e}")
+        elif code_to_summarize:
+            st.session_state.summary_root = None
+            with start_trace("summarize"), st.spinner("AI is analyzing and summarizing..."):
                 st.markdown("### Generated Summary")
-                st.markdown(summary, unsafe_allow_html=True)
+                st.write_stream(engine.stream_summarize(code_to_summarize, progress=StreamlitProgress()))
+
+    summary_root = st.session_state.get("summary_root")
+    if per_definition and summary_root is not None:
+        st.markdown("### Generated Summary")
+        st.markdown(summary_root.summary)
+        for node in summary_root.children:
+            with st.expander(f"{node.kind.replace('_', ' ').title()}: {node.name} (Lines {node.lineno}-{node.end_lineno})"):
+                st.markdown(node.summary)
+                for member in node.children:
+                    st.markdown(f"**{member.name}**: {member.summary}")
+
+        st.markdown("### Ask About a Definition")
+        node_names = [node.name for node in summary_root.walk()]
+        asked_name = st.selectbox("Definition:", node_names, key="summary_ask_node")
+        question = st.text_input("Question:", placeholder="e.g., What does this class do with failed requests?",
+                                 key="summary_ask_question")
+        if st.button("Ask", key="summary_ask_btn") and question:
+            with start_trace("summarize"), st.spinner("Answering from the stored summaries..."):
+                st.write_stream(engine.stream_ask(summary_root.find(asked_name), question))
 
 # --- SEARCH MODE ---
 elif st.session_state.mode == "search":
@@ -61,23 +140,32 @@ elif st.session_state.mode == "search":
     search_query = st.text_input("Ask a question about the code:", placeholder="e.g., What is the purpose of the 'is_prime' function?", key="search_query")
     if st.button("Search Code", key="search_btn"):
         if code_to_search and search_query:
-            with st.spinner("Searching for the answer..."):
-                result = semantic_code_search(code_to_search, search_query)
+            with start_trace("search"), st.spinner("Searching for the answer..."):
                 st.markdown("### Answer")
-                st.markdown(result, unsafe_allow_html=True)
+                st.write_stream(engine.stream_search(code_to_search, search_query))
 
 # --- GRAPH MODE (using matplotlib) ---
 elif st.session_state.mode == "graph":
     st.subheader("Code Dependency Graph")
     code_to_graph = st.text_area("Paste code to generate a graph from:", height=300, key="graph_input")
+    graph_cols = st.columns(3)
+    max_nodes = graph_cols[0].number_input("Max nodes to draw", min_value=10, max_value=10000, value=MAX_RENDERED_NODES, key="graph_max_nodes")
+    focus_node = graph_cols[1].text_input("Focus on (optional):", placeholder="function or class name", key="graph_focus")
+    focus_radius = graph_cols[2].number_input("Neighbourhood radius", min_value=1, max_value=10, value=2, key="graph_radius")
     if st.button("Generate Graph", key="graph_btn"):
         if code_to_graph:
-            with st.spinner("Analyzing code and building graph..."):
+            with start_trace("graph"), st.spinner("Analyzing code and building graph..."):
+                focus = focus_node.strip() or None
                 try:
-                    graph_fig = build_dependency_graph_from_code(code_to_graph)
-                    st.pyplot(graph_fig)
-                except Exception as e:
+                    dependency_graph = build_dependency_graph(code_to_graph)
+                except (SyntaxError, ValueError) as e:
                     st.error(f"Could not parse the code to build the graph: {e}")
+                else:
+                    if focus and focus not in dependency_graph:
+                        st.warning(f"No function or class named '{focus}' was found in the code.")
+                    else:
+                        st.pyplot(render_graph(dependency_graph, max_nodes=int(max_nodes),
+                                               focus=focus, radius=int(focus_radius)))
 
 # --- AUTO-COMPLETION MODE ---
 elif st.session_state.mode == "complete":
@@ -85,34 +173,98 @@ elif st.session_state.mode == "complete":
     incomplete_code = st.text_area("Paste your incomplete code here:", height=300, key="complete_input", placeholder="def fibonacci(n):")
     if st.button("Complete Code", key="complete_btn"):
         if incomplete_code:
-            with st.spinner("AI is completing your code..."):
-                completed_code = complete_code_ai(incomplete_code)
+            with start_trace("complete"), st.spinner("AI is completing your code..."):
                 st.markdown("### AI-Completed Code")
-                st.code(completed_code, language='python')
+                code_placeholder = st.empty()
+                completed_code = ""
+                for piece in engine.stream_complete(incomplete_code):
+                    completed_code += piece
+                    code_placeholder.code(completed_code, language='python')
 
 # --- NAVIGATION (AST-BASED) MODE ---
 elif st.session_state.mode == "navigate":
     st.subheader("Code Navigation (AST Analysis)")
+    if "navigate_session" not in st.session_state:
+        st.session_state.navigate_session = uuid.uuid4().hex
     code_to_navigate = st.text_area("Paste your COMPLETE code to navigate:", height=300, key="navigate_input")
+    navigate_file = st.text_input("File name (used to track changes between analyses):", value="pasted_code.py", key="navigate_file")
+    summarize_functions = st.checkbox("Summarize each function with AI (only changed functions are re-sent)", key="navigate_summaries")
+    query_cols = st.columns(2)
+    focus_function = query_cols[0].text_input("Focus on function (optional):", placeholder="e.g., main", key="navigate_focus")
+    focus_hops = query_cols[1].number_input("Hops around the focus function", min_value=1, max_value=10, value=1, key="navigate_hops")
     if st.button("Analyze and Navigate", key="navigate_btn"):
         if code_to_navigate:
-            with st.spinner("Parsing code and building navigation map..."):
+            with start_trace("navigate"), st.spinner("Parsing code and building navigation map..."):
                 try:
-                    functions, calls = extract_functions_and_calls(code_to_navigate)
+                    # Code with syntax errors still gets a map when Tree-sitter is available.
+                    # Pasted files are tracked per session, so sessions never overwrite each other.
+                    session_file = f"sessions/{st.session_state.navigate_session}/{navigate_file}"
+                    index = parse_source(code_to_navigate, path=session_file)
+                    if index.partial:
+                        st.info("The code has syntax errors; showing the definitions that could be recovered.")
+                    functions, _ = functions_and_calls(index)
+                    project_index = get_project_index()
+                    diff = project_index.update(session_file, code_to_navigate, index=index)
+                    # Only the edges of added and changed definitions were recomputed by update().
+                    calls = diff.calls
+                    st.caption(f"Since the last analysis of `{navigate_file}`: {len(diff.added)} added, "
+                               f"{len(diff.changed)} changed, {len(diff.removed)} removed, {len(diff.unchanged)} unchanged definitions.")
+                    summaries = {}
+                    if summarize_functions and functions:
+                        summaries = project_index.summarize_definitions(
+                            session_file, code_to_navigate,
+                            lambda code: summarize_chunk(code, is_partial=True, model_name=engine.model_name),
+                            cache_model_name(engine.model_name),
+                            kinds=("function", "async_function", "method", "async_method"),
+                            map_func=map_concurrently,
+                            index=index,
+                        )
                     
                     if not functions:
                         st.warning("No functions were found in the provided code.")
                     else:
                         st.markdown("### Functions Found")
+                        # Mark edited functions, unless this is the first analysis of the file.
+                        dirty = set(diff.dirty) if diff.changed or diff.unchanged or diff.removed else set()
                         for func in functions:
-                            with st.expander(f"Function: {func['name']} (Lines {func['lineno']}-{func['end_lineno']})"):
+                            marker = " ✏️" if func.qualname in dirty else ""
+                            with st.expander(f"Function: {func['name']} (Lines {func['lineno']}-{func['end_lineno']}){marker}"):
+                                if func.qualname in summaries:
+                                    st.markdown(summaries[func.qualname])
                                 st.code(func['code'], language="python")
 
                         st.markdown("---")
                         st.markdown("### Call Graph")
-                        call_graph = build_call_graph(calls)
-                        dot_graph = graph_to_dot(call_graph)
-                        st.graphviz_chart(dot_graph)
+                        call_graph = CallGraph.from_calls(calls)
+                        focus = focus_function.strip()
+                        if focus and focus not in call_graph.ids:
+                            st.warning(f"No function named '{focus}' was found; showing the whole graph.")
+                            focus = ""
+                        if focus:
+                            shown = call_graph.neighborhood(focus, k=int(focus_hops))
+                            st.graphviz_chart(call_graph.to_dot(shown))
+                            st.write(f"- **{focus}** is called (directly or indirectly) by: {', '.join(call_graph.transitive_callers(focus)) or 'nothing'}")
+                            st.write(f"- **{focus}** reaches: {', '.join(call_graph.reachable(focus)) or 'nothing'}")
+                        else:
+                            st.graphviz_chart(call_graph.to_dot())
+
+                        cycles = call_graph.cycles()
+                        if cycles:
+                            st.write("- Recursive call cycles: " + "; ".join(" ↔ ".join(cycle) for cycle in cycles))
+                        never_called = call_graph.dead_code()
+                        if never_called:
+                            st.write(f"- Never called from this file: {', '.join(never_called)}")
+                        # Duplicate detection needs the ast module, so it skips partial code.
+                        clusters = [] if index.partial else find_duplicates(code_to_navigate).clusters
+                        for cluster in clusters:
+                            if cluster.exact:
+                                similarity = "identical"
+                            elif all(cluster.relation(m.qualname) != "near" for m in cluster.duplicates):
+                                similarity = "identical except for literals"
+                            else:
+                                similarity = f"~{cluster.similarity:.0%} similar"
+                            st.write(f"- Duplicate code ({similarity}): "
+                                     + ", ".join(member.qualname for member in cluster.members))
                         
                         st.markdown("---")
                         st.markdown("### Function Call Details")
@@ -127,4 +279,63 @@ elif st.session_state.mode == "navigate":
                 except Exception as e:
                     st.error(f"An unexpected error occurred during analysis: {e}")
         else:
-            st.warning("Please paste some code to navigate.")
\ No newline at end of file
+            st.warning("Please paste some code to navigate.")
+
+# --- REPOSITORY MODE ---
+elif st.session_state.mode == "repository":
+    st.subheader("Whole-Repository Analysis")
+    repo_path = st.text_input("Path to a repository directory or .zip/.tar archive:", key="repo_path")
+    max_workers = st.number_input("Parser processes", min_value=1, max_value=64, value=min(os.cpu_count() or 1, 64), key="repo_workers")
+    if st.button("Index Repository", key="repo_btn"):
+        if repo_path:
+            progress_bar = st.progress(0, text="Discovering Python files...")
+
+            def update_progress(done, total, module):
+                progress_bar.progress(done / total, text=f"Parsed {done}/{total}: {module}")
+
+            try:
+                with start_trace("repository"):
+                    repo_graph = index_repository(repo_path, max_workers=int(max_workers), on_progress=update_progress)
+            except (OSError, ValueError) as e:
+                st.error(f"Could not read the repository: {e}")
+            else:
+                progress_bar.empty()
+                failed = {name: info for name, info in repo_graph.modules.items() if info["error"]}
+                metric_cols = st.columns(4)
+                metric_cols[0].metric("Modules", len(repo_graph.modules))
+                metric_cols[1].metric("Definitions", len(repo_graph.definitions))
+                metric_cols[2].metric("Cross-module calls", len(repo_graph.cross_module_edges()))
+                metric_cols[3].metric("Import edges", len(repo_graph.module_edges))
+
+                st.markdown("### Module Dependency Graph")
+                st.graphviz_chart(CallGraph.from_edges(repo_graph.module_edges, nodes=repo_graph.modules).to_dot())
+
+                st.markdown("### Call Graph")
+                st.caption("Large graphs are collapsed by module.")
+                if repo_graph.call_edges:
+                    st.pyplot(render_graph(repo_graph.call_graph()))
+
+                if failed:
+                    with st.expander(f"{len(failed)} file(s) could not be parsed"):
+                        for name, info in failed.items():
+                            st.write(f"- `{info['path']}`: {info['error']}")
+        else:
+            st.warning("Please enter a repository path.")
+
+# --- Diagnostics for the last run ---
+last_trace = st.session_state.get("last_trace")
+if last_trace is not None and last_trace.spans:
+    st.markdown("---")
+    with st.expander(f"🩺 Diagnostics: last run ({last_trace.name}, {last_trace.root.duration:.2f}s)"):
+        stages = sorted(last_trace.summary().items(), key=lambda item: -item[1]["total"])
+        st.dataframe([{"stage": name, **{key: round(value, 4) if isinstance(value, float) else value
+                                         for key, value in stats.items()}}
+                      for name, stats in stages], use_container_width=True)
+        export_cols = st.columns(2)
+        export_cols[0].download_button("Download JSON", last_trace.to_json(), file_name="trace.json",
+                                       mime="application/json")
+        export_cols[1].download_button("Download Chrome trace", last_trace.to_chrome_trace(),
+                                       file_name="trace.chrome.json", mime="application/json")
+        if last_trace.profile:
+            st.markdown("**cProfile (top functions by cumulative time)**")
+            st.code(last_trace.profile, language="text")
@@ -0,0 +1,228 @@
+# code_summarizer/benchmarks/run.py
+"""
+Times the analysis pipeline on synthetic codebases of increasing size.
+
+    python -m code_summarizer.benchmarks.run --sizes 1k,10k,100k,1m
+    python -m code_summarizer.benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m code_summarizer.benchmarks.run --baseline benchmarks/baseline.json
+
+Each benchmark reports its best time over --repeats runs, throughput in lines per
+second, and peak traced memory (from one extra run under tracemalloc). With several
+sizes it also fits a scaling exponent: 1.0 is linear, 2.0 quadratic. The end-to-end
+summarize benchmark runs against the mock backend with a simulated latency, with
+the response cache and rate limits out of the way. Against a baseline, any time or
+memory more than --tolerance above the baseline is reported as a regression, and
+the exit status is 1. Baselines are machine-specific; record one on the machine
+that compares against it.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import numpy as np
+
+from code_summarizer.benchmarks.synthetic import generate_codebase, parse_size
+
+DEFAULT_SIZES = "1k,10k,100k"
+# Differences below these are timer and allocator noise, never regressions.
+MIN_SECONDS_DIFFERENCE = 0.001
+MIN_BYTES_DIFFERENCE = 1024 * 1024
+
+def _clear_parse_caches():
+    from code_summarizer import graph_generator, symbols
+    with symbols._index_cache_lock:
+        symbols._index_cache.clear()
+    with graph_generator._layout_cache_lock:
+        graph_generator._layout_cache.clear()
+
+class Benchmark:
+    """setup(code) runs once per size; prepare() before every timed run; run(state) is timed."""
+
+    def __init__(self, name, run, setup=None, prepare=_clear_parse_caches):
+        self.name = name
+        self.run = run
+        self.setup = setup or (lambda code: code)
+        self.prepare = prepare
+
+def _benchmarks():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    from code_summarizer.cache import get_response_cache
+    from code_summarizer.graph_generator import build_dependency_graph_from_code
+    from code_summarizer.navigator import build_call_graph, extract_functions_and_calls, graph_to_dot
+    from code_summarizer.summarizer import chunk_code, summarize_large_code
+
+    def calls_of(code):
+        return extract_functions_and_calls(code)[1]
+
+    def draw(code):
+        plt.close(build_dependency_graph_from_code(code))
+
+    def prepare_summarize():
+        _clear_parse_caches()
+        get_response_cache().clear()
+
+    benchmarks = [
+        Benchmark("chunk_code", chunk_code),
+        Benchmark("extract_functions_and_calls", extract_functions_and_calls),
+        Benchmark("build_call_graph", build_call_graph, setup=calls_of),
+        Benchmark("graph_to_dot", graph_to_dot, setup=lambda code: build_call_graph(calls_of(code))),
+        Benchmark("build_dependency_graph_from_code", draw),
+        Benchmark("summarize_large_code", summarize_large_code, prepare=prepare_summarize),
+    ]
+    return OrderedDict((benchmark.name, benchmark) for benchmark in benchmarks)
+
+def use_mock_llm(latency, cache_dir):
+    """Points the model calls at the mock backend, without rate limits or a shared cache."""
+    os.environ.update({
+        "CODE_NAVIGATOR_BACKEND": "mock",
+        "MOCK_LATENCY": str(latency),
+        "MOCK_JITTER": str(latency / 5),
+        "MOCK_ERROR_RATE": "0",
+        "GEMINI_RPM": "1000000000",
+        "GEMINI_TPM": "1000000000000",
+        "CODE_NAVIGATOR_CACHE_DIR": cache_dir,
+    })
+
+def measure(benchmark, code, repeats):
+    state = benchmark.setup(code)
+    timings = []
+    for _ in range(repeats):
+        benchmark.prepare()
+        started = time.perf_counter()
+        benchmark.run(state)
+        timings.append(time.perf_counter() - started)
+
+    # Memory is measured in a separate run, since tracemalloc slows everything down.
+    benchmark.prepare()
+    tracemalloc.start()
+    try:
+        benchmark.run(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    lines = code.count("\n")
+    best = min(timings)
+    return {
+        "lines": lines,
+        "seconds": best,
+        "median_seconds": statistics.median(timings),
+        "lines_per_second": lines / best if best else None,
+        "peak_bytes": peak,
+    }
+
+def scaling_exponent(points):
+    """Slope of log(seconds) against log(lines): how time grows with input size."""
+    points = [(p["lines"], p["seconds"]) for p in points if p["seconds"] > 0]
+    if len(points) < 2:
+        return None
+    lines, seconds = np.log(np.array(points, dtype=float)).T
+    return float(np.polyfit(lines, seconds, 1)[0])
+
+def compare(results, baseline, tolerance):
+    """Returns a list of regression messages, one per metric that got worse than tolerance allows."""
+    regressions = []
+    for name, sizes in results["results"].items():
+        for size, current in sizes.items():
+            previous = baseline.get("results", {}).get(name, {}).get(size)
+            if not previous:
+                continue
+            for metric, noise in (("seconds", MIN_SECONDS_DIFFERENCE), ("peak_bytes", MIN_BYTES_DIFFERENCE)):
+                if (previous[metric] and current[metric] > previous[metric] * (1 + tolerance)
+                        and current[metric] - previous[metric] > noise):
+                    regressions.append(f"{name} @ {size} lines: {metric} {previous[metric]:.4g} -> "
+                                       f"{current[metric]:.4g} (+{current[metric] / previous[metric] - 1:.0%})")
+    return regressions
+
+def _format_table(results):
+    rows = [f"{'benchmark':<34}{'lines':>10}{'seconds':>11}{'lines/s':>13}{'peak MB':>10}"]
+    for name, sizes in results["results"].items():
+        for point in sizes.values():
+            rate = f"{point['lines_per_second']:,.0f}" if point["lines_per_second"] else "-"
+            rows.append(f"{name:<34}{point['lines']:>10,}{point['seconds']:>11.4f}{rate:>13}"
+                        f"{point['peak_bytes'] / 2 ** 20:>10.1f}")
+        exponent = results["scaling"].get(name)
+        if exponent is not None:
+            rows.append(f"{'':<34}scaling exponent {exponent:.2f}")
+    return "\n".join(rows)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline on synthetic code.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"Comma-separated line counts, e.g. 1k,10k,1m (default: {DEFAULT_SIZES}).")
+    parser.add_argument("--only", help="Comma-separated benchmark names to run (default: all).")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per benchmark and size.")
+    parser.add_argument("--depth", type=int, default=4, help="Maximum nesting depth of generated code.")
+    parser.add_argument("--fan-out", type=int, default=6, help="Maximum calls per generated function.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the code generator.")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Simulated seconds per model call.")
+    parser.add_argument("-o", "--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Compare against this results file.")
+    parser.add_argument("--save-baseline", help="Write the results to this file as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown or memory growth before reporting a regression (default: 0.25).")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+    cache_dir = tempfile.mkdtemp(prefix="code_navigator_bench_")
+    use_mock_llm(args.llm_latency, cache_dir)
+    benchmarks = _benchmarks()
+    names = [name.strip() for name in args.only.split(",")] if args.only else list(benchmarks)
+    unknown = [name for name in names if name not in benchmarks]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}; choose from {', '.join(benchmarks)}")
+
+    results = {
+        "meta": {
+            "python": platform.python_version(), "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeats": args.repeats,
+            "depth": args.depth, "fan_out": args.fan_out, "seed": args.seed,
+            "llm_latency": args.llm_latency,
+        },
+        "results": {name: {} for name in names},
+        "scaling": {},
+    }
+    for size in sizes:
+        code = generate_codebase(size, seed=args.seed, max_depth=args.depth, fan_out=args.fan_out)
+        for name in names:
+            print(f"{name} @ {size:,} lines...", file=sys.stderr, flush=True)
+            results["results"][name][str(size)] = measure(benchmarks[name], code, args.repeats)
+    for name in names:
+        results["scaling"][name] = scaling_exponent(list(results["results"][name].values()))
+
+    print(_format_table(results))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+# code_summarizer/cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "code_navigator")
+
+def get_cache_dir(*parts):
+    """Directory for on-disk caches (CODE_NAVIGATOR_CACHE_DIR or ~/.cache/code_navigator)."""
+    return os.path.join(os.getenv("CODE_NAVIGATOR_CACHE_DIR", DEFAULT_CACHE_DIR), *parts)
+
+def normalize_prompt(prompt):
+    """
+    Normalizes a prompt so that whitespace-only differences map to the same key.
+    Leading indentation is kept because it is meaningful inside Python code.
+    """
+    lines = prompt.replace("\r\n", "\n").strip().split("\n")
+    return "\n".join(line.rstrip() for line in lines)
+
+def make_key(model_name, prompt):
+    """Content-addressed key for a (model name, normalized prompt) pair."""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_prompt(prompt).encode("utf-8"))
+    return digest.hexdigest()
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM responses: an in-memory LRU in front of a SQLite file.
+    Entries older than max_age seconds are treated as misses, and the disk tier is
+    trimmed to max_disk_bytes by evicting the least recently used entries.
+    """
+
+    def __init__(self, path=None, max_memory_entries=256, max_disk_bytes=200 * 1024 * 1024,
+                 max_age=30 * 24 * 3600):
+        self.path = path or get_cache_dir("responses.sqlite3")
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, key):
+        """Returns the cached text for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] <= self.max_age:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            row = self._db.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self._memory.pop(key, None)
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self._remember(key, row[0], row[1])
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._remember(key, value, now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict_disk(now)
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            disk_entries, disk_bytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "disk_bytes": disk_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now):
+        self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed ASC")
+        stale = []
+        for key, size in rows:
+            if total <= self.max_disk_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", stale)
+        for (key,) in stale:
+            self._memory.pop(key, None)
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Returns the process-wide response cache, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(get_cache_dir("responses.sqlite3"))
+        return _default_cache
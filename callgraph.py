@@ -0,0 +1,229 @@
+# code_summarizer/callgraph.py
+
+import io
+import json
+
+import numpy as np
+
+def _csr(num_nodes, sources, targets):
+    """Builds CSR arrays (row pointers, column indices) for edges sources[i] -> targets[i]."""
+    order = np.lexsort((targets, sources))
+    indices = targets[order].astype(np.int32)
+    counts = np.bincount(sources, minlength=num_nodes)
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, indices
+
+def _dot_id(name):
+    return '"' + str(name).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+class CallGraph:
+    """
+    Compact call graph stored as CSR arrays in both directions (callees and callers).
+    Node names are kept once in a list; everything else is int32/int64 NumPy arrays.
+    """
+
+    def __init__(self, names, sources, targets):
+        self.names = list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if len(sources):
+            # Drop duplicate edges.
+            pairs = np.unique(sources * len(self.names) + targets)
+            sources, targets = pairs // len(self.names), pairs % len(self.names)
+        self.out_ptr, self.out_idx = _csr(len(self.names), sources, targets)
+        self.in_ptr, self.in_idx = _csr(len(self.names), targets, sources)
+
+    @classmethod
+    def from_edges(cls, edges, nodes=()):
+        names = {}
+        for node in nodes:
+            names.setdefault(node, len(names))
+        sources, targets = [], []
+        for u, v in edges:
+            sources.append(names.setdefault(u, len(names)))
+            targets.append(names.setdefault(v, len(names)))
+        return cls(names, sources, targets)
+
+    @classmethod
+    def from_calls(cls, calls):
+        """Builds the graph from the {caller: callees} dict returned by extract_functions_and_calls."""
+        return cls.from_edges(((caller, callee) for caller, callees in calls.items() for callee in callees),
+                              nodes=calls)
+
+    @property
+    def num_nodes(self):
+        return len(self.names)
+
+    @property
+    def num_edges(self):
+        return len(self.out_idx)
+
+    def _id(self, name):
+        if name not in self.ids:
+            raise KeyError(f"'{name}' is not in the call graph.")
+        return self.ids[name]
+
+    def _names(self, ids):
+        return [self.names[i] for i in sorted(ids, key=lambda i: self.names[i])]
+
+    def callees(self, name):
+        i = self._id(name)
+        return self._names(self.out_idx[self.out_ptr[i]:self.out_ptr[i + 1]])
+
+    def callers(self, name):
+        i = self._id(name)
+        return self._names(self.in_idx[self.in_ptr[i]:self.in_ptr[i + 1]])
+
+    def _expand(self, frontier, ptr, idx):
+        """All neighbours of the frontier ids, gathered without a Python-level loop."""
+        starts, ends = ptr[frontier], ptr[frontier + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return idx[offsets + np.arange(total)].astype(np.int64)
+
+    def _bfs(self, start_ids, direction="out", max_depth=None):
+        directions = {"out": [(self.out_ptr, self.out_idx)], "in": [(self.in_ptr, self.in_idx)],
+                      "both": [(self.out_ptr, self.out_idx), (self.in_ptr, self.in_idx)]}[direction]
+        visited = np.zeros(self.num_nodes, dtype=bool)
+        frontier = np.unique(np.asarray(start_ids, dtype=np.int64))
+        visited[frontier] = True
+        depth = 0
+        while len(frontier) and (max_depth is None or depth < max_depth):
+            neighbours = np.concatenate([self._expand(frontier, ptr, idx) for ptr, idx in directions])
+            frontier = np.unique(neighbours[~visited[neighbours]])
+            visited[frontier] = True
+            depth += 1
+        return visited
+
+    def neighborhood(self, name, k=1, direction="both"):
+        """Names within k hops of name; direction is "out" (callees), "in" (callers) or "both"."""
+        return self._names(np.flatnonzero(self._bfs([self._id(name)], direction, max_depth=k)))
+
+    def reachable(self, name):
+        """Everything name transitively calls (not including name unless it is in a cycle)."""
+        i = self._id(name)
+        reached = self._bfs(self._expand(np.array([i]), self.out_ptr, self.out_idx))
+        return self._names(np.flatnonzero(reached))
+
+    def transitive_callers(self, name):
+        """Everything that transitively calls name."""
+        i = self._id(name)
+        reached = self._bfs(self._expand(np.array([i]), self.in_ptr, self.in_idx), direction="in")
+        return self._names(np.flatnonzero(reached))
+
+    def transitive_closure(self, names=None):
+        """{name: reachable(name)} for the given names (all nodes by default)."""
+        return {name: self.reachable(name) for name in (self.names if names is None else names)}
+
+    def cycles(self):
+        """Groups of mutually recursive functions (strongly connected components with a cycle)."""
+        # Plain lists are much faster than NumPy scalars for this node-at-a-time walk.
+        out_ptr, out_idx = self.out_ptr.tolist(), self.out_idx.tolist()
+        index_of = [-1] * self.num_nodes
+        low = [0] * self.num_nodes
+        on_stack = [False] * self.num_nodes
+        stack, components, counter = [], [], 0
+        for root in range(self.num_nodes):
+            if index_of[root] != -1:
+                continue
+            # Iterative Tarjan: each work item is [node, position in its adjacency list].
+            work = [[root, out_ptr[root]]]
+            index_of[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            while work:
+                item = work[-1]
+                node, pos = item
+                if pos < out_ptr[node + 1]:
+                    item[1] = pos + 1
+                    child = out_idx[pos]
+                    if index_of[child] == -1:
+                        index_of[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack[child] = True
+                        work.append([child, out_ptr[child]])
+                    elif on_stack[child] and index_of[child] < low[node]:
+                        low[node] = index_of[child]
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[node] < low[parent]:
+                        low[parent] = low[node]
+                if low[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in out_idx[out_ptr[node]:out_ptr[node + 1]]:
+                        components.append(self._names(component))
+        return components
+
+    def dead_code(self, roots=None):
+        """
+        Functions that can never run. With roots (e.g. ["main"]), that is everything not
+        reachable from them; without roots, it is every function that nothing calls.
+        """
+        if roots is None:
+            in_degree = np.diff(self.in_ptr)
+            return self._names(np.flatnonzero(in_degree == 0))
+        live = self._bfs([self._id(root) for root in roots])
+        return self._names(np.flatnonzero(~live))
+
+    def _selected(self, nodes):
+        if nodes is None:
+            return [True] * self.num_nodes
+        selected = [False] * self.num_nodes
+        for name in nodes:
+            selected[self._id(name)] = True
+        return selected
+
+    def _selected_edges(self, selected):
+        out_ptr, out_idx = self.out_ptr.tolist(), self.out_idx.tolist()
+        for i in np.flatnonzero(selected).tolist():
+            for j in out_idx[out_ptr[i]:out_ptr[i + 1]]:
+                if selected[j]:
+                    yield self.names[i], self.names[j]
+
+    def write_dot(self, out, nodes=None):
+        """Streams the graph, or only the subgraph induced by nodes, to out as Graphviz DOT."""
+        selected = self._selected(nodes)
+        out.write("digraph G {\n")
+        out.write('  rankdir="LR";\n')
+        out.write('  node [shape=box, style="rounded,filled", fillcolor="skyblue"];\n')
+        for i in np.flatnonzero(selected).tolist():
+            out.write(f"  {_dot_id(self.names[i])};\n")
+        for u, v in self._selected_edges(selected):
+            out.write(f"  {_dot_id(u)} -> {_dot_id(v)};\n")
+        out.write("}")
+
+    def write_json(self, out, nodes=None):
+        """Streams {"nodes": [...], "edges": [[caller, callee], ...]} to out."""
+        selected = self._selected(nodes)
+        out.write('{"nodes": [')
+        for n, i in enumerate(np.flatnonzero(selected).tolist()):
+            out.write((", " if n else "") + json.dumps(self.names[i]))
+        out.write('], "edges": [')
+        for n, edge in enumerate(self._selected_edges(selected)):
+            out.write((", " if n else "") + json.dumps(edge))
+        out.write("]}")
+
+    def to_dot(self, nodes=None):
+        buffer = io.StringIO()
+        self.write_dot(buffer, nodes)
+        return buffer.getvalue()
+
+    def to_json(self, nodes=None):
+        buffer = io.StringIO()
+        self.write_json(buffer, nodes)
+        return buffer.getvalue()
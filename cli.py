@@ -0,0 +1,114 @@
+# code_summarizer/cli.py
+
+import argparse
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from code_summarizer.engine import TASKS, Engine
+from code_summarizer.llm import DEFAULT_MODEL
+from code_summarizer.progress import NULL_PROGRESS, StreamProgress
+from code_summarizer.repository import discover_python_files
+from code_summarizer.tracing import span, trace
+
+# Tasks that need no Gemini access.
+LOCAL_TASKS = {"navigate", "graph"}
+
+def collect_jobs(args):
+    """Expands the command-line arguments into a list of job dicts."""
+    jobs = []
+    if args.jobs_file:
+        with open(args.jobs_file, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    job = json.loads(line)
+                    job.setdefault("id", f"{args.jobs_file}:{line_number}")
+                    job.setdefault("task", args.task)
+                    jobs.append(job)
+    for path in args.paths:
+        if os.path.isdir(path):
+            files = [file_path for file_path, _, _ in discover_python_files(path)]
+        else:
+            files = [path]
+        for file_path in files:
+            jobs.append({"id": file_path, "task": args.task, "path": file_path, "query": args.query})
+    return jobs
+
+def run_job(engine, job, verbose=False):
+    """Runs one job and returns its JSONL record; failures are recorded, not raised."""
+    record = {"id": job.get("id"), "task": job.get("task"), "path": job.get("path")}
+    started = time.perf_counter()
+    try:
+        code = job.get("code")
+        if code is None:
+            with open(job["path"], encoding="utf-8", errors="replace") as f:
+                code = f.read()
+        progress = StreamProgress(prefix=f"[{record['id']}] ") if verbose else NULL_PROGRESS
+        with span("job", id=record["id"], task=record["task"]):
+            record["result"] = engine.run(job.get("task"), code, query=job.get("query"), progress=progress)
+        record["error"] = None
+    except Exception as e:
+        record["result"] = None
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run code navigator tasks over many files and write JSONL results.")
+    parser.add_argument("--task", choices=TASKS, default="navigate",
+                        help="Task to run on every path, and on jobs that name no task (default: navigate).")
+    parser.add_argument("paths", nargs="*", help="Python files or directories to process.")
+    parser.add_argument("--query", help="Question to ask for the search task.")
+    parser.add_argument("--jobs-file", help="JSONL file of jobs: {\"task\", \"path\" or \"code\", \"query\"}.")
+    parser.add_argument("-o", "--output", help="JSONL output file (default: stdout).")
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="Jobs to run concurrently.")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Gemini model name.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Report progress on stderr.")
+    parser.add_argument("--trace", help="Write a trace of the run to this file.")
+    parser.add_argument("--trace-format", choices=("chrome", "json"), default="chrome",
+                        help="Trace format: Chrome trace events (chrome://tracing, Perfetto) or a span dump.")
+    args = parser.parse_args(argv)
+
+    jobs = collect_jobs(args)
+    if not jobs:
+        parser.error("nothing to do: give some paths or --jobs-file.")
+
+    load_dotenv()
+    needs_llm = any(job.get("task") not in LOCAL_TASKS for job in jobs)
+    try:
+        engine = Engine(model_name=args.model, configure=needs_llm)
+    except ValueError as e:
+        parser.error(str(e))
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    failures = 0
+    run_trace = trace("cli") if args.trace else contextlib.nullcontext()
+    try:
+        with run_trace as recorded, ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, run_job, engine, job, args.verbose)
+                       for job in jobs]
+            # Records are written as jobs finish, so partial results survive an interrupted run.
+            for done, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                failures += record["error"] is not None
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                if args.verbose:
+                    print(f"{done}/{len(jobs)} done: {record['id']}", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if args.trace:
+        with open(args.trace, "w", encoding="utf-8") as f:
+            f.write(recorded.to_chrome_trace() if args.trace_format == "chrome" else recorded.to_json())
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,49 @@
 # code_summarizer/completer.py
 
-import streamlit as st
-import google.generativeai as genai
+from code_summarizer.context_builder import CONTEXT_TOKEN_BUDGET, split_for_completion
+from code_summarizer.llm import DEFAULT_MODEL, generate_text, stream_text
+from code_summarizer.scheduler import INTERACTIVE, INTERACTIVE_TIMEOUT
+from code_summarizer.progress import NULL_PROGRESS
+from code_summarizer.tracing import span
 
-def complete_code_ai(incomplete_code, model_name="models/gemini-pro-latest"):
+FENCE = "```"
+PYTHON_FENCE = "```python"
+
+def completion_prompt(incomplete_code, budget=CONTEXT_TOKEN_BUDGET):
     """
-    Uses the Gemini model to intelligently complete a piece of code.
+    Builds the completion prompt and returns (prompt, prefix). When the code is larger
+    than budget tokens, only its last definition is sent for completion, with a reduced
+    view of the rest as context; prefix is the code to put back in front of the result.
     """
-    st.info("AI is generating your code completion...")
+    with span("complete.split", lines=incomplete_code.count("\n") + 1) as stage:
+        prefix, context, target = split_for_completion(incomplete_code, budget)
+        stage.set(prefix_lines=prefix.count("\n"))
+    if prefix:
+        return f"""
+    You are an expert Python code completion assistant.
+    The user is writing a large Python file. The code to complete is at the end of it;
+    the context below shows the rest of the file, where some functions are reduced to
+    their signatures. Complete the code in a logical and helpful way. Make sure it is
+    runnable and follows best practices.
+
+    Return only the completed version of the CODE TO COMPLETE, as raw Python code.
+    Do not repeat the context, and do not add any explanations, introductory text,
+    or markdown formatting like ```python.
+
+    CONTEXT:
+    ---
+    {context}
+    ---
+
+    CODE TO COMPLETE:
+    ---
+    {target}
+    ---
+
+    COMPLETED CODE:
+    """, prefix.rstrip() + "\n\n"
 
-    prompt = f"""
+    return f"""
     You are an expert Python code completion assistant.
     The user has provided the following incomplete Python code. Your task is to
     complete it in a logical and helpful way. Make sure the final code is runnable
@@ -24,18 +58,69 @@ def complete_code_ai(incomplete_code, model_name="models/gemini-pro-latest"):
     ---
 
     COMPLETED CODE:
+    """, ""
+
+def strip_code_fences(pieces):
+    """
+    Removes a leading ```python (or ```) fence, a trailing ``` fence and surrounding
+    whitespace from text that arrives in pieces, yielding clean text as soon as it is
+    known not to be part of a fence.
     """
-    
-    model = genai.GenerativeModel(model_name)
-    response = model.generate_content(prompt)
-    
+    head = ""
+    in_body = False
+    pending = ""
+    for piece in pieces:
+        if not in_body:
+            head = (head + piece).lstrip()
+            # Wait until we know whether the text opens with a fence.
+            if len(head) < len(PYTHON_FENCE) and PYTHON_FENCE.startswith(head):
+                continue
+            if head.startswith(PYTHON_FENCE):
+                head = head[len(PYTHON_FENCE):]
+            elif head.startswith(FENCE):
+                head = head[len(FENCE):]
+            piece, in_body = head.lstrip(), True
+            if not piece:
+                in_body = False
+                head = ""
+                continue
+        pending += piece
+        # Hold back trailing whitespace and backticks, which may be the closing fence.
+        body = pending.rstrip(" \t\r\n`")
+        if body:
+            yield body
+            pending = pending[len(body):]
+    if not in_body:
+        pending = head
+        if head.startswith(PYTHON_FENCE):
+            pending = head[len(PYTHON_FENCE):]
+        elif head.startswith(FENCE):
+            pending = head[len(FENCE):]
+    tail = pending.rstrip()
+    if tail.endswith(FENCE):
+        tail = tail[:-len(FENCE)]
+    tail = tail.rstrip()
+    if tail:
+        yield tail
+
+def complete_code_ai(incomplete_code, model_name=DEFAULT_MODEL, progress=NULL_PROGRESS):
+    """
+    Uses the Gemini model to intelligently complete a piece of code.
+    """
+    progress.info("AI is generating your code completion...")
+
+    prompt, prefix = completion_prompt(incomplete_code)
     # Clean up the response to get only the code, removing markdown wrappers
-    completed_code = response.text.strip()
-    if completed_code.startswith("```python"):
-        completed_code = completed_code[9:]
-    if completed_code.startswith("```"):
-        completed_code = completed_code[3:]
-    if completed_code.endswith("```"):
-        completed_code = completed_code[:-3]
-        
-    return completed_code.strip()
\ No newline at end of file
+    completed_code = generate_text(prompt, model_name, priority=INTERACTIVE, timeout=INTERACTIVE_TIMEOUT)
+    return prefix + "".join(strip_code_fences([completed_code]))
+
+def stream_complete_code_ai(incomplete_code, model_name=DEFAULT_MODEL):
+    """
+    Like complete_code_ai, but yields the completed code as it is generated,
+    with markdown fences stripped on the fly.
+    """
+    prompt, prefix = completion_prompt(incomplete_code)
+    if prefix:
+        yield prefix
+    yield from strip_code_fences(stream_text(prompt, model_name, priority=INTERACTIVE,
+                                             timeout=INTERACTIVE_TIMEOUT))
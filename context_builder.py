@@ -0,0 +1,262 @@
+# code_summarizer/context_builder.py
+
+import re
+
+from code_summarizer.symbols import build_symbol_index
+from code_summarizer.tokens import estimate_tokens
+
+# Default token budget for the code part of completion and search prompts.
+CONTEXT_TOKEN_BUDGET = 6000
+
+FULL, SKELETON, OMIT = "full", "skeleton", "omit"
+
+# How many top-level definition starts split_for_completion tries to parse the code
+# above; each try parses the whole head.
+MAX_SPLIT_ATTEMPTS = 3
+
+_CALLED_NAME_RE = re.compile(r"([A-Za-z_]\w*)\s*\(")
+_TOP_LEVEL_START_RE = re.compile(r"(def|async\s+def|class)\s|@")
+_DEFINED_NAME_RE = re.compile(r"(?:@.*\n)*(?:async\s+)?def\s+(\w+)|(?:@.*\n)*class\s+(\w+)")
+
+def _skeleton(symbol):
+    """Decorators, signature, first docstring line and an ellipsis body, at the symbol's indentation."""
+    indent = " " * symbol.col_offset
+    body_indent = indent + "    "
+    lines = [symbol.decorators] if symbol.decorators else []
+    lines.append(indent + symbol.signature)
+    if symbol.docstring:
+        lines.append(f'{body_indent}"""{symbol.docstring}"""')
+    lines.append(f"{body_indent}...")
+    return "\n".join(lines)
+
+class _Plan:
+    """Decides, per definition, whether it is sent in full, as a skeleton, or not at all."""
+
+    def __init__(self, index, focus, extra_callees=(), extra_callers_of=()):
+        self.index = index
+        self.by_name = {}
+        self.children = {}
+        for symbol in index.symbols:
+            self.by_name.setdefault(symbol.name, []).append(symbol)
+            if symbol.parent is not None:
+                self.children.setdefault(symbol.parent.qualname, []).append(symbol)
+        self.level = {symbol.qualname: SKELETON for symbol in index.symbols}
+        self.focus = [s for s in index.symbols if s.qualname in focus]
+        callees = self._callees(self.focus) + [s for name in extra_callees for s in self.by_name.get(name, ())]
+        callers = self._callers({s.name for s in self.focus} | set(extra_callers_of))
+        for symbol in self.focus:
+            self._set_full(symbol)
+        # Callers and callees sent in full; the last ones are dropped first when over budget.
+        self.neighbours = []
+        for symbol in callees + callers:
+            if self.level[symbol.qualname] != FULL:
+                self._set_full(symbol)
+                self.neighbours.append(symbol)
+
+    def _set_full(self, symbol):
+        self.level[symbol.qualname] = FULL
+        # A full class already includes its methods.
+        for child in self.children.get(symbol.qualname, ()):
+            self._set_full(child)
+
+    def _callees(self, symbols):
+        found = []
+        for symbol in symbols:
+            for call in symbol.calls:
+                head, _, rest = call.partition(".")
+                if head == "self" and rest and symbol.parent and symbol.parent.kind == "class":
+                    owner = symbol.parent
+                    found.extend(s for s in self.by_name.get(rest, ()) if s.parent is owner)
+                elif not rest:
+                    found.extend(self.by_name.get(head, ()))
+        return found
+
+    def _callers(self, names):
+        if not names:
+            return []
+        return [s for s in self.index.symbols if s.is_function and
+                any(call.rsplit(".", 1)[-1] in names for call in s.calls)]
+
+    def render(self, gaps):
+        """
+        Renders module-level code blocks (gaps) and top-level definitions in source order.
+        gaps is a list of (first line, text) for code outside any definition.
+        """
+        items = [(first, text) for first, text in gaps]
+        for symbol in self.index.symbols:
+            if symbol.parent is None:
+                text = self._render_symbol(symbol)
+                if text:
+                    items.append((symbol.lineno, text))
+        return "\n\n".join(text for _, text in sorted(items, key=lambda item: item[0]))
+
+    def _render_symbol(self, symbol):
+        level = self.level[symbol.qualname]
+        if level == FULL:
+            # Decorators (@property, @app.route(...), @dataclass) change what the code means.
+            code = " " * symbol.col_offset + symbol.code
+            return f"{symbol.decorators}\n{code}" if symbol.decorators else code
+        if symbol.kind != "class":
+            return _skeleton(symbol) if level == SKELETON else ""
+        children = [self._render_symbol(child) for child in self.children.get(symbol.qualname, ())]
+        children = [child for child in children if child]
+        if level == OMIT and not children:
+            return ""
+        header = [symbol.decorators] if symbol.decorators else []
+        header.append(" " * symbol.col_offset + symbol.signature)
+        if symbol.docstring:
+            header.append(" " * (symbol.col_offset + 4) + f'"""{symbol.docstring}"""')
+        if not children:
+            header.append(" " * (symbol.col_offset + 4) + "...")
+        return "\n".join(header + children)
+
+def _module_gaps(index):
+    """Module-level code outside any top-level definition, as (first line, text) blocks."""
+    covered = [False] * (index.line_count + 2)
+    for symbol in index.symbols:
+        if symbol.parent is None:
+            # Decorators sit above the definition's first line; keep them out of the gaps.
+            for lineno in range(symbol.decorator_lineno, symbol.end_lineno + 1):
+                covered[lineno] = True
+    gaps, block = [], []
+    for lineno in range(1, index.line_count + 2):
+        if lineno <= index.line_count and not covered[lineno]:
+            block.append(lineno)
+        elif block:
+            text = index.lines(block[0], block[-1]).strip("\n")
+            if text.strip():
+                gaps.append((block[0], text))
+            block = []
+    return gaps
+
+def _fit(plan, gaps, budget, reserved=0):
+    """
+    Reduces the plan until the rendered context fits the budget: first dropping
+    skeletons furthest from the focus, then reducing callers and callees to skeletons,
+    then dropping module-level blocks.
+    """
+    def size():
+        return estimate_tokens(plan.render(gaps)) + reserved
+
+    total = size()
+    if total <= budget:
+        return plan.render(gaps)
+
+    anchor = plan.focus[0].lineno if plan.focus else plan.index.line_count
+    skeletons = [s for s in plan.index.symbols if plan.level[s.qualname] == SKELETON]
+    skeletons.sort(key=lambda s: abs(s.lineno - anchor), reverse=True)
+    for symbol in skeletons:
+        plan.level[symbol.qualname] = OMIT
+        # Track the size incrementally and only re-render once it looks small enough.
+        # Top-level items are joined by a blank line (two newline tokens), methods by one.
+        total -= estimate_tokens(_skeleton(symbol)) + (2 if symbol.parent is None else 1)
+        if total <= budget:
+            total = size()
+            if total <= budget:
+                return plan.render(gaps)
+
+    for symbol in reversed(plan.neighbours):
+        # Same running total as above, with the neighbour's full text as the saving.
+        total -= estimate_tokens(plan._render_symbol(symbol)) + (2 if symbol.parent is None else 1)
+        plan.level[symbol.qualname] = OMIT
+        for child in plan.children.get(symbol.qualname, ()):
+            plan.level[child.qualname] = OMIT
+        if total <= budget:
+            total = size()
+            if total <= budget:
+                return plan.render(gaps)
+
+    gaps = sorted(gaps, key=lambda gap: abs(gap[0] - anchor))
+    while gaps and total > budget:
+        total -= estimate_tokens(gaps.pop()[1]) + 2
+        if total <= budget:
+            total = size()
+    # The focus alone is over budget: cut it rather than exceed the budget.
+    return truncate_to_budget(plan.render(gaps), budget - reserved)
+
+def truncate_to_budget(text, budget, keep_end=False):
+    """Cuts text by lines to roughly budget tokens, keeping its start (or its end)."""
+    lines = text.split("\n")
+    kept, used = [], 0
+    for line in (reversed(lines) if keep_end else lines):
+        used += estimate_tokens(line) + 1
+        if used > budget:
+            break
+        kept.append(line)
+    return "\n".join(reversed(kept) if keep_end else kept)
+
+def build_context(code, focus=(), budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Builds a prompt-sized view of code around the focus definitions (qualnames): the
+    focus and its direct callers and callees in full, everything else as signature-only
+    skeletons, all within budget tokens. Unparseable code is cut to the budget.
+    """
+    try:
+        index = build_symbol_index(code)
+    except SyntaxError:
+        return truncate_to_budget(code, budget)
+    plan = _Plan(index, set(focus))
+    return _fit(plan, _module_gaps(index), budget)
+
+def _split_unfinished_tail(code):
+    """
+    Splits code into a head and the unfinished top-level statement at the end (the code
+    being completed), trying at most MAX_SPLIT_ATTEMPTS top-level definition starts
+    from the end. Returns (head, tail, index of head), with index None if no tried head
+    parses, or (None, code, None) if there is no top-level definition at all.
+    """
+    lines = code.rstrip().split("\n")
+    first_split, tried, attempts = None, len(lines), 0
+    for start in range(len(lines) - 1, -1, -1):
+        line = lines[start]
+        if not line or line[0].isspace() or not _TOP_LEVEL_START_RE.match(line):
+            continue
+        # Keep decorators together with their definition.
+        while start > 0 and lines[start - 1].startswith("@"):
+            start -= 1
+        if start >= tried:
+            continue  # a decorator of the definition tried last
+        tried = start
+        head, tail = "\n".join(lines[:start]), "\n".join(lines[start:])
+        first_split = first_split or (head, tail)
+        try:
+            return head, tail, build_symbol_index(head)
+        except SyntaxError:
+            attempts += 1
+            if attempts == MAX_SPLIT_ATTEMPTS:
+                break
+    if first_split is None:
+        return None, code, None
+    return first_split[0], first_split[1], None
+
+def _keep_end(code, budget):
+    """(prefix, "", target) with target the end of code that fits budget tokens."""
+    target = truncate_to_budget(code, budget, keep_end=True)
+    return code[:len(code) - len(target)], "", target
+
+def split_for_completion(incomplete_code, budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Prepares a completion of incomplete_code within budget tokens. Returns
+    (prefix, context, target): target is the last top-level definition (the code being
+    written), prefix is all the code before it, and context is a reduced view of the
+    prefix that keeps what target calls, and what calls it, in full and the rest as
+    skeletons. If everything fits the budget, returns ("", "", incomplete_code). When
+    the prefix does not parse, context is its end; when there is no definition to split
+    at, or target alone is over budget, target is the end of the code that fits.
+    context and target together never exceed budget tokens.
+    """
+    if estimate_tokens(incomplete_code) <= budget:
+        return "", "", incomplete_code
+    head, tail, index = _split_unfinished_tail(incomplete_code)
+    if head is None or not head.strip():
+        return _keep_end(incomplete_code, budget)
+    tail_tokens = estimate_tokens(tail)
+    if tail_tokens >= budget:
+        return _keep_end(incomplete_code, budget)
+    if index is None:
+        # Syntax errors above the code being completed: the closest lines are the best context.
+        return head, truncate_to_budget(head, budget - tail_tokens, keep_end=True), tail
+    defined = _DEFINED_NAME_RE.match(tail)
+    plan = _Plan(index, set(), extra_callees=_CALLED_NAME_RE.findall(tail),
+                 extra_callers_of=[name for name in (defined.groups() if defined else ()) if name])
+    return head, _fit(plan, _module_gaps(index), budget, reserved=tail_tokens), tail
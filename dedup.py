@@ -0,0 +1,354 @@
+# code_summarizer/dedup.py
+
+import ast
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from code_summarizer.symbols import build_symbol_index, source_hash
+
+# Functions with fewer normalized tokens than this (getters, one-line wrappers) are too
+# generic to call duplicates.
+MIN_TOKENS = 40
+# Shingle length, in normalized tokens, for near-duplicate detection.
+SHINGLE_SIZE = 5
+# MinHash signature = BANDS x ROWS values. Pairs become LSH candidates with probability
+# 1 - (1 - s**ROWS)**BANDS for Jaccard similarity s: about 50% at s=0.77, 96% at s=0.9.
+BANDS = 8
+ROWS = 8
+# Candidates must also reach this estimated Jaccard similarity to be clustered.
+SIMILARITY_THRESHOLD = 0.8
+
+_PRIME = (1 << 31) - 1
+_permutations = np.random.RandomState(0x5EED).randint(1, _PRIME, size=(2, BANDS * ROWS)).astype(np.uint64)
+# Nodes that bind a local name, and the field holding it. Only these names (and Name
+# nodes referring to them) are canonicalized; attributes, keyword names and imported
+# names are part of what the code does.
+_BINDING_FIELDS = {ast.FunctionDef: "name", ast.AsyncFunctionDef: "name", ast.ClassDef: "name",
+                   ast.arg: "arg", ast.ExceptHandler: "name"}
+
+_SKIPPED_FIELDS = {"ctx", "type_comment", "kind"}
+_fields_cache = {}
+
+def _fields(cls):
+    fields = _fields_cache.get(cls)
+    if fields is None:
+        fields = _fields_cache[cls] = tuple(f for f in cls._fields if f not in _SKIPPED_FIELDS)
+    return fields
+
+def _normalized_tokens(node, out, literals, name_slots, bound):
+    """
+    Serializes node as a flat token list with literals replaced by their type. The
+    literals themselves are collected, in order, into literals. Each Name or binding
+    name is written as is and its (position, name) recorded in name_slots; names the
+    function binds are collected into bound, so normalize can rename them afterwards.
+    Docstrings and comments are dropped.
+    """
+    cls = node.__class__
+    out.append(cls.__name__)
+    if cls is ast.Name:
+        name_slots.append((len(out), node.id))
+        out.append(node.id)
+        if not isinstance(node.ctx, ast.Load):
+            bound.add(node.id)
+        return
+    binding_field = _BINDING_FIELDS.get(cls)
+    for field in _fields(cls):
+        value = getattr(node, field, None)
+        if isinstance(value, ast.AST):
+            _normalized_tokens(value, out, literals, name_slots, bound)
+        elif isinstance(value, list):
+            body = value
+            if field == "body" and body and isinstance(body[0], ast.Expr) \
+                    and isinstance(body[0].value, ast.Constant) and isinstance(body[0].value.value, str):
+                body = body[1:]
+            out.append("[")
+            for item in body:
+                if isinstance(item, ast.AST):
+                    _normalized_tokens(item, out, literals, name_slots, bound)
+                else:
+                    out.append(str(item))
+            out.append("]")
+        elif field == binding_field and value is not None:
+            name_slots.append((len(out), value))
+            out.append(value)
+            bound.add(value)
+        elif field == "value":
+            out.append(f"<{type(value).__name__}>")
+            literals.append(repr(value))
+        elif value is not None:
+            out.append(str(value))
+
+def normalize(function):
+    """
+    (normalized token list, literal reprs in order) of one function definition node.
+    The function's own name, parameters and assigned names are renamed v0, v1, ... in
+    order of appearance, so copies with renamed variables compare equal; globals,
+    called helpers and builtins keep their names.
+    """
+    out, literals, name_slots, bound = [], [], [], set()
+    _normalized_tokens(function, out, literals, name_slots, bound)
+    names = {}
+    for position, name in name_slots:
+        if name in bound:
+            renamed = names.get(name)
+            if renamed is None:
+                renamed = names[name] = f"v{len(names)}"
+            out[position] = renamed
+    return out, literals
+
+_SHINGLE_MULTIPLIER = 1000003
+_MASK = np.uint64(0xFFFFFFFF)
+
+def _shingle_hashes(tokens, token_hashes):
+    """Distinct hashes of the token shingles; each token is hashed once (memoized in token_hashes)."""
+    for token in set(tokens).difference(token_hashes):
+        token_hashes[token] = zlib.crc32(token.encode("utf-8"))
+    hashes = np.fromiter(map(token_hashes.__getitem__, tokens), dtype=np.uint64, count=len(tokens))
+    count = max(1, len(hashes) - SHINGLE_SIZE + 1)
+    shingles = hashes[:count].copy()
+    for offset in range(1, min(SHINGLE_SIZE, len(hashes))):
+        shingles = (shingles * np.uint64(_SHINGLE_MULTIPLIER) + hashes[offset:offset + count]) & _MASK
+    return np.unique(shingles)
+
+def minhash_signatures(token_lists):
+    """
+    MinHash signatures of the token shingles of each token list, as a uint64 array of
+    shape (len(token_lists), BANDS * ROWS). All lists are hashed in one NumPy pass.
+    """
+    token_hashes = {}
+    shingles = [_shingle_hashes(tokens, token_hashes) for tokens in token_lists]
+    if not shingles:
+        return np.zeros((0, BANDS * ROWS), dtype=np.uint64)
+    offsets = np.cumsum([0] + [len(s) for s in shingles[:-1]])
+    a, b = _permutations[0][:, None], _permutations[1][:, None]
+    values = (a * np.concatenate(shingles)[None, :] + b) % _PRIME
+    return np.minimum.reduceat(values, offsets, axis=1).T
+
+def minhash(tokens):
+    """MinHash signature of the token shingles, as a uint64 array of BANDS * ROWS values."""
+    return minhash_signatures([tokens])[0]
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        i, j = self.find(i), self.find(j)
+        if i != j:
+            self.parent[max(i, j)] = min(i, j)
+
+class DuplicateCluster:
+    """
+    Definitions with the same or nearly the same normalized code. Relative to the
+    representative, each other member is an exact copy (same code up to local names),
+    a literal variant (same code, different literal values) or a near-duplicate.
+    """
+
+    __slots__ = ("members", "exact_copies", "literal_variants", "similarity")
+
+    def __init__(self, members, exact_copies, literal_variants, similarity):
+        self.members = members                    # Symbols in source order; the first is the representative.
+        self.exact_copies = exact_copies          # Qualnames whose code, literals included, equals the representative's.
+        self.literal_variants = literal_variants  # {qualname: [(its literal, the representative's)] where they differ}
+        self.similarity = similarity              # Lowest estimated similarity of the pairs that formed the cluster.
+
+    @property
+    def exact(self):
+        return len(self.exact_copies) == len(self.members) - 1
+
+    @property
+    def representative(self):
+        return self.members[0]
+
+    @property
+    def duplicates(self):
+        return self.members[1:]
+
+    def relation(self, qualname):
+        """How a non-representative member relates to the representative: "exact", "literals" or "near"."""
+        if qualname in self.exact_copies:
+            return "exact"
+        return "literals" if qualname in self.literal_variants else "near"
+
+    def __repr__(self):
+        names = ", ".join(member.qualname for member in self.members)
+        return f"DuplicateCluster({'exact' if self.exact else f'~{self.similarity:.0%}'}: {names})"
+
+class DuplicateIndex:
+    """Duplicate clusters of one source file, with lookups by qualname."""
+
+    def __init__(self, clusters):
+        self.clusters = clusters
+        self.representative_of = {}
+        self._clusters_by_name = {}
+        for cluster in clusters:
+            for member in cluster.members:
+                self._clusters_by_name[member.qualname] = cluster
+            for member in cluster.duplicates:
+                self.representative_of[member.qualname] = cluster.representative.qualname
+
+    def is_duplicate(self, qualname):
+        """True for every cluster member except the representative."""
+        return qualname in self.representative_of
+
+    def cluster_of(self, qualname):
+        return self._clusters_by_name.get(qualname)
+
+def _candidate_symbols(index):
+    # The units that are summarized and indexed on their own: functions and methods
+    # directly in the module or a class. Nested functions go along with their parent.
+    return [symbol for symbol in index.symbols
+            if symbol.is_function and (symbol.parent is None or symbol.parent.kind == "class")]
+
+def _find_clusters(source_code):
+    index = build_symbol_index(source_code)
+    symbols = {(s.lineno, s.col_offset): s for s in _candidate_symbols(index)}
+    if len(symbols) < 2:
+        return []
+    entries = []
+    # Candidates only live in the module body and class bodies, so nothing else is walked.
+    pending = list(ast.parse(source_code).body)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, ast.ClassDef):
+            pending.extend(node.body)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbol = symbols.get((node.lineno, node.col_offset))
+            if symbol is not None:
+                tokens, literals = normalize(node)
+                if len(tokens) >= MIN_TOKENS:
+                    entries.append((symbol, tokens, literals))
+    entries.sort(key=lambda entry: entry[0].lineno)
+    if len(entries) < 2:
+        return []
+
+    # Functions with the same normalized code (literals aside) share a fingerprint;
+    # only one of each group needs a signature.
+    union = _UnionFind(len(entries))
+    fingerprints, first_with_fingerprint, unique = {}, [], []
+    for i, (_, tokens, _) in enumerate(entries):
+        digest = hashlib.sha1("\0".join(tokens).encode("utf-8")).digest()
+        if digest in fingerprints:
+            union.union(fingerprints[digest], i)
+        else:
+            fingerprints[digest] = i
+            unique.append(i)
+        first_with_fingerprint.append(fingerprints[digest])
+
+    signatures = dict(zip(unique, minhash_signatures([entries[i][1] for i in unique])))
+    buckets = {}
+    for i in unique:
+        bands = signatures[i].reshape(BANDS, ROWS)
+        for band in range(BANDS):
+            buckets.setdefault((band, bands[band].tobytes()), []).append(i)
+    # Every pair in a bucket is a candidate; pairs already in one cluster are not re-checked.
+    merged = []  # (member, estimated similarity) for each pair that joined two clusters
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        stacked = np.stack([signatures[i] for i in members])
+        for a, i in enumerate(members[:-1]):
+            estimates = (stacked[a + 1:] == stacked[a]).mean(axis=1)
+            for j, estimate in zip(members[a + 1:], estimates.tolist()):
+                if estimate >= SIMILARITY_THRESHOLD and union.find(i) != union.find(j):
+                    union.union(i, j)
+                    merged.append((j, estimate))
+
+    groups = OrderedDict()
+    for i in range(len(entries)):
+        groups.setdefault(union.find(i), []).append(i)
+    lowest = {}
+    for i, estimate in merged:
+        root = union.find(i)
+        lowest[root] = min(lowest.get(root, 1.0), estimate)
+    clusters = []
+    for root, members in groups.items():
+        if len(members) < 2:
+            continue
+        representative = members[0]
+        rep_literals = entries[representative][2]
+        exact_copies, literal_variants = set(), {}
+        for i in members[1:]:
+            symbol, _, literals = entries[i]
+            if first_with_fingerprint[i] != first_with_fingerprint[representative]:
+                continue
+            if literals == rep_literals:
+                exact_copies.add(symbol.qualname)
+            else:
+                literal_variants[symbol.qualname] = [(literal, other) for literal, other in zip(literals, rep_literals)
+                                                     if literal != other]
+        clusters.append(DuplicateCluster([entries[i][0] for i in members], exact_copies, literal_variants,
+                                         lowest.get(root, 1.0)))
+    return clusters
+
+_CACHE_SIZE = 16
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def find_duplicates(source_code):
+    """
+    Groups the functions and methods of source_code into duplicate clusters over
+    AST-normalized code (local names and literals canonicalized): equal fingerprints
+    first, then MinHash/LSH for near-duplicates. Only members whose literals match the
+    representative's too count as exact copies. Results are cached by source hash.
+    Raises SyntaxError if the code cannot be parsed.
+    """
+    key = source_hash(source_code)
+    with _cache_lock:
+        duplicates = _cache.get(key)
+        if duplicates is not None:
+            _cache.move_to_end(key)
+            return duplicates
+    duplicates = DuplicateIndex(_find_clusters(source_code))
+    with _cache_lock:
+        _cache[key] = duplicates
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return duplicates
+
+def describe_literals(differences):
+    """Describes literal differences as "'b' instead of 'a', 2 instead of 1"."""
+    return ", ".join(f"{literal} instead of {other}" for literal, other in differences)
+
+def collapse_duplicates(source_code):
+    """
+    Returns source_code with the body of every exact copy replaced by a one-line note
+    pointing at its cluster's representative, so the model reads each implementation
+    once. Literal variants keep their differing literals in the note; near-duplicates
+    are left as they are. Signatures stay, so the code's structure is unchanged. Code
+    that does not parse is returned as is.
+    """
+    try:
+        duplicates = find_duplicates(source_code)
+    except SyntaxError:
+        return source_code
+    if not duplicates.clusters:
+        return source_code
+
+    lines = source_code.split("\n")
+    stubs = []
+    for cluster in duplicates.clusters:
+        representative = cluster.representative.qualname
+        for member in cluster.duplicates:
+            relation = cluster.relation(member.qualname)
+            if relation == "near" or member.body_lineno <= member.lineno:
+                continue  # different code, or a single-line definition: nothing to collapse
+            note = f"same implementation as {representative}"
+            if relation == "literals":
+                note += ", but with " + describe_literals(cluster.literal_variants[member.qualname])
+            body_line = lines[member.body_lineno - 1]
+            indent = body_line[:len(body_line) - len(body_line.lstrip())]
+            stubs.append((member.body_lineno, member.end_lineno, f"{indent}...  # {note}"))
+    for first, last, stub in sorted(stubs, reverse=True):
+        lines[first - 1:last] = [stub]
+    return "\n".join(lines)
@@ -0,0 +1,99 @@
+# code_summarizer/engine.py
+
+from code_summarizer import llm
+from code_summarizer.completer import complete_code_ai, stream_complete_code_ai
+from code_summarizer.dedup import find_duplicates
+from code_summarizer.graph_generator import build_dependency_graph
+from code_summarizer.navigator import extract_functions_and_calls
+from code_summarizer.progress import NULL_PROGRESS
+from code_summarizer.search import semantic_code_search, stream_semantic_code_search
+from code_summarizer.summarizer import MAX_CONCURRENCY, stream_summarize_large_code, summarize_large_code
+from code_summarizer.summary_tree import SummaryTree, ask, stream_ask
+
+TASKS = ("summarize", "summary_tree", "search", "complete", "navigate", "graph")
+
+class Engine:
+    """
+    Headless entry point to every analysis mode. It configures Gemini once and reuses
+    the model client across calls; progress goes to a pluggable ProgressReporter.
+    Front ends (the Streamlit app, the batch CLI) only translate input and output.
+    """
+
+    def __init__(self, model_name=llm.DEFAULT_MODEL, api_key=None, max_workers=MAX_CONCURRENCY,
+                 progress=NULL_PROGRESS, configure=True):
+        self.model_name = model_name
+        self.max_workers = max_workers
+        self.progress = progress
+        if configure:
+            llm.configure(api_key)
+
+    def summarize(self, code, progress=None):
+        return summarize_large_code(code, model_name=self.model_name, max_workers=self.max_workers,
+                                    progress=progress or self.progress)
+
+    def stream_summarize(self, code, progress=None):
+        return stream_summarize_large_code(code, model_name=self.model_name, max_workers=self.max_workers,
+                                           progress=progress or self.progress)
+
+    def summary_tree(self, code, module_name="module", progress=None):
+        """Per-definition summaries rolled up to the module; unchanged parts come from the store."""
+        tree = SummaryTree(model_name=self.model_name, max_workers=self.max_workers)
+        return tree.summarize_module(code, module_name, progress=progress or self.progress)
+
+    def ask(self, node, question):
+        return ask(node, question, model_name=self.model_name)
+
+    def stream_ask(self, node, question):
+        return stream_ask(node, question, model_name=self.model_name)
+
+    def search(self, code, query, progress=None):
+        return semantic_code_search(code, query, model_name=self.model_name, progress=progress or self.progress)
+
+    def stream_search(self, code, query):
+        return stream_semantic_code_search(code, query, model_name=self.model_name)
+
+    def complete(self, code, progress=None):
+        return complete_code_ai(code, model_name=self.model_name, progress=progress or self.progress)
+
+    def stream_complete(self, code):
+        return stream_complete_code_ai(code, model_name=self.model_name)
+
+    def navigate(self, code):
+        """Functions, in-file calls and duplicate clusters as plain, JSON-serializable data."""
+        functions, calls = extract_functions_and_calls(code)
+        try:
+            duplicates = find_duplicates(code).clusters
+        except SyntaxError:
+            duplicates = []
+        return {
+            "functions": [
+                {"name": f.name, "qualname": f.qualname, "kind": f.kind,
+                 "lineno": f.lineno, "end_lineno": f.end_lineno}
+                for f in functions
+            ],
+            "calls": {name: sorted(callees) for name, callees in calls.items()},
+            "duplicates": [[member.qualname for member in cluster.members] for cluster in duplicates],
+        }
+
+    def dependency_graph(self, code):
+        """Dependency graph nodes and edges as plain, JSON-serializable data."""
+        graph = build_dependency_graph(code)
+        return {"nodes": sorted(graph.nodes()), "edges": sorted(graph.edges())}
+
+    def run(self, task, code, query=None, progress=None):
+        """Runs one task by name (one of TASKS) and returns its result."""
+        if task == "summarize":
+            return self.summarize(code, progress)
+        if task == "summary_tree":
+            return self.summary_tree(code, progress=progress).to_dict()
+        if task == "search":
+            if not query:
+                raise ValueError("The search task needs a query.")
+            return self.search(code, query, progress)
+        if task == "complete":
+            return self.complete(code, progress)
+        if task == "navigate":
+            return self.navigate(code)
+        if task == "graph":
+            return self.dependency_graph(code)
+        raise ValueError(f"Unknown task '{task}'. Expected one of: {', '.join(TASKS)}.")
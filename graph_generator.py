@@ -1,48 +1,190 @@
 # code_summarizer/graph_generator_ast.py
 
-import ast
+import hashlib
+import threading
+from collections import OrderedDict
+
 import networkx as nx
 import matplotlib.pyplot as plt
 
-class DependencyGraphBuilder(ast.NodeVisitor):
-    def __init__(self):
-        self.graph = nx.DiGraph()
-        self.current_scope = []
-
-    def visit_FunctionDef(self, node):
-        self.current_scope.append(node.name)
-        self.graph.add_node(node.name)
-        self.generic_visit(node)
-        self.current_scope.pop()
-
-    def visit_ClassDef(self, node):
-        self.current_scope.append(node.name)
-        self.graph.add_node(node.name, node_color='lightgreen')
-        for base in node.bases:
-            if isinstance(base, ast.Name):
-                self.graph.add_edge(base.id, node.name)
-        self.generic_visit(node)
-        self.current_scope.pop()
-
-    def visit_Call(self, node):
-        if self.current_scope:
-            caller = self.current_scope[-1]
-            callee = ""
-            if isinstance(node.func, ast.Name):
-                callee = node.func.id
-            elif isinstance(node.func, ast.Attribute):
-                callee = node.func.attr
-            if callee:
-                self.graph.add_edge(caller, callee)
-        self.generic_visit(node)
-
-def build_dependency_graph_from_code(source_code):
-    tree = ast.parse(source_code)
-    builder = DependencyGraphBuilder()
-    builder.visit(tree)
-    fig, ax = plt.subplots(figsize=(10, 8))
-    pos = nx.spring_layout(builder.graph, seed=42)
-    nx.draw(builder.graph, pos, with_labels=True, node_color='skyblue', 
-            edge_color='gray', node_size=2500, font_size=10, ax=ax,
-            arrows=True, arrowstyle='->', arrowsize=20)
-    return fig
\ No newline at end of file
+from code_summarizer.symbols import build_symbol_index
+from code_summarizer.tracing import span
+
+# Graphs up to this size use the spring layout; larger ones use a linear-time layered layout.
+SPRING_LAYOUT_LIMIT = 150
+# Default caps on how many nodes and edges are drawn.
+MAX_RENDERED_NODES = 300
+MAX_RENDERED_EDGES = 2000
+# Node labels are only drawn when there are few enough nodes to read them.
+LABEL_LIMIT = 250
+# Arrowheads are drawn as one patch per edge, so they are dropped on dense graphs.
+ARROW_EDGE_LIMIT = 400
+
+def build_dependency_graph(source_code):
+    """
+    Builds a DiGraph of classes and functions from the shared symbol index.
+    Edges point from base class to subclass and from caller to callee. Each node's
+    "group" attribute names its enclosing class, used to collapse large graphs.
+    """
+    index = build_symbol_index(source_code)
+    with span("graph.build", symbols=len(index.symbols)) as stage:
+        graph = _symbol_graph(index)
+        stage.set(nodes=graph.number_of_nodes(), edges=graph.number_of_edges())
+    return graph
+
+def _symbol_graph(index):
+    graph = nx.DiGraph()
+    for symbol in index.symbols:
+        if symbol.kind == "class":
+            graph.add_node(symbol.name, node_color='lightgreen', group=symbol.name)
+            for base in symbol.bases:
+                graph.add_edge(base.rsplit(".", 1)[-1], symbol.name)
+        else:
+            owner = symbol.parent.name if symbol.parent and symbol.parent.kind == "class" else symbol.name
+            graph.add_node(symbol.name, group=owner)
+        for callee in symbol.calls:
+            graph.add_edge(symbol.name, callee.rsplit(".", 1)[-1])
+    return graph
+
+def focus_subgraph(graph, focus, radius=2):
+    """Nodes within radius hops of focus, following edges in either direction."""
+    if focus not in graph:
+        raise KeyError(f"'{focus}' is not in the graph.")
+    return graph.subgraph(nx.ego_graph(graph, focus, radius=radius, undirected=True)).copy()
+
+def collapse_graph(graph, group_of=None):
+    """
+    Merges nodes that share a group (a class, or a module for repository graphs) into a
+    single node. group_of(node) defaults to the node's "group" attribute.
+    """
+    if group_of is None:
+        group_of = lambda node: graph.nodes[node].get("group") or node
+    groups = {node: group_of(node) for node in graph}
+    collapsed = nx.DiGraph()
+    for node, group in groups.items():
+        if group in collapsed:
+            collapsed.nodes[group]["size"] += 1
+        else:
+            collapsed.add_node(group, size=1)
+    for u, v in graph.edges():
+        if groups[u] != groups[v]:
+            collapsed.add_edge(groups[u], groups[v])
+    return collapsed
+
+def limit_graph(graph, max_nodes=MAX_RENDERED_NODES, group_of=None, max_edges=MAX_RENDERED_EDGES):
+    """
+    Reduces graph to at most max_nodes: first by collapsing groups, then by keeping
+    the most connected nodes. Then keeps at most max_edges edges, those between the
+    most connected nodes. Returns (graph, note) where note describes any reduction.
+    """
+    notes = []
+    total = graph.number_of_nodes()
+    if total > max_nodes:
+        graph = collapse_graph(graph, group_of)
+        notes.append(f"Collapsed {total} nodes into {graph.number_of_nodes()} groups")
+        if graph.number_of_nodes() > max_nodes:
+            keep = sorted(graph.degree, key=lambda item: item[1], reverse=True)[:max_nodes]
+            graph = graph.subgraph(node for node, _ in keep).copy()
+            notes[-1] += f"; showing the {max_nodes} most connected"
+    edges = graph.number_of_edges()
+    if edges > max_edges:
+        degree = dict(graph.degree)
+        ranked = sorted(graph.edges, key=lambda edge: degree[edge[0]] + degree[edge[1]], reverse=True)
+        graph = graph.copy()
+        graph.remove_edges_from(ranked[max_edges:])
+        notes.append(f"dropped {edges - max_edges} of {edges} edges")
+    if not notes:
+        return graph, ""
+    note = "; ".join(notes)
+    return graph, note[0].upper() + note[1:] + "."
+
+def layered_layout(graph):
+    """
+    Linear-time layout: strongly connected components are ordered into layers by
+    topological generation and nodes are spread evenly within each layer.
+    """
+    condensed = nx.condensation(graph)
+    members = condensed.graph["mapping"]
+    layer_of = {}
+    for depth, generation in enumerate(nx.topological_generations(condensed)):
+        for component in generation:
+            layer_of[component] = depth
+    layers = {}
+    for node in graph:
+        layers.setdefault(layer_of[members[node]], []).append(node)
+    pos = {}
+    for depth, nodes in layers.items():
+        count = len(nodes)
+        for i, node in enumerate(sorted(nodes, key=str)):
+            pos[node] = (float(depth), (i - (count - 1) / 2) / max(count, 1))
+    return pos
+
+_LAYOUT_CACHE_SIZE = 32
+_layout_cache = OrderedDict()
+_layout_cache_lock = threading.Lock()
+
+def compute_layout(graph):
+    """Node positions for graph, cached by graph structure so reruns skip the layout."""
+    digest = hashlib.sha1()
+    for node in sorted(map(str, graph.nodes())):
+        digest.update(node.encode("utf-8") + b"\0")
+    for u, v in sorted((str(u), str(v)) for u, v in graph.edges()):
+        digest.update(f"{u}->{v}\0".encode("utf-8"))
+    key = digest.hexdigest()
+    with _layout_cache_lock:
+        if key in _layout_cache:
+            _layout_cache.move_to_end(key)
+            span("graph.layout", cache="hit").finish()
+            return _layout_cache[key]
+
+    with span("graph.layout", cache="miss", nodes=graph.number_of_nodes()) as stage:
+        if graph.number_of_nodes() <= SPRING_LAYOUT_LIMIT:
+            stage.set(layout="spring")
+            pos = nx.spring_layout(graph, seed=42)
+        else:
+            stage.set(layout="layered")
+            pos = layered_layout(graph)
+
+    with _layout_cache_lock:
+        _layout_cache[key] = pos
+        while len(_layout_cache) > _LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+    return pos
+
+def render_graph(graph, max_nodes=MAX_RENDERED_NODES, focus=None, radius=2, group_of=None,
+                 max_edges=MAX_RENDERED_EDGES):
+    """Draws graph with matplotlib, reducing it to a readable size first."""
+    with span("graph.reduce", nodes=graph.number_of_nodes(), edges=graph.number_of_edges()):
+        if focus:
+            graph = focus_subgraph(graph, focus, radius)
+        graph, note = limit_graph(graph, max_nodes, group_of, max_edges)
+    count = graph.number_of_nodes()
+
+    pos = compute_layout(graph)
+    with span("graph.draw", nodes=count, edges=graph.number_of_edges()):
+        return _draw(graph, pos, focus, note)
+
+def _draw(graph, pos, focus, note):
+    count = graph.number_of_nodes()
+    fig, ax = plt.subplots(figsize=(10, 8) if count <= 50 else (16, 12))
+    # Shrink nodes and drop arrowheads and labels as the graph grows; plain line
+    # collections draw thousands of edges far faster than arrow patches.
+    node_size = max(30, min(2500, 60000 // max(count, 1)))
+    # Collapsed groups are drawn larger, in proportion to the square root of their size.
+    sizes = [node_size * graph.nodes[n].get("size", 1) ** 0.5 for n in graph]
+    colors = ['gold' if n == focus else 'skyblue' for n in graph]
+    nx.draw_networkx_nodes(graph, pos, node_size=sizes, node_color=colors, ax=ax)
+    if graph.number_of_edges() <= ARROW_EDGE_LIMIT:
+        nx.draw_networkx_edges(graph, pos, edge_color='gray', ax=ax, node_size=sizes,
+                               arrows=True, arrowstyle='->', arrowsize=20 if count <= 50 else 8)
+    else:
+        nx.draw_networkx_edges(graph, pos, edge_color='gray', width=0.3, alpha=0.5, ax=ax, arrows=False)
+    if count <= LABEL_LIMIT:
+        nx.draw_networkx_labels(graph, pos, font_size=10 if count <= 50 else 6, ax=ax)
+    if note:
+        ax.set_title(note, fontsize=10)
+    ax.set_axis_off()
+    return fig
+
+def build_dependency_graph_from_code(source_code, max_nodes=MAX_RENDERED_NODES, focus=None, radius=2):
+    return render_graph(build_dependency_graph(source_code), max_nodes=max_nodes, focus=focus, radius=radius)
@@ -0,0 +1,158 @@
+# code_summarizer/llm.py
+
+import os
+import threading
+
+import google.generativeai as genai
+
+from code_summarizer.cache import get_response_cache, make_key
+from code_summarizer.mock_backend import MockModel
+from code_summarizer.scheduler import BULK, get_scheduler
+from code_summarizer.tokens import calibrate, estimate_tokens
+from code_summarizer.tracing import iterate_in_span, span
+
+DEFAULT_MODEL = "models/gemini-pro-latest"
+# Prompts shorter than this are too small a sample to calibrate the token estimate on.
+CALIBRATION_MIN_TOKENS = 200
+
+_models = {}
+_models_lock = threading.Lock()
+_configured = False
+_calibrated = False
+
+def use_mock_backend():
+    """True when CODE_NAVIGATOR_BACKEND=mock selects the offline mock model."""
+    return os.getenv("CODE_NAVIGATOR_BACKEND", "gemini").lower() == "mock"
+
+def cache_model_name(model_name=DEFAULT_MODEL):
+    """
+    The name responses and summaries by model_name are stored under. The mock backend
+    gets its own names, so its canned replies never answer prompts for the real model.
+    """
+    return f"mock:{model_name}" if use_mock_backend() else model_name
+
+def configure(api_key=None):
+    """
+    Configures the Gemini SDK once per process. The key defaults to GEMINI_API_KEY.
+    Raises ValueError if no key is available (unless the mock backend is selected).
+    """
+    global _configured
+    if use_mock_backend():
+        _configured = True
+        return
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found. Please create a .env file and add your key.")
+    with _models_lock:
+        genai.configure(api_key=api_key)
+        _models.clear()
+        _configured = True
+
+def get_model(model_name=DEFAULT_MODEL):
+    """Returns a shared GenerativeModel client for model_name, configuring the SDK if needed."""
+    if not _configured:
+        configure()
+    with _models_lock:
+        model = _models.get(model_name)
+        if model is None:
+            model_class = MockModel if use_mock_backend() else genai.GenerativeModel
+            model = _models[model_name] = model_class(model_name)
+        return model
+
+def _calibrate_from(prompt, prompt_tokens, response):
+    """Calibrates estimate_tokens once per process from the prompt token count Gemini reports."""
+    global _calibrated
+    if _calibrated or prompt_tokens < CALIBRATION_MIN_TOKENS:
+        return
+    usage = getattr(response, "usage_metadata", None)
+    actual = getattr(usage, "prompt_token_count", 0) if usage is not None else 0
+    if actual:
+        _calibrated = True
+        calibrate(prompt, actual)
+
+def _request_options(remaining):
+    return {"timeout": remaining} if remaining is not None else None
+
+def generate_text(prompt, model_name=DEFAULT_MODEL, use_cache=True, priority=BULK, timeout=None):
+    """
+    Sends a prompt to Gemini and returns the stripped response text.
+    Identical prompts for the same model are answered from the shared response cache.
+    Uncached calls go through the shared scheduler, which applies rate limits,
+    priority ordering, retries and the optional timeout (in seconds).
+    """
+    prompt_tokens = estimate_tokens(prompt)
+    with span("llm.generate", model=model_name, prompt_tokens=prompt_tokens) as stage:
+        cache = get_response_cache() if use_cache else None
+        key = make_key(cache_model_name(model_name), prompt)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                stage.set(cache="hit", response_tokens=estimate_tokens(cached))
+                return cached
+
+        model = get_model(model_name)
+        response = get_scheduler().call(
+            lambda remaining: model.generate_content(prompt, request_options=_request_options(remaining)),
+            tokens=prompt_tokens, priority=priority, timeout=timeout,
+        )
+        _calibrate_from(prompt, prompt_tokens, response)
+        text = response.text.strip()
+        stage.set(cache="miss" if cache is not None else "off", response_tokens=estimate_tokens(text))
+
+        if cache is not None:
+            cache.set(key, text)
+        return text
+
+def _chunk_text(chunk):
+    """The text of a streamed chunk; "" for chunks without any (e.g. blocked by a safety filter)."""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+def stream_text(prompt, model_name=DEFAULT_MODEL, use_cache=True, priority=BULK, timeout=None):
+    """
+    Like generate_text, but yields the response text piece by piece as Gemini streams it.
+    A cached response is yielded in one piece; a streamed one is cached once complete.
+    Only starting the stream is retried; an error mid-stream is raised to the caller.
+    Chunks without text are skipped, and a response without any text is not cached.
+    """
+    prompt_tokens = estimate_tokens(prompt)
+    stage = span("llm.stream", model=model_name, prompt_tokens=prompt_tokens)
+    yield from iterate_in_span(stage, _stream_pieces(stage, prompt, prompt_tokens, model_name,
+                                                     use_cache, priority, timeout))
+
+def _stream_pieces(stage, prompt, prompt_tokens, model_name, use_cache, priority, timeout):
+    cache = get_response_cache() if use_cache else None
+    key = make_key(cache_model_name(model_name), prompt)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            stage.set(cache="hit", response_tokens=estimate_tokens(cached))
+            yield cached
+            return
+
+    model = get_model(model_name)
+    response = get_scheduler().call(
+        lambda remaining: model.generate_content(prompt, stream=True,
+                                                 request_options=_request_options(remaining)),
+        tokens=prompt_tokens, priority=priority, timeout=timeout,
+    )
+    stage.set(cache="miss" if cache is not None else "off")
+    parts = []
+    for chunk in response:
+        text = _chunk_text(chunk)
+        if not parts:
+            text = text.lstrip()
+        if not text:
+            stage.add("empty_chunks")
+            continue
+        if not parts:
+            stage.set(first_piece_seconds=stage.duration)
+        parts.append(text)
+        yield text
+    text = "".join(parts).strip()
+    stage.set(response_tokens=estimate_tokens(text))
+
+    if cache is not None and text:
+        cache.set(key, text)
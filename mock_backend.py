@@ -0,0 +1,66 @@
+# code_summarizer/mock_backend.py
+
+import hashlib
+import os
+import random
+import threading
+import time
+
+from google.api_core import exceptions as api_exceptions
+
+class MockResponse:
+    def __init__(self, text):
+        self.text = text
+
+class MockModel:
+    """
+    Offline stand-in for genai.GenerativeModel with configurable latency and error
+    injection. Responses are deterministic for a given prompt, so results can be
+    compared across runs. Settings default to the MOCK_* environment variables.
+    """
+
+    def __init__(self, model_name, latency=None, jitter=None, error_rate=None,
+                 stream_pieces=4, seed=None):
+        self.model_name = model_name
+        self.latency = float(os.getenv("MOCK_LATENCY", "0.5")) if latency is None else latency
+        self.jitter = float(os.getenv("MOCK_JITTER", "0.1")) if jitter is None else jitter
+        self.error_rate = float(os.getenv("MOCK_ERROR_RATE", "0")) if error_rate is None else error_rate
+        self.stream_pieces = stream_pieces
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _delay_and_maybe_fail(self, request_options):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.error_rate
+            quota = self._random.random() < 0.5
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and delay > timeout:
+            time.sleep(max(0.0, timeout))
+            raise api_exceptions.DeadlineExceeded("Mock request exceeded its deadline.")
+        time.sleep(delay)
+        if fail:
+            if quota:
+                raise api_exceptions.ResourceExhausted("Mock quota exceeded.")
+            raise api_exceptions.ServiceUnavailable("Mock service unavailable.")
+
+    def _text_for(self, prompt):
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12]
+        words = len(prompt.split())
+        return (f"## Mock response ({self.model_name})\n\n"
+                f"Deterministic reply {digest} to a prompt of {words} words.")
+
+    def generate_content(self, prompt, stream=False, request_options=None, **kwargs):
+        self._delay_and_maybe_fail(request_options)
+        text = self._text_for(prompt)
+        if not stream:
+            return MockResponse(text)
+        return self._stream(text)
+
+    def _stream(self, text):
+        size = max(1, -(-len(text) // self.stream_pieces))
+        for start in range(0, len(text), size):
+            time.sleep(self.latency / (self.stream_pieces * 4))
+            yield MockResponse(text[start:start + size])
@@ -1,57 +1,66 @@
 # code_summarizer/ast_navigator.py
 
-import ast
 import networkx as nx
 
-def extract_functions_and_calls(source_code):
+from code_summarizer import ts_parser
+from code_summarizer.symbols import build_symbol_index
+from code_summarizer.tracing import span
+
+def parse_source(source_code, path=None):
+    """
+    Symbol index of source_code. path names a file being edited: when Tree-sitter is
+    available it is parsed incrementally between versions of that file, valid or not.
+    Otherwise the ast module is used, and code with syntax errors (e.g. code still being
+    written) falls back to Tree-sitter, with index.partial set; without Tree-sitter,
+    SyntaxError is raised.
+    """
+    if path is not None and ts_parser.is_available():
+        with span("navigate.parse", backend="tree-sitter"):
+            return ts_parser.parse_symbols(source_code, path)
+    with span("navigate.parse", backend="ast") as stage:
+        try:
+            return build_symbol_index(source_code)
+        except SyntaxError:
+            if not ts_parser.is_available():
+                raise
+            stage.set(backend="tree-sitter")
+            return ts_parser.parse_symbols(source_code, path)
+
+def extract_functions_and_calls(source_code, path=None):
     """
     Parses the source code using AST to find all functions and their calls.
     Returns a list of function metadata and a dictionary of calls.
+    Code with syntax errors is mapped as far as it can be recovered (see parse_source).
     """
-    tree = ast.parse(source_code)
-    functions = []
-    calls = {}
-
-    # First pass: Collect all function definitions
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef):
-            functions.append(node)
-            calls[node.name] = set()
+    return functions_and_calls(parse_source(source_code, path))
 
-    # Second pass: For each function, find the calls it makes
-    class CallVisitor(ast.NodeVisitor):
-        def __init__(self, current_func_name):
-            self.current_func_name = current_func_name
-
-        def visit_Call(self, call_node):
-            if isinstance(call_node.func, ast.Name):
-                # Ensure we don't add calls to functions not defined in the source
-                if call_node.func.id in calls:
-                    calls[self.current_func_name].add(call_node.func.id)
-            self.generic_visit(call_node)
-
-    for func_node in functions:
-        visitor = CallVisitor(func_node.name)
-        visitor.visit(func_node)
+def functions_and_calls(index):
+    """
+    The (functions, calls) pair of extract_functions_and_calls for an existing symbol
+    index, e.g. one returned by parse_source.
+    """
+    functions = index.functions
+    calls = {func.name: set() for func in functions}
 
-    # Prepare function metadata for the UI
-    func_metadata = []
-    for func_node in functions:
-        # ast.get_source_segment is a reliable way to get the function's code
-        source_segment = ast.get_source_segment(source_code, func_node)
-        func_metadata.append({
-            "name": func_node.name,
-            "lineno": func_node.lineno,
-            "end_lineno": func_node.end_lineno,
-            "code": source_segment
-        })
+    # Calls are attributed to the innermost enclosing function, and only calls to
+    # plain names defined in the source are kept.
+    for func in functions:
+        for callee in func.calls:
+            if callee in calls:
+                calls[func.name].add(callee)
 
-    return func_metadata, calls
+    # Function metadata for the UI: each entry supports func["name"], func["lineno"],
+    # func["end_lineno"] and func["code"]; the code is sliced from the source on access.
+    return functions, calls
 
 def build_call_graph(calls):
     """
     Builds a networkx DiGraph from the calls dictionary.
     """
+    with span("navigate.call_graph", functions=len(calls)):
+        return _build_call_graph(calls)
+
+def _build_call_graph(calls):
     G = nx.DiGraph()
     for caller, callees in calls.items():
         # Add the caller node even if it calls nothing
@@ -64,12 +73,10 @@ def graph_to_dot(G):
     """
     Converts a networkx graph to the Graphviz DOT language format.
     """
-    dot = "digraph G {\n"
-    dot += '  rankdir="LR";\n'  # Left-to-right layout
-    dot += '  node [shape=box, style="rounded,filled", fillcolor="skyblue"];\n'
-    for node in G.nodes():
-        dot += f'  "{node}";\n'
-    for u, v in G.edges():
-        dot += f'  "{u}" -> "{v}";\n'
-    dot += "}"
-    return dot
\ No newline at end of file
+    lines = ["digraph G {"]
+    lines.append('  rankdir="LR";')  # Left-to-right layout
+    lines.append('  node [shape=box, style="rounded,filled", fillcolor="skyblue"];')
+    lines.extend(f'  "{node}";' for node in G.nodes())
+    lines.extend(f'  "{u}" -> "{v}";' for u, v in G.edges())
+    lines.append("}")
+    return "\n".join(lines)
@@ -0,0 +1,33 @@
+# code_summarizer/progress.py
+
+import sys
+
+class ProgressReporter:
+    """
+    Receives progress from the analysis functions. The base class ignores everything,
+    so library code can always call it; front ends subclass it to display progress.
+    """
+
+    def info(self, message):
+        """A one-off status message."""
+
+    def update(self, fraction, message):
+        """Progress of a long-running step, with fraction between 0 and 1."""
+
+    def done(self):
+        """The long-running step has finished; any progress display can be removed."""
+
+NULL_PROGRESS = ProgressReporter()
+
+class StreamProgress(ProgressReporter):
+    """Writes progress as plain text lines, e.g. to stderr for command-line runs."""
+
+    def __init__(self, stream=None, prefix=""):
+        self.stream = stream or sys.stderr
+        self.prefix = prefix
+
+    def info(self, message):
+        self.stream.write(f"{self.prefix}{message}\n")
+
+    def update(self, fraction, message):
+        self.stream.write(f"{self.prefix}[{fraction:4.0%}] {message}\n")
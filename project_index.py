@@ -0,0 +1,236 @@
+# code_summarizer/project_index.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from code_summarizer.cache import get_cache_dir
+from code_summarizer.symbols import build_symbol_index, source_hash
+
+def definition_hash(code):
+    return hashlib.sha1(code.encode("utf-8")).hexdigest()
+
+class FileDiff:
+    """
+    Which definitions of a file were added, changed, removed or left alone by an update,
+    and the file's call edges right after it, in the shape ProjectIndex.calls returns.
+    """
+
+    def __init__(self, added=(), changed=(), removed=(), unchanged=(), calls=None):
+        self.added = list(added)
+        self.changed = list(changed)
+        self.removed = list(removed)
+        self.unchanged = list(unchanged)
+        self.calls = calls if calls is not None else {}
+
+    @property
+    def dirty(self):
+        """Definitions whose parsed facts were recomputed by the update."""
+        return self.added + self.changed
+
+    def __repr__(self):
+        return (f"FileDiff(added={len(self.added)}, changed={len(self.changed)}, "
+                f"removed={len(self.removed)}, unchanged={len(self.unchanged)})")
+
+class ProjectIndex:
+    """
+    Persistent per-file and per-definition index stored in SQLite. Each definition is
+    keyed by a hash of its source, so re-analysing a file only rewrites the symbols and
+    call edges of definitions that changed, and only those need new LLM summaries.
+    Summaries are stored per (definition hash, model). Those not used for max_age
+    seconds are dropped, and the least recently used ones beyond max_summary_bytes.
+    """
+
+    def __init__(self, path=None, max_summary_bytes=50 * 1024 * 1024, max_age=90 * 24 * 3600):
+        self.path = path or get_cache_dir("project_index.sqlite3")
+        self.max_summary_bytes = max_summary_bytes
+        self.max_age = max_age
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(summaries)")]
+        if columns and "model" not in columns:
+            # Summaries from before they were keyed by model: their model is unknown.
+            self._db.execute("DROP TABLE summaries")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY, hash TEXT NOT NULL, updated REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS definitions ("
+            " path TEXT NOT NULL, qualname TEXT NOT NULL, kind TEXT NOT NULL,"
+            " lineno INTEGER NOT NULL, end_lineno INTEGER NOT NULL, hash TEXT NOT NULL,"
+            " calls TEXT NOT NULL, PRIMARY KEY (path, qualname));"
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " hash TEXT NOT NULL, model TEXT NOT NULL, summary TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL, PRIMARY KEY (hash, model));"
+        )
+        self._db.commit()
+
+    def update(self, file_path, source_code, index=None):
+        """
+        Brings the index for file_path up to date with source_code and returns a FileDiff,
+        including the file's call edges as they were right after this update.
+        An unchanged file is detected from its hash without parsing it. index is an
+        already built symbol index of source_code, such as the Tree-sitter one that
+        navigator.parse_source returns for code with syntax errors. Without it, raises
+        SyntaxError if the code cannot be parsed.
+        """
+        file_hash = source_hash(source_code)
+        with self._lock:
+            stored = dict(self._db.execute(
+                "SELECT qualname, hash FROM definitions WHERE path = ?", (file_path,)
+            ).fetchall())
+            row = self._db.execute("SELECT hash FROM files WHERE path = ?", (file_path,)).fetchone()
+            if row is not None and row[0] == file_hash:
+                return FileDiff(unchanged=stored, calls=self._calls(file_path))
+
+        if index is None:
+            index = build_symbol_index(source_code)
+        diff = FileDiff()
+        current = {}
+        for symbol in index.symbols:
+            # Later duplicates of the same qualname (e.g. redefinitions) replace earlier ones.
+            current[symbol.qualname] = symbol
+        rows = []
+        for qualname, symbol in current.items():
+            code_hash = definition_hash(symbol.code)
+            if qualname not in stored:
+                diff.added.append(qualname)
+            elif stored[qualname] != code_hash:
+                diff.changed.append(qualname)
+            else:
+                diff.unchanged.append(qualname)
+                continue
+            rows.append((file_path, qualname, symbol.kind, symbol.lineno, symbol.end_lineno,
+                         code_hash, json.dumps(sorted(set(symbol.calls)))))
+        diff.removed = [qualname for qualname in stored if qualname not in current]
+
+        with self._lock:
+            self._db.executemany(
+                "DELETE FROM definitions WHERE path = ? AND qualname = ?",
+                [(file_path, qualname) for qualname in diff.removed],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO definitions"
+                " (path, qualname, kind, lineno, end_lineno, hash, calls)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            # Unchanged definitions may still have moved when code above them was edited.
+            self._db.executemany(
+                "UPDATE definitions SET lineno = ?, end_lineno = ? WHERE path = ? AND qualname = ?",
+                [(current[q].lineno, current[q].end_lineno, file_path, q) for q in diff.unchanged],
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, hash, updated) VALUES (?, ?, ?)",
+                (file_path, file_hash, time.time()),
+            )
+            self._db.commit()
+            # Read under the same lock, so no concurrent update of the file slips in between.
+            diff.calls = self._calls(file_path)
+        return diff
+
+    def calls(self, file_path):
+        """
+        Returns the stored call edges of file_path as {function name: set(callees)},
+        keeping only calls to plain names defined in the same file. After update(), the
+        edges of unchanged definitions are the ones stored by earlier analyses.
+        """
+        with self._lock:
+            return self._calls(file_path)
+
+    def _calls(self, file_path):
+        rows = self._db.execute(
+            "SELECT qualname, kind, calls FROM definitions WHERE path = ?", (file_path,)
+        ).fetchall()
+        functions = {qualname.rsplit(".", 1)[-1] for qualname, kind, _ in rows if kind != "class"}
+        calls = {}
+        for qualname, kind, callees in rows:
+            if kind == "class":
+                continue
+            name = qualname.rsplit(".", 1)[-1]
+            calls.setdefault(name, set()).update(c for c in json.loads(callees) if c in functions)
+        return calls
+
+    def get_summaries(self, code_hashes, model_name):
+        """Returns {hash: summary} for those of code_hashes that have a summary by model_name."""
+        code_hashes = list(set(code_hashes))
+        found = {}
+        now = time.time()
+        with self._lock:
+            # SQLite allows a limited number of parameters per statement.
+            for start in range(0, len(code_hashes), 500):
+                batch = code_hashes[start:start + 500]
+                marks = ", ".join("?" * len(batch))
+                found.update(self._db.execute(
+                    "SELECT hash, summary FROM summaries"
+                    f" WHERE model = ? AND accessed >= ? AND hash IN ({marks})",
+                    [model_name, now - self.max_age] + batch,
+                ).fetchall())
+            self._db.executemany("UPDATE summaries SET accessed = ? WHERE hash = ? AND model = ?",
+                                 [(now, code_hash, model_name) for code_hash in found])
+            self._db.commit()
+        return found
+
+    def get_summary(self, code_hash, model_name):
+        return self.get_summaries([code_hash], model_name).get(code_hash)
+
+    def set_summary(self, code_hash, summary, model_name):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries (hash, model, summary, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (code_hash, model_name, summary, len(summary.encode("utf-8")), now, now),
+            )
+            self._evict_summaries(now)
+            self._db.commit()
+
+    def _evict_summaries(self, now):
+        self._db.execute("DELETE FROM summaries WHERE accessed < ?", (now - self.max_age,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+        if total <= self.max_summary_bytes:
+            return
+        stale = []
+        for code_hash, model, size in self._db.execute(
+                "SELECT hash, model, size FROM summaries ORDER BY accessed ASC"):
+            if total <= self.max_summary_bytes:
+                break
+            stale.append((code_hash, model))
+            total -= size
+        self._db.executemany("DELETE FROM summaries WHERE hash = ? AND model = ?", stale)
+
+    def summarize_definitions(self, file_path, source_code, summarize, model_name, kinds=None, map_func=map,
+                              index=None):
+        """
+        Returns {qualname: summary} for the definitions of file_path, calling
+        summarize(code) only for definitions whose content hash has no stored summary
+        by model_name, the model summarize uses (see llm.cache_model_name).
+        map_func can be a concurrent map such as summarizer.map_concurrently. index is
+        an already built symbol index of source_code, as for update().
+        """
+        if index is None:
+            index = build_symbol_index(source_code)
+        symbols = [s for s in index.symbols if kinds is None or s.kind in kinds]
+        hashes = {s.qualname: definition_hash(s.code) for s in symbols}
+        stored = self.get_summaries(hashes.values(), model_name)
+        summaries = {q: stored.get(h) for q, h in hashes.items()}
+        missing = [s for s in symbols if summaries[s.qualname] is None]
+        for symbol, summary in zip(missing, map_func(lambda s: summarize(s.code), missing)):
+            self.set_summary(hashes[symbol.qualname], summary, model_name)
+            summaries[symbol.qualname] = summary
+        return summaries
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+def get_project_index():
+    """Returns the process-wide project index, creating it on first use."""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = ProjectIndex()
+        return _default_index
@@ -0,0 +1,254 @@
+# code_summarizer/repository.py
+
+import multiprocessing
+import os
+import tarfile
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+import networkx as nx
+
+from code_summarizer.symbols import build_symbol_index
+
+SKIPPED_DIRS = {".git", ".hg", ".svn", "__pycache__", ".venv", "venv", "env",
+                "node_modules", "site-packages", ".tox", ".nox", ".mypy_cache", "build", "dist"}
+
+@contextmanager
+def open_repository(path):
+    """
+    Yields a directory containing the repository at path. Directories are used in place;
+    .zip and .tar(.gz/.bz2/.xz) archives are unpacked (Python files only) into a
+    temporary directory that is removed afterwards.
+    """
+    if os.path.isdir(path):
+        yield path
+        return
+    with tempfile.TemporaryDirectory(prefix="code_navigator_") as tmp_dir:
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                members = [name for name in archive.namelist() if name.endswith(".py")]
+                archive.extractall(tmp_dir, members)
+        elif tarfile.is_tarfile(path):
+            with tarfile.open(path) as archive:
+                members = [m for m in archive.getmembers() if m.isfile() and m.name.endswith(".py")]
+                archive.extractall(tmp_dir, members, filter="data")
+        else:
+            raise ValueError(f"{path} is neither a directory nor a .zip/.tar archive.")
+        yield tmp_dir
+
+def discover_python_files(root):
+    """Yields (path, module_name, is_package) for every .py file under root."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIPPED_DIRS and not d.startswith("."))
+        for filename in sorted(filenames):
+            if not filename.endswith(".py"):
+                continue
+            path = os.path.join(dirpath, filename)
+            parts = os.path.relpath(path, root)[:-3].split(os.sep)
+            is_package = parts[-1] == "__init__"
+            if is_package:
+                parts = parts[:-1]
+            yield path, ".".join(parts) or "__init__", is_package
+
+def parse_module(job):
+    """
+    Parses one file in a worker process. Returns only compact, picklable facts about the
+    module (no source text), so memory stays bounded however large the repository is.
+    """
+    path, module, is_package = job
+    record = {"module": module, "path": path, "is_package": is_package, "lines": 0,
+              "definitions": [], "calls": [], "imports": {}, "imported_modules": [], "error": None}
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            source_code = f.read()
+        record["lines"] = source_code.count("\n") + 1
+        index = build_symbol_index(source_code)
+    except (SyntaxError, ValueError, OSError, RecursionError, MemoryError) as e:
+        # Deeply nested or huge files exhaust the parser; they fail alone, not the whole run.
+        record["error"] = f"{type(e).__name__}: {e}"
+        return record
+    for symbol in index.symbols:
+        record["definitions"].append((symbol.qualname, symbol.kind, symbol.lineno, symbol.end_lineno))
+        owner = symbol.parent.qualname if symbol.parent and symbol.parent.kind == "class" else None
+        for callee in set(symbol.calls):
+            record["calls"].append((symbol.qualname, owner, callee))
+    record["imports"] = index.imports
+    record["imported_modules"] = index.imported_modules
+    return record
+
+class RepositoryGraph:
+    """Merged definitions, call edges (within and across modules) and module import edges of a repository."""
+
+    def __init__(self):
+        self.modules = {}       # module -> {"path", "lines", "definitions", "error"}
+        self.definitions = {}   # "module.qualname" -> (module, kind, lineno, end_lineno)
+        self.call_edges = set()
+        self.module_edges = set()
+        self._pending = []      # (module, is_package, imports, imported_modules, calls) to resolve
+
+    def add(self, record):
+        module = record["module"]
+        self.modules[module] = {"path": record["path"], "lines": record["lines"],
+                                "definitions": len(record["definitions"]), "error": record["error"]}
+        for qualname, kind, lineno, end_lineno in record["definitions"]:
+            self.definitions[f"{module}.{qualname}"] = (module, kind, lineno, end_lineno)
+        if record["error"] is None:
+            self._pending.append((module, record["is_package"], record["imports"],
+                                  record["imported_modules"], record["calls"]))
+
+    def resolve(self):
+        """Resolves imports and call targets once every module has been added."""
+        for module, is_package, imports, imported_modules, calls in self._pending:
+            package = module if is_package else module.rpartition(".")[0]
+            targets = {alias: self._absolute(target, package) for alias, target in imports.items()}
+            # "import a.b" binds only "a"; depend on "a.b" itself rather than on "a".
+            bound_heads = {name.split(".", 1)[0] for name in imported_modules}
+            dependencies = {target for alias, target in targets.items()
+                            if not (alias == target and alias in bound_heads)}
+            for target in dependencies | set(imported_modules):
+                imported = self._module_of(target)
+                if imported and imported != module:
+                    self.module_edges.add((module, imported))
+            for caller, owner, callee in calls:
+                resolved = self._resolve_call(module, owner, callee, targets)
+                if resolved:
+                    self.call_edges.add((f"{module}.{caller}", resolved))
+        self._pending = []
+        return self
+
+    def _absolute(self, target, package):
+        level = len(target) - len(target.lstrip("."))
+        if not level:
+            return target
+        base = package.split(".") if package else []
+        if level > 1:
+            base = base[:len(base) - (level - 1)]
+        return ".".join(base + [target[level:]]) if target[level:] else ".".join(base)
+
+    def _module_of(self, target):
+        while target:
+            if target in self.modules:
+                return target
+            target = target.rpartition(".")[0]
+        return None
+
+    def _resolve_call(self, module, owner, callee, imports):
+        if callee.startswith("."):
+            return None
+        head, _, rest = callee.partition(".")
+        if head == "self" and owner and rest:
+            candidate = f"{module}.{owner}.{rest}"
+        elif head in imports:
+            candidate = f"{imports[head]}.{rest}" if rest else imports[head]
+        else:
+            candidate = f"{module}.{callee}"
+        return candidate if candidate in self.definitions else None
+
+    def module_graph(self):
+        graph = nx.DiGraph()
+        graph.add_nodes_from(self.modules)
+        graph.add_edges_from(self.module_edges)
+        return graph
+
+    def call_graph(self):
+        """Call graph whose nodes carry their module as the "group" attribute."""
+        graph = nx.DiGraph()
+        graph.add_edges_from(self.call_edges)
+        for node in graph:
+            graph.nodes[node]["group"] = self.definitions[node][0]
+        return graph
+
+    def cross_module_edges(self):
+        """The call edges whose caller and callee are defined in different modules."""
+        return {(caller, callee) for caller, callee in self.call_edges
+                if self.definitions[caller][0] != self.definitions[callee][0]}
+
+    def call_map(self):
+        """Calls in the {caller: set(callees)} shape used by navigator.build_call_graph."""
+        calls = {}
+        for caller, callee in self.call_edges:
+            calls.setdefault(caller, set()).add(callee)
+        return calls
+
+def _pool_context():
+    methods = multiprocessing.get_all_start_methods()
+    # forkserver/spawn avoid forking the multi-threaded server process itself (see sandbox.py).
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _crashed_record(job):
+    path, module, is_package = job
+    return {"module": module, "path": path, "is_package": is_package, "lines": 0,
+            "definitions": [], "calls": [], "imports": {}, "imported_modules": [],
+            "error": "BrokenProcessPool: the worker parsing this file died (out of memory?)"}
+
+def _parse_alone(job, context):
+    """Re-parses one file in its own worker, so a crash is pinned on the file that caused it."""
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            return executor.submit(parse_module, job).result()
+    except BrokenProcessPool:
+        return _crashed_record(job)
+
+def index_repository(path, max_workers=None, on_progress=None):
+    """
+    Discovers and parses every .py file under path (a directory or archive) on a process
+    pool, then merges them into a RepositoryGraph. on_progress(done, total, module) is
+    called from the calling thread after each file. If a worker dies (e.g. killed for
+    using too much memory), the files it took down are re-parsed one at a time and only
+    the one that crashes again is recorded as failed.
+    """
+    graph = RepositoryGraph()
+    with open_repository(path) as root:
+        jobs = list(discover_python_files(root))
+        total = len(jobs)
+        if not total:
+            return graph
+        workers = max_workers or os.cpu_count() or 1
+        context = _pool_context()
+        # Keep a bounded number of files in flight so results are merged as they stream in.
+        max_in_flight = workers * 4
+        done_count = 0
+        suspects = []
+
+        def merge(record):
+            nonlocal done_count
+            record["path"] = os.path.relpath(record["path"], root)
+            graph.add(record)
+            done_count += 1
+            if on_progress:
+                on_progress(done_count, total, record["module"])
+
+        jobs_iter = iter(jobs)
+        while True:
+            broken = False
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                in_flight = {}
+                while True:
+                    for job in jobs_iter:
+                        in_flight[executor.submit(parse_module, job)] = job
+                        if len(in_flight) >= max_in_flight:
+                            break
+                    if not in_flight:
+                        break
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        job = in_flight.pop(future)
+                        try:
+                            record = future.result()
+                        except BrokenProcessPool:
+                            broken = True
+                            suspects.append(job)
+                            continue
+                        merge(record)
+                    if broken:
+                        # Every other file in flight fails with the pool; retry them below.
+                        suspects.extend(in_flight.values())
+                        break
+            if not broken:
+                break
+        for job in suspects:
+            merge(_parse_alone(job, context))
+    return graph.resolve()
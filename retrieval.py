@@ -0,0 +1,320 @@
+# code_summarizer/retrieval.py
+
+import ast
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import textwrap
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from code_summarizer.cache import get_cache_dir
+from code_summarizer.dedup import MIN_TOKENS, normalize
+from code_summarizer.symbols import FUNCTION_KINDS, build_symbol_index, source_hash
+
+# BM25 parameters.
+K1 = 1.2
+B = 0.75
+# Module-level code outside any definition is split into passages of at most this many lines.
+MODULE_PASSAGE_LINES = 40
+# Part of the on-disk cache path; bump it whenever extract_passages changes its output.
+INDEX_VERSION = 5
+# On-disk indexes unused for longer than this are deleted, and the least recently used
+# ones beyond the size limit, as for the response cache.
+RETRIEVAL_CACHE_MAX_BYTES = 200 * 1024 * 1024
+RETRIEVAL_CACHE_MAX_AGE = 30 * 24 * 3600
+
+_WORD_RE = re.compile(r"[A-Za-z]+|\d+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_STOPWORDS = {"self", "def", "return", "the", "a", "an", "of", "to", "is", "in", "and",
+              "or", "for", "if", "else", "none", "true", "false", "it", "this", "what", "does"}
+
+def tokenize(text):
+    """
+    Splits text into lowercase search terms. Identifiers are kept whole and also split
+    on snake_case and camelCase, so "parseConfig" matches both "parseconfig" and "config".
+    """
+    terms = []
+    for word in re.findall(r"[A-Za-z_][A-Za-z0-9_]*|\d+", text):
+        lowered = word.lower()
+        if lowered not in _STOPWORDS:
+            terms.append(lowered)
+        parts = [p.lower() for piece in _WORD_RE.findall(word) for p in _CAMEL_RE.findall(piece)]
+        if len(parts) > 1:
+            terms.extend(p for p in parts if p not in _STOPWORDS)
+    return terms
+
+def extract_passages(source_code):
+    """
+    Splits code into retrievable passages: one per function or method, a signature-only
+    outline per class, and line blocks for module-level code outside any definition.
+    Unparseable code falls back to line-based chunks.
+    """
+    try:
+        index = build_symbol_index(source_code)
+    except SyntaxError:
+        lines = source_code.splitlines()
+        return [
+            {"title": f"lines {i + 1}-{min(i + MODULE_PASSAGE_LINES, len(lines))}",
+             "text": "\n".join(lines[i:i + MODULE_PASSAGE_LINES])}
+            for i in range(0, len(lines), MODULE_PASSAGE_LINES)
+        ]
+
+    passages = []
+    for symbol in index.symbols:
+        title = f"{symbol.kind.replace('_', ' ')} {symbol.qualname} (lines {symbol.lineno}-{symbol.end_lineno})"
+        if symbol.kind == "class":
+            outline = [symbol.signature]
+            if symbol.docstring:
+                outline.append(f'    """{symbol.docstring}"""')
+            outline.extend(f"    {child.signature} ..." for child in index.symbols
+                           if child.parent is symbol and child.is_function)
+            passages.append({"title": title, "qualname": symbol.qualname, "kind": symbol.kind,
+                             "text": "\n".join(outline)})
+        else:
+            passages.append({"title": title, "qualname": symbol.qualname, "kind": symbol.kind,
+                             "col_offset": symbol.col_offset, "text": symbol.code})
+
+    covered = [False] * (index.line_count + 1)
+    for symbol in index.symbols:
+        if symbol.parent is None:
+            # Decorators belong to the definition, not to the module code around it.
+            for lineno in range(symbol.decorator_lineno, symbol.end_lineno + 1):
+                covered[lineno] = True
+    block = []
+    for lineno in range(1, index.line_count + 1):
+        if not covered[lineno]:
+            block.append(lineno)
+        if block and (covered[lineno] or len(block) == MODULE_PASSAGE_LINES or lineno == index.line_count):
+            text = index.lines(block[0], block[-1]).strip("\n")
+            if text.strip():
+                passages.append({"title": f"module code (lines {block[0]}-{block[-1]})", "text": text})
+            block = []
+    return passages
+
+def _implementation(passage):
+    """
+    (normalized tokens, literals) of a function passage, as dedup.normalize computes
+    them, or None for other passages and functions too short to call duplicates.
+    """
+    if passage.get("kind") not in FUNCTION_KINDS:
+        return None
+    # The first line was sliced at the definition's column; the rest keep their indentation.
+    text = textwrap.dedent(" " * passage.get("col_offset", 0) + passage["text"])
+    try:
+        function = ast.parse(text).body[0]
+    except (SyntaxError, IndexError):
+        return None
+    tokens, literals = normalize(function)
+    return (tuple(tokens), tuple(literals)) if len(tokens) >= MIN_TOKENS else None
+
+def merge_duplicate_hits(passages):
+    """
+    Folds retrieved functions that are exact copies of an earlier one (same code up to
+    local names, see dedup) into its title, and marks copies that only differ in their
+    literals. Only the retrieved passages are compared, so this stays cheap.
+    """
+    merged, first_by_tokens, copies = [], {}, {}
+    for passage in passages:
+        implementation = _implementation(passage)
+        if implementation is None:
+            merged.append(passage)
+            continue
+        tokens, literals = implementation
+        first = first_by_tokens.get(tokens)
+        if first is None:
+            first_by_tokens[tokens] = (len(merged), literals, passage["qualname"])
+            merged.append(passage)
+        elif first[1] == literals:
+            copies.setdefault(first[0], []).append(passage["qualname"])
+        else:
+            merged.append(dict(passage, title=f"{passage['title']}; same code, other literals as {first[2]}"))
+    # Passages belong to the cached index: annotate copies of them, never the originals.
+    for position, names in copies.items():
+        passage = merged[position]
+        merged[position] = dict(passage, title=passage["title"] + "; also implemented by " + ", ".join(sorted(names)))
+    return merged
+
+class RetrievalIndex:
+    """
+    BM25 index over code passages. Postings are stored as CSR-style NumPy arrays
+    (term_ptr, doc_ids, term_freqs) that are memory-mapped from disk when loaded.
+    """
+
+    def __init__(self, passages, vocabulary, term_ptr, doc_ids, term_freqs, doc_lengths):
+        self.passages = passages
+        self.vocabulary = vocabulary
+        self.term_ptr = term_ptr
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.avg_doc_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    @classmethod
+    def build(cls, passages):
+        vocabulary = {}
+        postings = []
+        doc_lengths = np.zeros(len(passages), dtype=np.float32)
+        for doc_id, passage in enumerate(passages):
+            counts = Counter(tokenize(passage["title"] + "\n" + passage["text"]))
+            doc_lengths[doc_id] = sum(counts.values())
+            for term, freq in counts.items():
+                term_id = vocabulary.setdefault(term, len(vocabulary))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((doc_id, freq))
+        term_ptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        term_ptr[1:] = np.cumsum([len(p) for p in postings])
+        doc_ids = np.fromiter((d for p in postings for d, _ in p), dtype=np.int32, count=int(term_ptr[-1]))
+        term_freqs = np.fromiter((f for p in postings for _, f in p), dtype=np.float32, count=int(term_ptr[-1]))
+        return cls(passages, vocabulary, term_ptr, doc_ids, term_freqs, doc_lengths)
+
+    def save(self, directory):
+        """
+        Writes the index to directory atomically: it is written to a temporary directory
+        next to it and renamed into place, so readers never see a half-written index.
+        """
+        parent = os.path.dirname(directory)
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+        try:
+            for name in ("term_ptr", "doc_ids", "term_freqs", "doc_lengths"):
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), getattr(self, name))
+            with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"passages": self.passages, "vocabulary": self.vocabulary}, f)
+            if os.path.isdir(directory) and not os.path.exists(os.path.join(directory, "meta.json")):
+                # Left behind half-written by an older version or a crash.
+                shutil.rmtree(directory, ignore_errors=True)
+            try:
+                os.replace(tmp_dir, directory)
+            except OSError:
+                pass  # Another process saved the same index first; keep its copy.
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+                  for name in ("term_ptr", "doc_ids", "term_freqs", "doc_lengths")]
+        return cls(meta["passages"], meta["vocabulary"], *arrays)
+
+    def search(self, query, top_k=8):
+        """Returns up to top_k (score, passage) pairs, best first; only passages matching a query term."""
+        num_docs = len(self.passages)
+        scores = np.zeros(num_docs, dtype=np.float32)
+        if not num_docs:
+            return []
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+            docs = self.doc_ids[start:end]
+            freqs = self.term_freqs[start:end]
+            idf = math.log(1 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = K1 * (1 - B + B * self.doc_lengths[docs] / self.avg_doc_length)
+            # Each term has at most one posting per document, so plain fancy-index add is safe.
+            scores[docs] += idf * freqs * (K1 + 1) / (freqs + norm)
+        # Passages sharing no term with the query score 0 and are never relevant.
+        matching = np.flatnonzero(scores > 0)
+        top_k = min(top_k, len(matching))
+        if not top_k:
+            return []
+        best = matching[np.argpartition(-scores[matching], top_k - 1)[:top_k]]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(float(scores[i]), self.passages[i]) for i in best]
+
+_LOADED_INDEX_LIMIT = 8
+_loaded_indexes = OrderedDict()
+_loaded_indexes_lock = threading.Lock()
+
+def _directory_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
+
+def prune_retrieval_cache(root=None, max_bytes=RETRIEVAL_CACHE_MAX_BYTES, max_age=RETRIEVAL_CACHE_MAX_AGE):
+    """
+    Deletes on-disk indexes not used for max_age seconds, then the least recently used
+    ones until the rest fit in max_bytes. Use is tracked by the directory's mtime.
+    Processes that already memory-mapped a deleted index keep reading their mapping.
+    """
+    root = root or get_cache_dir("retrieval")
+    now = time.time()
+    entries = []
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(root, name)
+        try:
+            used = os.stat(path).st_mtime
+        except OSError:
+            continue
+        # Temporary directories are only live while an index is being written.
+        limit = 3600 if name.startswith(".tmp-") else max_age
+        if now - used > limit:
+            shutil.rmtree(path, ignore_errors=True)
+        elif not name.startswith(".tmp-"):
+            entries.append((used, path, _directory_size(path)))
+    total = sum(size for _, _, size in entries)
+    for _, path, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+def get_retrieval_index(source_code):
+    """
+    Returns the retrieval index for source_code, loading it from the on-disk cache
+    or building and saving it on first use.
+    """
+    key = source_hash(source_code)
+    with _loaded_indexes_lock:
+        index = _loaded_indexes.get(key)
+        if index is not None:
+            _loaded_indexes.move_to_end(key)
+            return index
+
+    directory = get_cache_dir("retrieval", f"{key}-v{INDEX_VERSION}")
+    if os.path.exists(os.path.join(directory, "meta.json")):
+        index = RetrievalIndex.load(directory)
+        try:
+            os.utime(directory)  # mark as recently used for prune_retrieval_cache
+        except OSError:
+            pass
+    else:
+        index = RetrievalIndex.build(extract_passages(source_code))
+        index.save(directory)
+        prune_retrieval_cache()
+
+    with _loaded_indexes_lock:
+        _loaded_indexes[key] = index
+        while len(_loaded_indexes) > _LOADED_INDEX_LIMIT:
+            _loaded_indexes.popitem(last=False)
+    return index
+
+def retrieve(source_code, query, top_k=8):
+    """
+    Returns the top_k passages of source_code most relevant to query, in source order.
+    Exact copies among them are folded into the first one (see merge_duplicate_hits).
+    Empty if no passage shares a term with the query.
+    """
+    index = get_retrieval_index(source_code)
+    hits = index.search(query, top_k=top_k)
+    order = {id(passage): i for i, passage in enumerate(index.passages)}
+    return merge_duplicate_hits(sorted((passage for _, passage in hits), key=lambda passage: order[id(passage)]))
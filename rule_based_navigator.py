@@ -2,6 +2,8 @@
 
 import inspect
 
+from code_summarizer.sandbox import get_sandbox_pool
+
 # This is your smart_complete_code function, unchanged.
 def smart_complete_code(code_input: str) -> str:
     lines = code_input.strip().split("\n")
@@ -58,28 +60,28 @@ def navigate_and_run(incomplete_code):
     completed_code = smart_complete_code(incomplete_code)
     yield f"```python\n{completed_code}\n```"
 
-    # 2. Execute the completed code
+    # 2. Execute the completed code once in a sandboxed worker process, then
+    # 3. demonstrate the user-defined functions it found in that same worker
     yield "\n### 💻 Executing Completed Code...\n"
-    exec_globals = {}
-    try:
-        exec(completed_code, exec_globals)
-        yield "Execution finished."
-    except Exception as e:
-        yield f"⚠️ Error during execution: {e}"
-        return
-
-    # 3. Find and demonstrate user-defined functions
-    user_funcs = {name: val for name, val in exec_globals.items() if inspect.isfunction(val)}
-    if user_funcs:
-        yield "\n### 🔎 Detected Functions - Attempting Demo Calls...\n"
-        for fname, func in user_funcs.items():
-            try:
-                sig = inspect.signature(func)
-                example_args = make_example_args(sig)
-                yield f"\n▶ **Calling `{fname}` with guessed args: `{example_args}`**"
-                result = func(*example_args)
-                yield f"&nbsp;&nbsp;↳ `{fname}` returned: `{result}`"
-            except Exception as e:
-                yield f"&nbsp;&nbsp;⚠️ Calling `{fname}` raised an error: {e}"
+    calling = None
+    for event, payload in get_sandbox_pool().run(completed_code, call_functions=True):
+        if event == "functions":
+            yield "Execution finished."
+            if payload:
+                yield "\n### 🔎 Detected Functions - Attempting Demo Calls...\n"
+        elif event == "call":
+            calling = payload
+        elif event == "args":
+            yield f"\n▶ **Calling `{calling}` with guessed args: `{payload}`**"
+        elif event in ("stdout", "stderr"):
+            prefix = "&nbsp;&nbsp;" if calling else ""
+            yield f"{prefix}`{payload}`"
+        elif event == "result":
+            yield f"&nbsp;&nbsp;↳ `{calling}` returned: `{payload}`"
+        elif event == "error" and calling:
+            yield f"&nbsp;&nbsp;⚠️ Calling `{calling}` raised an error: {payload}"
+        elif event == "error":
+            yield f"⚠️ Error during execution: {payload}"
+            return
     
-    yield "\n### ✅ Done."
\ No newline at end of file
+    yield "\n### ✅ Done."
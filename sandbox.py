@@ -0,0 +1,254 @@
+# code_summarizer/sandbox.py
+
+import atexit
+import inspect
+import io
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; limits then rely on the wall-clock timeout.
+    resource = None
+
+# Longest repr of a return value sent back from a worker.
+MAX_RESULT_CHARS = 2000
+
+class ExecutionLimits:
+    """
+    Per-run limits: CPU seconds, wall-clock seconds, extra address space in bytes, and
+    characters of stdout and stderr output (each line also counts one for its newline).
+    """
+
+    def __init__(self, cpu_seconds=5, wall_seconds=10, memory_bytes=256 * 1024 * 1024,
+                 output_chars=20000):
+        self.cpu_seconds = cpu_seconds
+        self.wall_seconds = wall_seconds
+        self.memory_bytes = memory_bytes
+        self.output_chars = output_chars
+
+class _PipeWriter(io.TextIOBase):
+    """
+    Stands in for sys.stdout or sys.stderr in a worker and forwards each line to the
+    parent. Lines longer than max_line are sent in pieces, so one huge write cannot
+    hold up the output limit.
+    """
+
+    def __init__(self, conn, stream="stdout", max_line=MAX_RESULT_CHARS):
+        self.conn = conn
+        self.stream = stream
+        self.max_line = max_line
+        self.buffer = ""
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.buffer += text
+        while "\n" in self.buffer:
+            line, self.buffer = self.buffer.split("\n", 1)
+            self.conn.send((self.stream, line))
+        while len(self.buffer) > self.max_line:
+            line, self.buffer = self.buffer[:self.max_line], self.buffer[self.max_line:]
+            self.conn.send((self.stream, line))
+        return len(text)
+
+    def flush(self):
+        if self.buffer:
+            self.conn.send((self.stream, self.buffer))
+            self.buffer = ""
+
+def _apply_limits(limits):
+    if resource is None:
+        return
+    # RLIMIT_CPU counts the whole life of the process, so allow cpu_seconds beyond what
+    # this worker has already used; the kernel kills it with SIGXCPU past that.
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime)
+    _, cpu_hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (used + limits.cpu_seconds, cpu_hard))
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        current = 0
+    _, as_hard = resource.getrlimit(resource.RLIMIT_AS)
+    resource.setrlimit(resource.RLIMIT_AS, (current + limits.memory_bytes, as_hard))
+
+def _error(e):
+    if isinstance(e, MemoryError):
+        return "Memory limit exceeded."
+    return f"{type(e).__name__}: {e}"
+
+def _run_job(conn, code, call_functions, limits):
+    from code_summarizer.rule_based_navigator import make_example_args
+
+    _apply_limits(limits)
+    max_line = max(1, limits.output_chars)
+    stdout, stderr = _PipeWriter(conn, "stdout", max_line), _PipeWriter(conn, "stderr", max_line)
+    exec_globals = {"__name__": "__sandbox__"}
+    real_stdout, real_stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        try:
+            exec(code, exec_globals)
+        except BaseException as e:
+            stdout.flush()
+            stderr.flush()
+            conn.send(("error", _error(e)))
+            return
+        stdout.flush()
+        stderr.flush()
+        functions = [name for name, val in exec_globals.items() if inspect.isfunction(val)]
+        conn.send(("functions", functions))
+        if not call_functions:
+            return
+        # The module ran once above; every demo call sees the state it left behind.
+        for name in functions:
+            conn.send(("call", name))
+            try:
+                example_args = make_example_args(inspect.signature(exec_globals[name]))
+                conn.send(("args", repr(example_args)))
+                _apply_limits(limits)
+                result = exec_globals[name](*example_args)
+            except BaseException as e:
+                event, payload = "error", _error(e)
+            else:
+                event, payload = "result", repr(result)[:MAX_RESULT_CHARS]
+            stdout.flush()
+            stderr.flush()
+            conn.send((event, payload))
+    finally:
+        sys.stdout, sys.stderr = real_stdout, real_stderr
+
+def _worker_main(conn):
+    """Worker loop: runs jobs one at a time and reports their events over conn."""
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        _run_job(conn, *job)
+        conn.send(("done", None))
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+class SandboxPool:
+    """
+    A pool of pre-started worker processes that run untrusted code under CPU,
+    wall-clock and memory limits, so a runaway program can only take down its own
+    worker. Every worker runs a single job (the module, then any demo calls) and is
+    then replaced by a fresh one, so module state, monkeypatches and open files never
+    leak from one run into the next. This isolates resources, not privileges: the code still runs as the app's user.
+    """
+
+    def __init__(self, size=None, limits=None):
+        methods = multiprocessing.get_all_start_methods()
+        # forkserver/spawn avoid forking the multi-threaded server process itself.
+        self.context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self.limits = limits or ExecutionLimits()
+        self.size = size or min(4, os.cpu_count() or 1)
+        self._idle = queue.Queue()
+        self._replacing = set()
+        for _ in range(self.size):
+            self._idle.put(_Worker(self.context))
+
+    def _replace(self, worker):
+        # The code may have changed anything in the worker's interpreter: never reuse it.
+        # The replacement starts in the background so the caller does not wait for it.
+        def replace():
+            try:
+                worker.kill()
+                self._idle.put(_Worker(self.context))
+            finally:
+                self._replacing.discard(thread)
+
+        thread = threading.Thread(target=replace, daemon=True)
+        self._replacing.add(thread)
+        thread.start()
+
+    def run(self, code, call_functions=False, limits=None):
+        """
+        Runs code once in a worker and yields (event, payload) pairs as they arrive:
+        ("stdout", line) and ("stderr", line) for its output, then ("functions", names),
+        or ("error", message) if it fails. With call_functions, every function is then
+        called in the same worker with guessed example arguments, each as ("call", name),
+        ("args", args repr), its output, then ("result", repr) or ("error", message).
+        Each call gets its own wall-clock and CPU time allowance. Output beyond
+        limits.output_chars for the whole run is cut off, and the run is stopped with
+        an error.
+        """
+        limits = limits or self.limits
+        worker = self._idle.get()
+        try:
+            worker.conn.send((code, call_functions, limits))
+            deadline = time.monotonic() + limits.wall_seconds
+            output_left = limits.output_chars
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not worker.conn.poll(remaining):
+                    yield "error", f"Wall-clock time limit of {limits.wall_seconds}s exceeded."
+                    return
+                try:
+                    event, payload = worker.conn.recv()
+                except (EOFError, OSError):
+                    yield "error", "The code was stopped: CPU time or memory limit exceeded."
+                    return
+                if event == "done":
+                    return
+                if event == "call":
+                    deadline = time.monotonic() + limits.wall_seconds
+                elif event in ("stdout", "stderr"):
+                    if len(payload) + 1 > output_left:
+                        if output_left > 0:
+                            yield event, payload[:output_left]
+                        yield "error", f"Output limit of {limits.output_chars} characters exceeded; the run was stopped."
+                        return
+                    output_left -= len(payload) + 1
+                yield event, payload
+        finally:
+            self._replace(worker)
+
+    def shutdown(self):
+        for thread in list(self._replacing):
+            thread.join()
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.process.join(timeout=1)
+            if worker.process.is_alive():
+                worker.kill()
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+def get_sandbox_pool():
+    """Returns the process-wide sandbox pool, starting its workers on first use."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = SandboxPool()
+            atexit.register(_default_pool.shutdown)
+        return _default_pool
@@ -0,0 +1,160 @@
+# code_summarizer/scheduler.py
+
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+from google.api_core import exceptions as api_exceptions
+
+from code_summarizer.tracing import current_span
+
+# Lower numbers are served first.
+INTERACTIVE = 0
+BULK = 10
+# Seconds an interactive request may spend queued, retrying and waiting for the
+# model before it fails, rather than leaving the user waiting indefinitely.
+INTERACTIVE_TIMEOUT = 90
+
+RETRYABLE_ERRORS = (
+    api_exceptions.TooManyRequests,      # includes ResourceExhausted (quota)
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.InternalServerError,
+    api_exceptions.DeadlineExceeded,
+    ConnectionError,
+)
+
+class TokenBucket:
+    """Allows up to per_minute units per minute, with bursts of up to capacity."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount units are available (0 if they are available now)."""
+        self._refill(now)
+        # A request larger than the whole bucket only waits for a full bucket.
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.available -= min(amount, self.capacity)
+
+class RequestScheduler:
+    """
+    Central gate for model calls. Calls are admitted in priority order, within
+    requests-per-minute and tokens-per-minute limits, and retried with full-jitter
+    exponential backoff on quota and transient errors until their timeout runs out.
+    """
+
+    def __init__(self, requests_per_minute=60, tokens_per_minute=1_000_000,
+                 max_retries=5, base_delay=1.0, max_delay=30.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "timeouts": 0, "throttled_seconds": 0.0}
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+
+    def acquire(self, tokens=0, priority=BULK, deadline=None):
+        """
+        Blocks until this request may be sent. Waiting requests are admitted strictly
+        by (priority, arrival). Raises TimeoutError if deadline (a time.monotonic()
+        value) passes first.
+        """
+        entry = (priority, next(self._sequence))
+        started = time.monotonic()
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._waiting[0] == entry:
+                        wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+                        if wait == 0:
+                            self.requests.take(1, now)
+                            self.tokens.take(tokens, now)
+                            heapq.heappop(self._waiting)
+                            self.stats["throttled_seconds"] += now - started
+                            return
+                    else:
+                        wait = None
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self.stats["timeouts"] += 1
+                            raise TimeoutError("Timed out waiting for the model rate limit.")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                self._condition.notify_all()
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff delay for the given retry attempt (1-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def call(self, func, tokens=0, priority=BULK, timeout=None):
+        """
+        Runs func(remaining_seconds) once admitted, retrying retryable errors.
+        remaining_seconds is None without a timeout, so func can pass it on as a
+        per-request deadline.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        stage = current_span()
+        attempt = 0
+        while True:
+            waited = time.perf_counter()
+            self.acquire(tokens, priority, deadline)
+            stage.add("queue_seconds", time.perf_counter() - waited)
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            with self._condition:
+                self.stats["calls"] += 1
+            try:
+                return func(remaining)
+            except RETRYABLE_ERRORS:
+                attempt += 1
+                delay = self.backoff(attempt)
+                out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+                if attempt > self.max_retries or out_of_time:
+                    with self._condition:
+                        self.stats["failures"] += 1
+                    raise
+                with self._condition:
+                    self.stats["retries"] += 1
+                stage.add("retries")
+                time.sleep(delay)
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """
+    Returns the process-wide scheduler. Limits come from GEMINI_RPM and GEMINI_TPM
+    (defaults: 60 requests and 1,000,000 tokens per minute).
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler(
+                requests_per_minute=float(os.getenv("GEMINI_RPM", "60")),
+                tokens_per_minute=float(os.getenv("GEMINI_TPM", "1000000")),
+            )
+        return _default_scheduler
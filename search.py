@@ -1,17 +1,40 @@
 # code_summarizer/search.py
 
-import streamlit as st
-import google.generativeai as genai
+from code_summarizer.context_builder import CONTEXT_TOKEN_BUDGET, build_context
+from code_summarizer.llm import DEFAULT_MODEL, generate_text, stream_text
+from code_summarizer.progress import NULL_PROGRESS
+from code_summarizer.retrieval import retrieve
+from code_summarizer.scheduler import INTERACTIVE, INTERACTIVE_TIMEOUT
+from code_summarizer.tracing import span
 
-def semantic_code_search(code, query, model_name="models/gemini-pro-latest"):
+def search_prompt(code, query, top_k=8, budget=CONTEXT_TOKEN_BUDGET):
     """
-    Performs a semantic search on the code based on a natural language query.
+    Builds the search prompt around the top_k passages retrieved locally for the query.
+    For parseable code, the matching definitions and their direct callers and callees
+    are sent in full and the rest as signatures, within budget tokens. When no passage
+    matches, the prompt holds an outline of the whole code.
     """
-    st.info("Performing semantic search...")
+    with span("search.retrieve", top_k=top_k) as stage:
+        passages = retrieve(code, query, top_k=top_k)
+        stage.set(passages=len(passages))
+    # Classes stay as outlines; their matching methods are retrieved on their own.
+    focus = {passage["qualname"] for passage in passages
+             if passage.get("qualname") and passage.get("kind") != "class"}
+    with span("search.build_context", focus=len(focus)) as stage:
+        if focus:
+            excerpts = build_context(code, focus=focus, budget=budget)
+        elif not passages:
+            # Nothing matches the query's words: send an outline of the whole file instead.
+            stage.set(fallback="outline")
+            excerpts = build_context(code, budget=budget)
+        else:
+            excerpts = "\n\n".join(f"# {passage['title']}\n{passage['text']}" for passage in passages)
 
-    prompt = f"""
+    return f"""
     You are an expert code assistant. Your task is to answer a question about the
     following code snippet. Base your answer STRICTLY on the provided code.
+    The code context contains the parts of a larger codebase that are most relevant
+    to the question; other functions may be shown as signatures only.
 
     Do not answer if the code does not contain the information.
     First, provide a direct, natural language answer to the question.
@@ -20,7 +43,7 @@ def semantic_code_search(code, query, model_name="models/gemini-pro-latest"):
     ---
     CODE CONTEXT:
     ```python
-    {code}
+    {excerpts}
     ```
     ---
     USER'S QUESTION:
@@ -30,6 +53,16 @@ def semantic_code_search(code, query, model_name="models/gemini-pro-latest"):
     ANSWER:
     """
 
-    model_client = genai.GenerativeModel(model_name)
-    response = model_client.generate_content(prompt)
-    return response.text.strip()
\ No newline at end of file
+def semantic_code_search(code, query, model_name=DEFAULT_MODEL, top_k=8, progress=NULL_PROGRESS):
+    """
+    Performs a semantic search on the code based on a natural language query.
+    Only the top_k passages retrieved locally for the query are sent to the model.
+    """
+    progress.info("Performing semantic search...")
+    return generate_text(search_prompt(code, query, top_k), model_name,
+                         priority=INTERACTIVE, timeout=INTERACTIVE_TIMEOUT)
+
+def stream_semantic_code_search(code, query, model_name=DEFAULT_MODEL, top_k=8):
+    """Like semantic_code_search, but yields the answer as it is generated."""
+    return stream_text(search_prompt(code, query, top_k), model_name,
+                       priority=INTERACTIVE, timeout=INTERACTIVE_TIMEOUT)
@@ -1,28 +1,97 @@
 # code_summarizer/summarizer.py
 
-import streamlit as st
-import google.generativeai as genai
+import ast
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def chunk_code(code, max_tokens=15000):
-    """Splits large code into smaller chunks."""
-    lines = code.splitlines()
+from code_summarizer.dedup import collapse_duplicates
+from code_summarizer.llm import DEFAULT_MODEL, generate_text, stream_text
+from code_summarizer.progress import NULL_PROGRESS
+from code_summarizer.tokens import estimate_tokens
+from code_summarizer.tracing import iterate_in_span, span
+
+# How many Gemini calls may be in flight at once while summarizing chunks.
+MAX_CONCURRENCY = 4
+# How many partial summaries are merged by a single synthesis prompt.
+REDUCE_FAN_IN = 8
+# Largest chunk of code sent in one prompt, by estimate_tokens. Far below the model's
+# context window; it keeps each call short enough to return a focused summary. (The
+# old len // 4 count undercounted code by about a third, so its 15000 was ~20000.)
+CHUNK_TOKEN_LIMIT = 30000
+
+def _chunk_lines(lines, max_tokens):
+    """Packs lines into chunks of at most max_tokens, cutting only between lines."""
     chunks, current_chunk, current_length = [], [], 0
     for line in lines:
-        line_length = len(line) // 4
-        if current_length + line_length > max_tokens:
+        line_length = estimate_tokens(line) + 1
+        if current_chunk and current_length + line_length > max_tokens:
             chunks.append('\n'.join(current_chunk))
-            current_chunk, current_length = [line], line_length
-        else:
-            current_chunk.append(line)
-            current_length += line_length
+            current_chunk, current_length = [], 0
+        current_chunk.append(line)
+        current_length += line_length
     if current_chunk:
         chunks.append('\n'.join(current_chunk))
     return chunks
 
-def summarize_chunk(code_chunk, is_partial=False, model_name="models/gemini-pro-latest"):
-    """Summarizes a single piece of code using Gemini."""
+def _top_level_segments(code, tree):
+    """
+    Splits code into one line range per top-level statement. Comments and blank lines
+    before a definition stay with it, and decorators are kept with the definition.
+    """
+    lines = code.splitlines()
+    segments, start = [], 0
+    for node in tree.body:
+        end = node.end_lineno
+        if end <= start:
+            continue
+        segments.append(lines[start:end])
+        start = end
+    if start < len(lines):
+        if segments:
+            segments[-1] = segments[-1] + lines[start:]
+        else:
+            segments.append(lines[start:])
+    return segments
+
+def chunk_code(code, max_tokens=CHUNK_TOKEN_LIMIT):
+    """
+    Splits large code into chunks of at most max_tokens, packing whole top-level
+    definitions together. Only a single definition that is too large by itself is
+    split by lines. Code that does not parse is split by lines.
+    """
+    with span("summarize.chunk_code", lines=code.count("\n") + 1) as stage:
+        chunks = _chunk_code(code, max_tokens)
+        stage.set(chunks=len(chunks))
+        return chunks
+
+def _chunk_code(code, max_tokens):
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return _chunk_lines(code.splitlines(), max_tokens)
+
+    chunks, current_chunk, current_length = [], [], 0
+    for segment in _top_level_segments(code, tree):
+        segment_text = '\n'.join(segment)
+        segment_length = estimate_tokens(segment_text) + 1
+        if segment_length > max_tokens:
+            if current_chunk:
+                chunks.append('\n'.join(current_chunk))
+                current_chunk, current_length = [], 0
+            chunks.extend(_chunk_lines(segment, max_tokens))
+            continue
+        if current_chunk and current_length + segment_length > max_tokens:
+            chunks.append('\n'.join(current_chunk))
+            current_chunk, current_length = [], 0
+        current_chunk.append(segment_text)
+        current_length += segment_length
+    if current_chunk:
+        chunks.append('\n'.join(current_chunk))
+    return chunks or [code]
+
+def summarize_chunk_prompt(code_chunk, is_partial=False):
     context = "This is a partial chunk from a larger codebase." if is_partial else "This is a complete script."
-    prompt = f"""
+    return f"""
     As an expert software developer, provide a detailed explanation for the following Python code.
     {context}
     Analyze its purpose, key functions, classes, overall logic, and control flow.
@@ -34,30 +103,24 @@ def summarize_chunk(code_chunk, is_partial=False, model_name="models/gemini-pro-
     {code_chunk}
     ```
     """
-    model_client = genai.GenerativeModel(model_name)
-    response = model_client.generate_content(prompt)
-    return response.text.strip()
 
-def summarize_large_code(code, model_name="models/gemini-pro-latest"):
-    """Orchestrates the summarization of large code by chunking."""
-    chunks = chunk_code(code)
-    if len(chunks) == 1:
-        return summarize_chunk(chunks[0], is_partial=False, model_name=model_name)
+def summarize_chunk(code_chunk, is_partial=False, model_name=DEFAULT_MODEL):
+    """Summarizes a single piece of code using Gemini."""
+    return generate_text(summarize_chunk_prompt(code_chunk, is_partial), model_name)
 
-    st.info(f"Code is large. Splitting into {len(chunks)} chunks for analysis...")
-    chunk_summaries = []
-    
-    progress_bar = st.progress(0, text="Summarizing chunks...")
-    for i, chunk in enumerate(chunks, 1):
-        summary = summarize_chunk(chunk, is_partial=True, model_name=model_name)
-        chunk_summaries.append(summary)
-        progress_bar.progress(i / len(chunks), text=f"Summarizing chunk {i}/{len(chunks)}")
-
-    progress_bar.progress(1.0, text="Combining summaries...")
-    combined_summary = "\n\n---\n\n".join(chunk_summaries)
-    final_prompt = f"""
-    You are an expert code analyst. Synthesize the following partial summaries into one
-    final, cohesive, and comprehensive explanation of the entire codebase.
+def stream_summarize_chunk(code_chunk, is_partial=False, model_name=DEFAULT_MODEL):
+    """Like summarize_chunk, but yields the summary text as it is generated."""
+    return stream_text(summarize_chunk_prompt(code_chunk, is_partial), model_name)
+
+def synthesis_prompt(summaries, is_final=True):
+    if is_final:
+        goal = "one final, cohesive, and comprehensive explanation of the entire codebase."
+    else:
+        goal = "one cohesive summary of this part of the codebase. It will later be merged with other parts."
+    combined_summary = "\n\n---\n\n".join(summaries)
+    return f"""
+    You are an expert code analyst. Synthesize the following partial summaries into
+    {goal}
     Focus on Overall Architecture, Key Components, and Execution Flow.
     Ensure the final output is well-structured and easy to read using Markdown.
     
@@ -66,7 +129,116 @@ def summarize_large_code(code, model_name="models/gemini-pro-latest"):
     {combined_summary}
     ---
     """
-    model_client = genai.GenerativeModel(model_name)
-    response = model_client.generate_content(final_prompt)
-    progress_bar.empty()
-    return response.text.strip()
\ No newline at end of file
+
+def synthesize_summaries(summaries, is_final=True, model_name=DEFAULT_MODEL):
+    """Merges a group of partial summaries into one summary using Gemini."""
+    return generate_text(synthesis_prompt(summaries, is_final), model_name)
+
+def map_concurrently(func, items, max_workers=MAX_CONCURRENCY, on_done=None):
+    """
+    Applies func to every item on a thread pool and returns the results in input order.
+    on_done(completed_count) is called from the calling thread as each item finishes,
+    so it is safe to update UI elements (e.g. Streamlit) from it.
+    Each item runs in a copy of the caller's context, so its trace spans nest under
+    the caller's span.
+    """
+    results = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        futures = {executor.submit(contextvars.copy_context().run, func, item): i
+                   for i, item in enumerate(items)}
+        for completed, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if on_done:
+                on_done(completed)
+    return results
+
+def reduce_to_fan_in(summaries, model_name=DEFAULT_MODEL,
+                     fan_in=REDUCE_FAN_IN, max_workers=MAX_CONCURRENCY, on_level=None):
+    """
+    Hierarchically merges partial summaries in groups of at most fan_in until at most
+    fan_in remain, so no single synthesis prompt ever contains more than fan_in summaries.
+    """
+    fan_in = max(2, fan_in)
+    level = 0
+    while len(summaries) > fan_in:
+        level += 1
+        groups = [summaries[i:i + fan_in] for i in range(0, len(summaries), fan_in)]
+        if on_level:
+            on_level(level, len(groups))
+        with span("summarize.reduce", level=level, groups=len(groups)):
+            summaries = map_concurrently(
+                lambda group: synthesize_summaries(group, is_final=False, model_name=model_name),
+                groups, max_workers=max_workers,
+            )
+    return summaries
+
+def reduce_summaries(summaries, model_name=DEFAULT_MODEL,
+                     fan_in=REDUCE_FAN_IN, max_workers=MAX_CONCURRENCY, on_level=None):
+    """Merges any number of partial summaries into one final summary."""
+    summaries = reduce_to_fan_in(summaries, model_name, fan_in, max_workers, on_level)
+    return synthesize_summaries(summaries, is_final=True, model_name=model_name)
+
+def _summarize_chunks(chunks, model_name, max_workers, fan_in, progress):
+    """
+    Summarizes chunks concurrently and reduces the results to at most fan_in summaries,
+    reporting to the progress reporter.
+    """
+    progress.info(f"Code is large. Splitting into {len(chunks)} chunks for analysis...")
+    progress.update(0, "Summarizing chunks...")
+
+    def update_progress(done):
+        progress.update(done / len(chunks), f"Summarizing chunk {done}/{len(chunks)}")
+
+    with span("summarize.map", chunks=len(chunks), workers=max_workers):
+        chunk_summaries = map_concurrently(
+            lambda chunk: summarize_chunk(chunk, is_partial=True, model_name=model_name),
+            chunks, max_workers=max_workers, on_done=update_progress,
+        )
+
+    progress.update(1.0, "Combining summaries...")
+    return reduce_to_fan_in(
+        chunk_summaries, model_name=model_name, fan_in=fan_in, max_workers=max_workers,
+        on_level=lambda level, groups: progress.update(
+            1.0, f"Combining summaries (level {level}: {groups} groups)..."),
+    )
+
+def _collapse(code):
+    with span("summarize.dedup") as stage:
+        collapsed = collapse_duplicates(code)
+        stage.set(tokens_saved=estimate_tokens(code) - estimate_tokens(collapsed) if collapsed != code else 0)
+        return collapsed
+
+def summarize_large_code(code, model_name=DEFAULT_MODEL, max_workers=MAX_CONCURRENCY,
+                         fan_in=REDUCE_FAN_IN, progress=NULL_PROGRESS):
+    """
+    Orchestrates the summarization of large code by chunking. Duplicated functions are
+    collapsed to their signatures first, so each implementation is only sent once.
+    """
+    with span("summarize"):
+        chunks = chunk_code(_collapse(code))
+        if len(chunks) == 1:
+            return summarize_chunk(chunks[0], is_partial=False, model_name=model_name)
+
+        summaries = _summarize_chunks(chunks, model_name, max_workers, fan_in, progress)
+        summary = synthesize_summaries(summaries, is_final=True, model_name=model_name)
+        progress.done()
+        return summary
+
+def stream_summarize_large_code(code, model_name=DEFAULT_MODEL, max_workers=MAX_CONCURRENCY,
+                                fan_in=REDUCE_FAN_IN, progress=NULL_PROGRESS):
+    """
+    Like summarize_large_code, but yields the final summary as it is generated.
+    Chunk summaries are still collected first, since the final prompt needs all of them.
+    """
+    stage = span("summarize", stream=True)
+    yield from iterate_in_span(stage, _stream_summary(code, model_name, max_workers, fan_in, progress))
+
+def _stream_summary(code, model_name, max_workers, fan_in, progress):
+    chunks = chunk_code(_collapse(code))
+    if len(chunks) == 1:
+        yield from stream_summarize_chunk(chunks[0], is_partial=False, model_name=model_name)
+        return
+
+    summaries = _summarize_chunks(chunks, model_name, max_workers, fan_in, progress)
+    progress.done()
+    yield from stream_text(synthesis_prompt(summaries, is_final=True), model_name)
@@ -0,0 +1,326 @@
+# code_summarizer/summary_tree.py
+
+from code_summarizer.context_builder import truncate_to_budget
+from code_summarizer.dedup import describe_literals, find_duplicates
+from code_summarizer.llm import DEFAULT_MODEL, cache_model_name, generate_text, stream_text
+from code_summarizer.progress import NULL_PROGRESS
+from code_summarizer.project_index import definition_hash, get_project_index
+from code_summarizer.scheduler import INTERACTIVE, INTERACTIVE_TIMEOUT
+from code_summarizer.summarizer import MAX_CONCURRENCY, map_concurrently, reduce_to_fan_in
+from code_summarizer.symbols import build_symbol_index
+from code_summarizer.tracing import span
+
+# Token caps for the code of one leaf and for the non-definition code of a class or module.
+LEAF_TOKEN_LIMIT = 8000
+OUTLINE_TOKEN_LIMIT = 2000
+# Parents with more children than this merge their child summaries in groups first.
+ROLLUP_FAN_IN = 40
+
+class SummaryNode:
+    """
+    One summarized unit: a function or method (leaf), a class, a module or a package.
+    The key hashes the node's own code together with its children's keys, Merkle-style,
+    so a node's key changes exactly when something inside it changes.
+    """
+
+    __slots__ = ("kind", "name", "key", "children", "summary", "source", "lineno", "end_lineno")
+
+    def __init__(self, kind, name, key, children=(), source="", lineno=None, end_lineno=None):
+        self.kind = kind
+        self.name = name
+        self.key = key
+        self.children = list(children)
+        self.summary = None
+        # Leaves: their code. Classes and modules: the code outside their child definitions.
+        self.source = source
+        self.lineno = lineno
+        self.end_lineno = end_lineno
+
+    @property
+    def is_leaf(self):
+        return not self.children and self.kind not in ("class", "module", "package")
+
+    def walk(self):
+        """This node and all its descendants, parents before children."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def find(self, name):
+        """The node with this qualname (or module/package name) in the tree, or None."""
+        return next((node for node in self.walk() if node.name == name), None)
+
+    def to_dict(self):
+        return {"kind": self.kind, "name": self.name, "key": self.key, "summary": self.summary,
+                "lineno": self.lineno, "end_lineno": self.end_lineno,
+                "children": [child.to_dict() for child in self.children]}
+
+    def __repr__(self):
+        return f"SummaryNode({self.kind} {self.name}, {len(self.children)} children)"
+
+def _node_key(kind, name, source, children):
+    parts = [kind, name, source]
+    parts.extend(child.key for child in children)
+    return definition_hash("\0".join(parts))
+
+def _link_keys(node, same_as):
+    """
+    Re-keys the duplicates in same_as by their representative's key and note rather than
+    by their own code, so a copied summary is replaced when the representative changes,
+    then re-derives the keys of their ancestors. Applying it twice gives the same keys.
+    """
+    for child in node.children:
+        _link_keys(child, same_as)
+    if node in same_as:
+        representative, note = same_as[node]
+        node.key = _node_key("copy", node.name, node.source + "\0" + note, (representative,))
+    else:
+        node.key = _node_key(node.kind, node.name, node.source, node.children)
+
+def _outline(index, first, last, children):
+    """Lines first..last without the spans of the child definitions (and their decorators)."""
+    covered = set()
+    for child in children:
+        start = child.lineno
+        while start > first and index.lines(start - 1, start - 1).lstrip().startswith("@"):
+            start -= 1
+        covered.update(range(start, child.end_lineno + 1))
+    lines = [index.lines(n, n).rstrip("\n") for n in range(first, last + 1) if n not in covered]
+    text = "\n".join(line for line in lines if line.strip())
+    return truncate_to_budget(text, OUTLINE_TOKEN_LIMIT)
+
+def build_module_tree(source_code, module_name="module"):
+    """
+    Builds the summary tree of one module without calling the model: functions and
+    methods are leaves (nested functions stay part of their enclosing function),
+    grouped under their classes and then the module. Raises SyntaxError for invalid code.
+    """
+    index = build_symbol_index(source_code)
+
+    def build(symbol):
+        if symbol.kind != "class":
+            code = truncate_to_budget(symbol.code, LEAF_TOKEN_LIMIT)
+            key = _node_key(symbol.kind, symbol.qualname, code, ())
+            return SummaryNode(symbol.kind, symbol.qualname, key, source=code, lineno=symbol.lineno, end_lineno=symbol.end_lineno)
+        members = [build(child) for child in children.get(symbol.qualname, ())]
+        outline = _outline(index, symbol.lineno, symbol.end_lineno, members)
+        key = _node_key("class", symbol.qualname, outline, members)
+        return SummaryNode("class", symbol.qualname, key, members, source=outline, lineno=symbol.lineno, end_lineno=symbol.end_lineno)
+
+    # Only definitions directly inside the module or inside a class that has a node get
+    # their own node; symbols come parents first, so one pass finds them all.
+    children, top_level, has_node = {}, [], set()
+    for symbol in index.symbols:
+        if symbol.parent is None:
+            top_level.append(symbol)
+        elif symbol.parent.kind == "class" and symbol.parent.qualname in has_node:
+            children.setdefault(symbol.parent.qualname, []).append(symbol)
+        else:
+            continue
+        has_node.add(symbol.qualname)
+
+    nodes = [build(symbol) for symbol in top_level]
+    outline = _outline(index, 1, index.line_count, nodes)
+    return SummaryNode("module", module_name, _node_key("module", module_name, outline, nodes), nodes,
+                       source=outline, lineno=1, end_lineno=index.line_count)
+
+def build_package_tree(modules, package_name="package"):
+    """Summary tree of a package from {module name: source code}, skipping unparseable modules."""
+    nodes = []
+    for module_name in sorted(modules):
+        try:
+            nodes.append(build_module_tree(modules[module_name], module_name))
+        except (SyntaxError, ValueError):
+            continue
+    return SummaryNode("package", package_name, _node_key("package", package_name, "", nodes), nodes)
+
+def leaf_prompt(node):
+    return f"""
+    As an expert software developer, summarize the following Python {node.kind.replace("_", " ")}
+    `{node.name}` in 2-4 sentences: what it does, its inputs and outputs, and notable
+    side effects or error handling. Answer in plain Markdown without headings.
+
+    Code:
+    ```python
+    {node.source}
+    ```
+    """
+
+def rollup_prompt(node, child_summaries):
+    described = {"class": f"the class `{node.name}`", "module": f"the module `{node.name}`",
+                 "package": f"the package `{node.name}`"}[node.kind]
+    outline = ""
+    if node.source.strip():
+        outline = f"""
+    Code of {described} outside the parts summarized above:
+    ```python
+    {node.source}
+    ```
+    """
+    combined = "\n\n".join(child_summaries)
+    return f"""
+    You are an expert code analyst. Using the summaries of its parts below, write a
+    cohesive summary of {described}: its purpose, main responsibilities, how the parts
+    work together, and its execution flow. Use Markdown; keep it under 250 words.
+
+    Summaries of its parts:
+    ---
+    {combined}
+    ---
+    {outline}
+    """
+
+class SummaryTree:
+    """
+    Summarizes code as a tree: each function or method once, then each class from its
+    method summaries, each module from its class and function summaries, and a package
+    from its module summaries. Every node's summary is stored under its key and the
+    model name in the project index, so after an edit only the changed leaves and their
+    ancestors are sent to the model; everything else is read back from the store.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, store=None, max_workers=MAX_CONCURRENCY):
+        self.model_name = model_name
+        self.store = store or get_project_index()
+        self.max_workers = max_workers
+
+    def _summarize_leaf(self, node):
+        return generate_text(leaf_prompt(node), self.model_name)
+
+    def _summarize_parent(self, node):
+        child_summaries = [f"### {child.kind.replace('_', ' ')} `{child.name}`\n{child.summary}"
+                           for child in node.children]
+        if len(child_summaries) > ROLLUP_FAN_IN:
+            child_summaries = reduce_to_fan_in(child_summaries, model_name=self.model_name,
+                                               fan_in=ROLLUP_FAN_IN, max_workers=self.max_workers)
+        return generate_text(rollup_prompt(node, child_summaries), self.model_name)
+
+    def summarize(self, root, progress=NULL_PROGRESS, same_as=None):
+        """
+        Fills in node.summary for every node of root: leaves first, then parents from
+        the deepest level up, so each parent is built from its children's summaries.
+        same_as maps duplicate leaves to (representative node, note); their summaries
+        are the note followed by the representative's, instead of being generated, and
+        they are keyed by the representative, so they follow it when it is edited.
+        Returns root.
+        """
+        same_as = same_as or {}
+        if same_as:
+            _link_keys(root, same_as)
+        levels = {}
+
+        def collect(node, depth):
+            levels.setdefault(depth, []).append(node)
+            for child in node.children:
+                collect(child, depth + 1)
+
+        collect(root, 0)
+        nodes = list(root.walk())
+        stored = self.store.get_summaries([node.key for node in nodes], cache_model_name(self.model_name))
+        for node in nodes:
+            node.summary = stored.get(node.key)
+        leaves = [node for node in nodes if node.summary is None and node.is_leaf and node not in same_as]
+        parents = [[node for node in levels[depth] if node.summary is None and not node.is_leaf]
+                   for depth in sorted(levels, reverse=True)]
+        missing = len(leaves) + sum(map(len, parents))
+        copied = sum(node.summary is None for node in same_as)
+
+        def summarize_node(node):
+            if node.is_leaf:
+                return self._summarize_leaf(node)
+            return self._summarize_parent(node)
+
+        with span("summary_tree", nodes=len(nodes), summarized=missing, copied=copied,
+                  reused=len(nodes) - missing - copied):
+            done = 0
+            for index, pending in enumerate([leaves] + parents):
+                if index == 1:
+                    # Duplicates take their representative's summary before any parent needs them.
+                    for node, (representative, note) in same_as.items():
+                        if node.summary is None:
+                            self._store(node, f"{note} {representative.summary}")
+                if not pending:
+                    continue
+
+                def update_progress(count, offset=done):
+                    progress.update((offset + count) / missing,
+                                    f"Summarizing definitions ({offset + count}/{missing})...")
+
+                summaries = map_concurrently(summarize_node, pending, max_workers=self.max_workers,
+                                             on_done=update_progress)
+                for node, summary in zip(pending, summaries):
+                    self._store(node, summary)
+                done += len(pending)
+            progress.done()
+        return root
+
+    def _store(self, node, summary):
+        node.summary = summary
+        self.store.set_summary(node.key, summary, cache_model_name(self.model_name))
+
+    def summarize_module(self, source_code, module_name="module", progress=NULL_PROGRESS):
+        root = build_module_tree(source_code, module_name)
+        return self.summarize(root, progress, duplicate_links(root, source_code))
+
+    def summarize_package(self, modules, package_name="package", progress=NULL_PROGRESS):
+        root = build_package_tree(modules, package_name)
+        same_as = {}
+        for module in root.children:
+            same_as.update(duplicate_links(module, modules[module.name]))
+        return self.summarize(root, progress, same_as)
+
+def duplicate_links(module_node, source_code):
+    """
+    {duplicate leaf: (representative leaf, note)} for the duplicate clusters of one
+    module (see dedup.find_duplicates), for SummaryTree.summarize's same_as. Only exact
+    copies and variants that differ in literals are linked; near-duplicates do other
+    things and are summarized on their own.
+    """
+    duplicates = find_duplicates(source_code)
+    if not duplicates.clusters:
+        return {}
+    by_name = {node.name: node for node in module_node.walk()}
+    links = {}
+    for cluster in duplicates.clusters:
+        representative = by_name.get(cluster.representative.qualname)
+        for member in cluster.duplicates:
+            node = by_name.get(member.qualname)
+            relation = cluster.relation(member.qualname)
+            if representative is None or node is None or not node.is_leaf or relation == "near":
+                continue
+            note = f"Same implementation as `{representative.name}`"
+            if relation == "literals":
+                note += ", but with " + describe_literals(cluster.literal_variants[member.qualname])
+            links[node] = (representative, note + ".")
+    return links
+
+def question_prompt(node, question):
+    """Prompt answering a question from the stored summaries of node and its children."""
+    parts = [f"## {node.kind.replace('_', ' ')} `{node.name}`\n{node.summary}"]
+    parts.extend(f"### {child.kind.replace('_', ' ')} `{child.name}`\n{child.summary}"
+                 for child in node.children)
+    if node.is_leaf:
+        parts.append(f"```python\n{node.source}\n```")
+    context = "\n\n".join(parts)
+    return f"""
+    You are an expert code assistant. Answer the user's question about the
+    {node.kind.replace("_", " ")} `{node.name}` using only the summaries below.
+    If they do not contain the answer, say so.
+
+    {context}
+
+    **User's Question:**
+    "{question}"
+
+    **Answer:**
+    """
+
+def ask(node, question, model_name=DEFAULT_MODEL):
+    """Answers a question about one summarized node, without re-summarizing any code."""
+    return generate_text(question_prompt(node, question), model_name,
+                         priority=INTERACTIVE, timeout=INTERACTIVE_TIMEOUT)
+
+def stream_ask(node, question, model_name=DEFAULT_MODEL):
+    """Like ask, but yields the answer as it is generated."""
+    return stream_text(question_prompt(node, question), model_name,
+                       priority=INTERACTIVE, timeout=INTERACTIVE_TIMEOUT)
@@ -0,0 +1,249 @@
+# code_summarizer/symbols.py
+
+import ast
+import hashlib
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+
+from code_summarizer.tracing import span
+
+FUNCTION_KINDS = ("function", "async_function", "method", "async_method")
+
+def source_hash(source_code):
+    """Stable content hash used to key indexes built from the same source."""
+    return hashlib.sha1(source_code.encode("utf-8")).hexdigest()
+
+def call_name(func):
+    """
+    Returns the dotted name of a call target, e.g. "helper", "self.save" or "os.path.join".
+    When the chain does not start at a plain name (e.g. "make().run()") only the final
+    attribute is kept, prefixed with "." so it is never mistaken for a local name.
+    """
+    parts = []
+    while isinstance(func, ast.Attribute):
+        parts.append(func.attr)
+        func = func.value
+    if isinstance(func, ast.Name):
+        parts.append(func.id)
+        return ".".join(reversed(parts))
+    if parts:
+        return "." + parts[0]
+    return ""
+
+def first_line(docstring):
+    """First line of a docstring, as shown next to a definition."""
+    return docstring.strip().split("\n", 1)[0] if docstring else ""
+
+class Symbol:
+    """A function, method or class found in the source, with its line span and call sites."""
+
+    __slots__ = ("name", "qualname", "kind", "parent", "lineno", "col_offset",
+                 "end_lineno", "end_col_offset", "body_lineno", "decorator_lineno", "docstring",
+                 "bases", "calls", "_index")
+
+    def __init__(self, index, name, kind, parent, lineno, col_offset, end_lineno, end_col_offset,
+                 body_lineno, docstring="", decorator_lineno=None):
+        # Lines are 1-based and columns are UTF-8 byte offsets, as in the ast module.
+        self._index = index
+        self.name = name
+        self.qualname = f"{parent.qualname}.{name}" if parent else name
+        self.kind = kind
+        self.parent = parent
+        self.lineno = lineno
+        self.col_offset = col_offset
+        self.end_lineno = end_lineno
+        self.end_col_offset = end_col_offset
+        self.body_lineno = body_lineno
+        # First line of the decorators, or lineno for an undecorated definition.
+        self.decorator_lineno = lineno if decorator_lineno is None else decorator_lineno
+        self.docstring = docstring
+        self.bases = ()
+        self.calls = []
+
+    @property
+    def code(self):
+        """Source text of the definition, sliced from the original source on access."""
+        return self._index.source_of(self)
+
+    @property
+    def signature(self):
+        """The def/class header line(s), without decorators or body."""
+        return self._index.lines(self.lineno, max(self.lineno, self.body_lineno - 1)).strip()
+
+    @property
+    def decorators(self):
+        """The decorator lines above the header, as written, or "" if there are none."""
+        if self.decorator_lineno >= self.lineno:
+            return ""
+        return self._index.lines(self.decorator_lineno, self.lineno - 1).rstrip("\n")
+
+    @property
+    def is_function(self):
+        return self.kind in FUNCTION_KINDS
+
+    def __getitem__(self, key):
+        # Lets the UI keep using func["name"], func["code"], ... as with plain dicts.
+        return getattr(self, key)
+
+    def __repr__(self):
+        return f"Symbol({self.kind} {self.qualname} L{self.lineno}-{self.end_lineno})"
+
+class SymbolIndex:
+    """Symbol table for one source string, built in a single AST traversal."""
+
+    def __init__(self, source_code):
+        self.source = source_code
+        self.hash = source_hash(source_code)
+        self.symbols = []
+        # Local name -> imported dotted target, e.g. {"np": "numpy", "join": "os.path.join"}.
+        # Relative imports keep their leading dots, e.g. {"helper": "..utils.helper"}.
+        self.imports = {}
+        # Full dotted names of plain "import a.b.c" statements, which only bind "a".
+        self.imported_modules = []
+        # True when the index was recovered from code with syntax errors (see ts_parser).
+        self.partial = False
+        self._line_starts = None
+
+    @property
+    def functions(self):
+        return [symbol for symbol in self.symbols if symbol.is_function]
+
+    @property
+    def classes(self):
+        return [symbol for symbol in self.symbols if symbol.kind == "class"]
+
+    @property
+    def line_starts(self):
+        """Character offset at which each line starts, computed on first use."""
+        if self._line_starts is None:
+            starts, pos = [0], self.source.find("\n")
+            while pos != -1:
+                starts.append(pos + 1)
+                pos = self.source.find("\n", pos + 1)
+            self._line_starts = starts
+        return self._line_starts
+
+    @property
+    def line_count(self):
+        return len(self.line_starts)
+
+    def lines(self, first, last):
+        """Source text of lines first..last (1-based, inclusive)."""
+        starts = self.line_starts
+        end = starts[last] if last < len(starts) else len(self.source)
+        return self.source[starts[first - 1]:end]
+
+    def source_of(self, symbol):
+        start = self._offset(symbol.lineno, symbol.col_offset)
+        end = self._offset(symbol.end_lineno, symbol.end_col_offset)
+        return self.source[start:end]
+
+    def _offset(self, lineno, byte_col):
+        starts = self.line_starts
+        line_start = starts[lineno - 1]
+        # ast columns are UTF-8 byte offsets; convert to a character offset on this line only.
+        line_end = starts[lineno] if lineno < len(starts) else len(self.source)
+        line = self.source[line_start:line_end]
+        return line_start + len(line.encode("utf-8")[:byte_col].decode("utf-8", errors="ignore"))
+
+    def symbol_at(self, lineno):
+        """Returns the innermost symbol whose span contains lineno, or None."""
+        starts = [symbol.lineno for symbol in self.symbols]
+        for symbol in reversed(self.symbols[:bisect_right(starts, lineno)]):
+            if symbol.lineno <= lineno <= symbol.end_lineno:
+                return symbol
+        return None
+
+class _Indexer(ast.NodeVisitor):
+    def __init__(self, index):
+        self.index = index
+        self.scope = []
+
+    def _visit_definition(self, node, kind, bases=()):
+        parent = self.scope[-1] if self.scope else None
+        # A decorated first statement (e.g. a @property method) starts at its decorator.
+        first = node.body[0]
+        body_lineno = min([d.lineno for d in getattr(first, "decorator_list", [])] + [first.lineno])
+        symbol = Symbol(self.index, node.name, kind, parent, node.lineno, node.col_offset,
+                        node.end_lineno, node.end_col_offset, body_lineno,
+                        first_line(ast.get_docstring(node)),
+                        min((decorator.lineno for decorator in node.decorator_list), default=None))
+        symbol.bases = bases
+        self.index.symbols.append(symbol)
+        # Decorators, defaults, annotations and bases run in the enclosing scope.
+        for field, value in ast.iter_fields(node):
+            if field != "body":
+                for item in value if isinstance(value, list) else [value]:
+                    if isinstance(item, ast.AST):
+                        self.visit(item)
+        self.scope.append(symbol)
+        for statement in node.body:
+            self.visit(statement)
+        self.scope.pop()
+
+    def visit_FunctionDef(self, node):
+        in_class = bool(self.scope) and self.scope[-1].kind == "class"
+        self._visit_definition(node, "method" if in_class else "function")
+
+    def visit_AsyncFunctionDef(self, node):
+        in_class = bool(self.scope) and self.scope[-1].kind == "class"
+        self._visit_definition(node, "async_method" if in_class else "async_function")
+
+    def visit_ClassDef(self, node):
+        bases = tuple(filter(None, (call_name(base) for base in node.bases)))
+        self._visit_definition(node, "class", bases)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            if alias.asname:
+                self.index.imports[alias.asname] = alias.name
+            else:
+                head = alias.name.split(".", 1)[0]
+                self.index.imports[head] = head
+                self.index.imported_modules.append(alias.name)
+
+    def visit_ImportFrom(self, node):
+        prefix = "." * node.level + (node.module or "")
+        for alias in node.names:
+            if alias.name == "*":
+                continue
+            target = f"{prefix}.{alias.name}" if node.module else prefix + alias.name
+            self.index.imports[alias.asname or alias.name] = target
+
+    def visit_Call(self, node):
+        if self.scope:
+            name = call_name(node.func)
+            if name:
+                self.scope[-1].calls.append(name)
+        self.generic_visit(node)
+
+_INDEX_CACHE_SIZE = 16
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+def build_symbol_index(source_code):
+    """
+    Parses source_code once and returns its SymbolIndex. Results are cached by source
+    hash, so every view working on the same code shares one parse.
+    Raises SyntaxError if the code cannot be parsed.
+    """
+    key = source_hash(source_code)
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    index = SymbolIndex(source_code)
+    with span("parse.ast", lines=index.line_count):
+        tree = ast.parse(source_code)
+    with span("parse.index") as stage:
+        _Indexer(index).visit(tree)
+        stage.set(symbols=len(index.symbols))
+
+    with _index_cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > _INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
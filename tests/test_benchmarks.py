@@ -0,0 +1,36 @@
+# code_summarizer/tests/test_benchmarks.py
+
+import ast
+
+from code_summarizer.benchmarks.run import compare, scaling_exponent
+from code_summarizer.benchmarks.synthetic import generate_codebase, parse_size
+
+def test_parse_size():
+    assert parse_size("1000") == 1000
+    assert parse_size("10k") == 10_000
+    assert parse_size(" 1.5M ") == 1_500_000
+
+def test_generated_code_is_valid_deterministic_and_large_enough():
+    code = generate_codebase(2000, seed=3)
+    ast.parse(code)
+    assert code.count("\n") >= 2000
+    assert code == generate_codebase(2000, seed=3)
+    assert code != generate_codebase(2000, seed=4)
+
+def test_scaling_exponent_of_linear_and_quadratic_timings():
+    linear = [{"lines": n, "seconds": n * 1e-6} for n in (1_000, 10_000, 100_000)]
+    quadratic = [{"lines": n, "seconds": n * n * 1e-9} for n in (1_000, 10_000, 100_000)]
+    assert abs(scaling_exponent(linear) - 1.0) < 1e-6
+    assert abs(scaling_exponent(quadratic) - 2.0) < 1e-6
+    assert scaling_exponent(linear[:1]) is None
+
+def _results(seconds, peak_bytes):
+    return {"results": {"chunk_code": {"1000": {"seconds": seconds, "peak_bytes": peak_bytes}}}}
+
+def test_compare_reports_regressions_beyond_tolerance_and_noise():
+    baseline = _results(1.0, 100 * 2 ** 20)
+    assert compare(_results(1.2, 100 * 2 ** 20), baseline, tolerance=0.25) == []
+    assert len(compare(_results(1.5, 100 * 2 ** 20), baseline, tolerance=0.25)) == 1
+    assert len(compare(_results(1.0, 200 * 2 ** 20), baseline, tolerance=0.25)) == 1
+    # Microsecond-scale timings never count as regressions, whatever the ratio.
+    assert compare(_results(0.0003, 0), _results(0.0001, 0), tolerance=0.25) == []
@@ -0,0 +1,31 @@
+# code_summarizer/tests/test_cache.py
+
+import itertools
+
+from code_summarizer import cache as cache_module
+from code_summarizer.cache import ResponseCache, make_key
+
+def test_responses_round_trip_through_memory_and_disk(tmp_path):
+    path = str(tmp_path / "responses.sqlite3")
+    cache = ResponseCache(path)
+    key = make_key("model", "Explain this.\n  x = 1   \n")
+    assert cache.get(key) is None
+    cache.set(key, "An explanation.")
+    assert cache.get(make_key("model", "Explain this.\n  x = 1")) == "An explanation."
+    assert cache.get(make_key("other-model", "Explain this.\n  x = 1")) is None
+    # A new instance on the same file only has the disk tier.
+    assert ResponseCache(path).get(key) == "An explanation."
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    clock = itertools.count(1000)
+    monkeypatch.setattr(cache_module.time, "time", lambda: float(next(clock)))
+    cache = ResponseCache(":memory:", max_memory_entries=2, max_disk_bytes=30)
+    for key in "abc":
+        cache.set(key, "x" * 10)
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.get("a") == "x" * 10  # from disk, and now the most recently used
+    cache.set("d", "x" * 10)
+    assert cache.stats()["disk_entries"] == 3
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["x" * 10] * 3
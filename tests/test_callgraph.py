@@ -0,0 +1,38 @@
+# code_summarizer/tests/test_callgraph.py
+
+from code_summarizer.callgraph import CallGraph
+
+def make_graph():
+    return CallGraph.from_calls({
+        "main": {"load", "run"},
+        "load": {"parse"},
+        "parse": set(),
+        "run": {"step"},
+        "step": {"run"},          # run <-> step recurse into each other
+        "countdown": {"countdown"},
+        "unused": {"parse"},
+    })
+
+def test_cycles_finds_mutual_and_self_recursion():
+    cycles = {frozenset(cycle) for cycle in make_graph().cycles()}
+    assert cycles == {frozenset({"run", "step"}), frozenset({"countdown"})}
+
+def test_cycles_is_empty_for_an_acyclic_graph():
+    graph = CallGraph.from_calls({"a": {"b"}, "b": {"c"}, "c": set()})
+    assert graph.cycles() == []
+
+def test_dead_code_without_roots_is_everything_nothing_calls():
+    assert sorted(make_graph().dead_code()) == ["main", "unused"]
+
+def test_dead_code_with_roots_is_everything_unreachable():
+    assert sorted(make_graph().dead_code(roots=["main"])) == ["countdown", "unused"]
+
+def test_reachable_and_transitive_callers():
+    graph = make_graph()
+    assert sorted(graph.reachable("main")) == ["load", "parse", "run", "step"]
+    assert sorted(graph.transitive_callers("parse")) == ["load", "main", "unused"]
+    assert sorted(graph.reachable("run")) == ["run", "step"]
+
+def test_duplicate_edges_are_stored_once():
+    graph = CallGraph.from_edges([("a", "b"), ("a", "b"), ("b", "a")])
+    assert graph.num_edges == 2
@@ -0,0 +1,35 @@
+# code_summarizer/tests/test_cli.py
+
+import json
+
+from code_summarizer import cli, llm
+from code_summarizer.cache import ResponseCache
+
+def test_cli_runs_jobs_against_the_mock_backend(tmp_path, monkeypatch):
+    monkeypatch.setenv("CODE_NAVIGATOR_BACKEND", "mock")
+    monkeypatch.setenv("MOCK_LATENCY", "0")
+    monkeypatch.setenv("MOCK_JITTER", "0")
+    monkeypatch.setattr(llm, "_models", {})
+    monkeypatch.setattr(llm, "_configured", False)
+    cache = ResponseCache(":memory:")
+    monkeypatch.setattr(llm, "get_response_cache", lambda: cache)
+    source = tmp_path / "orders.py"
+    source.write_text("def total(items):\n    return sum(items)\n\ndef main():\n    return total([1, 2])\n")
+    jobs = tmp_path / "jobs.jsonl"
+    jobs.write_text(json.dumps({"task": "navigate", "path": str(source)}) + "\n"
+                    + json.dumps({"task": "summarize", "code": "def broken(:\n"}) + "\n")
+    output, trace_file = tmp_path / "out.jsonl", tmp_path / "trace.json"
+
+    status = cli.main(["--task", "summarize", str(source), "--jobs-file", str(jobs), "-o", str(output),
+                       "-j", "2", "--trace", str(trace_file)])
+
+    assert status == 0
+    records = {(record["task"], record["path"]): record
+               for record in map(json.loads, output.read_text().splitlines())}
+    assert len(records) == 3
+    assert all(record["error"] is None for record in records.values())
+    assert records["summarize", str(source)]["result"].startswith("## Mock response")
+    assert records["summarize", None]["result"].startswith("## Mock response")
+    assert cache.stats()["disk_entries"] == 2
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    assert sum(event["name"] == "job" for event in events) == 3
@@ -0,0 +1,129 @@
+# code_summarizer/tests/test_context_builder.py
+
+from code_summarizer.context_builder import build_context, split_for_completion, truncate_to_budget
+from code_summarizer.retrieval import extract_passages
+from code_summarizer.symbols import build_symbol_index
+from code_summarizer.tokens import estimate_tokens
+
+CODE = '''import os
+
+@dataclass
+class Point:
+    """A point."""
+
+    @property
+    def norm(self):
+        return abs(self.x)
+
+@app.route(
+    "/users",
+)
+def users():
+    return load_users()
+
+def load_users():
+    return os.listdir(".")
+
+def unrelated():
+    return 42
+'''
+
+def test_truncate_to_budget_keeps_whole_lines_within_budget():
+    text = "\n".join(f"line_{i} = {i}" for i in range(100))
+    cut = truncate_to_budget(text, 50)
+    assert text.startswith(cut)
+    assert cut.split("\n") == text.split("\n")[:len(cut.split("\n"))]
+    assert 0 < estimate_tokens(cut) <= 50
+
+def test_truncate_to_budget_can_keep_the_end():
+    text = "\n".join(f"line_{i} = {i}" for i in range(100))
+    cut = truncate_to_budget(text, 50, keep_end=True)
+    assert text.endswith(cut)
+    assert estimate_tokens(cut) <= 50
+
+def test_truncate_to_budget_returns_short_text_unchanged():
+    assert truncate_to_budget("x = 1\ny = 2", 1000) == "x = 1\ny = 2"
+
+def test_focus_and_its_callees_are_full_and_the_rest_are_skeletons():
+    context = build_context(CODE, focus={"users"})
+    assert "return os.listdir" in context
+    assert "def unrelated():\n    ..." in context
+    assert "return 42" not in context
+
+def test_decorators_are_kept_in_full_and_skeleton_renders():
+    context = build_context(CODE, focus={"users"})
+    assert '@app.route(\n    "/users",\n)\ndef users():' in context
+    assert "@dataclass\nclass Point:" in context
+    assert "    @property\n    def norm(self):\n        ..." in context
+
+STORE = '''import os
+
+class Store:
+    @property
+    def root(self):
+        return os.getcwd()
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+'''
+
+def test_a_decorated_first_method_is_not_part_of_the_class_signature():
+    index = build_symbol_index(STORE)
+    assert index.symbols[0].signature == "class Store:"
+    context = build_context(STORE, focus={"Store.path"})
+    assert context.count("@property") == 1
+    assert "class Store:\n    @property\n    def root(self):\n        ..." in context
+
+def test_decorators_are_not_retrieved_as_module_code():
+    module_code = [passage["text"] for passage in extract_passages(CODE)
+                   if passage["title"].startswith("module code")]
+    assert module_code == ["import os"]
+
+def test_context_fits_the_budget():
+    assert estimate_tokens(build_context(CODE, focus={"users"}, budget=40)) <= 40
+
+def test_dropping_many_neighbours_renders_only_a_few_times(monkeypatch):
+    from code_summarizer import context_builder
+
+    callers = "\n\n".join(f"def caller_{i}(x):\n    return helper(x) + {i}" for i in range(300))
+    code = f"def helper(x):\n    return x\n\n{callers}\n"
+    renders = []
+    original = context_builder._Plan.render
+
+    def counting_render(plan, gaps):
+        renders.append(1)
+        return original(plan, gaps)
+
+    monkeypatch.setattr(context_builder._Plan, "render", counting_render)
+    context = build_context(code, focus={"helper"}, budget=200)
+    assert estimate_tokens(context) <= 200
+    assert "def helper(x):\n    return x" in context
+    assert len(renders) < 10
+
+def _definitions(count, start=0):
+    return "\n\n".join(f"def step_{i}(value):\n    total = value + {i}\n    return step_{i + 1}(total)"
+                       for i in range(start, start + count))
+
+def test_completion_of_a_long_file_with_an_early_syntax_error_stays_in_budget(monkeypatch):
+    from code_summarizer import context_builder
+
+    code = _definitions(50) + "\n\ndef broken(:\n    pass\n\n" + _definitions(3000, 50) + "\n\ndef last(value):\n    return step_3"
+    parses = []
+    original = context_builder.build_symbol_index
+    monkeypatch.setattr(context_builder, "build_symbol_index",
+                        lambda source: parses.append(1) or original(source))
+    prefix, context, target = split_for_completion(code, budget=500)
+    assert len(parses) <= context_builder.MAX_SPLIT_ATTEMPTS
+    assert target == "def last(value):\n    return step_3"
+    assert code.startswith(prefix) and "def step_3049(value)" in prefix
+    assert estimate_tokens(context) + estimate_tokens(target) <= 500
+    assert code.rstrip().endswith(target) and context and code.count(context) == 1
+
+def test_an_oversized_unfinished_definition_is_cut_to_the_budget():
+    body = "\n".join(f"    line_{i} = compute({i})" for i in range(2000))
+    code = _definitions(20) + "\n\ndef huge(value):\n" + body
+    prefix, context, target = split_for_completion(code, budget=300)
+    assert context == ""
+    assert prefix + target == code
+    assert 0 < estimate_tokens(target) <= 300
+    assert target.endswith("line_1999 = compute(1999)")
@@ -0,0 +1,127 @@
+# code_summarizer/tests/test_dedup.py
+
+from code_summarizer.dedup import collapse_duplicates, find_duplicates
+from code_summarizer.retrieval import extract_passages, merge_duplicate_hits, RetrievalIndex
+from code_summarizer.summary_tree import build_module_tree, duplicate_links
+
+FETCH_USERS = '''
+def fetch_users(session, limit):
+    """Active users."""
+    url = "https://api.example.com/users"
+    response = session.get(url, params={"limit": limit}, timeout=10)
+    if response.status_code != 200:
+        raise RuntimeError(f"request failed: {response.status_code}")
+    payload = response.json()
+    return [item for item in payload["items"] if item.get("active")]
+'''
+# Same code with other local names: an exact copy.
+LOAD_USERS = '''
+def load_users(client, count):
+    url = "https://api.example.com/users"
+    reply = client.get(url, params={"limit": count}, timeout=10)
+    if reply.status_code != 200:
+        raise RuntimeError(f"request failed: {reply.status_code}")
+    data = reply.json()
+    return [entry for entry in data["items"] if entry.get("active")]
+'''
+# Same shape, but it talks to another service: only the literals differ.
+DELETE_ORDERS = '''
+def delete_orders(session, limit):
+    url = "https://billing.internal/orders/purge"
+    response = session.get(url, params={"limit": limit}, timeout=10)
+    if response.status_code != 200:
+        raise RuntimeError(f"request failed: {response.status_code}")
+    payload = response.json()
+    return [item for item in payload["items"] if item.get("active")]
+'''
+# One extra statement: a near-duplicate.
+FETCH_AND_LOG = '''
+def fetch_and_log(session, limit):
+    url = "https://api.example.com/users"
+    response = session.get(url, params={"limit": limit}, timeout=10)
+    if response.status_code != 200:
+        raise RuntimeError(f"request failed: {response.status_code}")
+    payload = response.json()
+    print(payload)
+    return [item for item in payload["items"] if item.get("active")]
+'''
+# Same shape, but it calls other helpers: not a duplicate at all.
+SYNC_ORDERS = '''
+def sync_orders(session, limit):
+    url = "https://api.example.com/users"
+    response = session.post(url, json={"limit": limit}, timeout=10)
+    if response.status_code != 200:
+        raise ValueError(f"request failed: {response.status_code}")
+    payload = response.text()
+    return [item for item in payload["rows"] if item.pop("stale")]
+'''
+
+def cluster_of(code, qualname):
+    return find_duplicates(code).cluster_of(qualname)
+
+def test_renamed_copies_are_exact_duplicates():
+    cluster = cluster_of(FETCH_USERS + LOAD_USERS, "load_users")
+    assert [m.qualname for m in cluster.members] == ["fetch_users", "load_users"]
+    assert cluster.exact
+    assert cluster.relation("load_users") == "exact"
+
+def test_functions_differing_only_in_literals_are_not_exact():
+    cluster = cluster_of(FETCH_USERS + DELETE_ORDERS, "delete_orders")
+    assert not cluster.exact
+    assert cluster.relation("delete_orders") == "literals"
+    assert cluster.literal_variants["delete_orders"] == [
+        ("'https://billing.internal/orders/purge'", "'https://api.example.com/users'")]
+
+def test_near_duplicates_are_clustered_but_not_exact():
+    cluster = cluster_of(FETCH_USERS + FETCH_AND_LOG, "fetch_and_log")
+    assert cluster.relation("fetch_and_log") == "near"
+    assert 0.8 <= cluster.similarity < 1.0
+
+def test_functions_calling_different_helpers_are_not_duplicates():
+    assert find_duplicates(FETCH_USERS + SYNC_ORDERS).clusters == []
+
+def test_attributes_named_like_locals_are_not_renamed():
+    # Each function reads the attribute named by its own parameter: other fields, other code.
+    template = '''
+def {name}(record, {field}):
+    value = record.{field}
+    if value is None:
+        raise KeyError(f"missing {{{field}}}")
+    cleaned = [part.strip() for part in str(value).split(",") if part]
+    record.touched = True
+    return cleaned, len(cleaned), record.{field}
+'''
+    code = template.format(name="read_owner", field="owner") + template.format(name="read_email", field="email")
+    cluster = cluster_of(code, "read_email")
+    assert cluster is None or cluster.relation("read_email") == "near"
+
+def test_collapse_keeps_differing_literals_and_near_duplicates():
+    code = FETCH_USERS + LOAD_USERS + DELETE_ORDERS + FETCH_AND_LOG
+    collapsed = collapse_duplicates(code)
+    assert "def load_users(client, count):\n    ...  # same implementation as fetch_users\n" in collapsed
+    assert ("...  # same implementation as fetch_users, but with 'https://billing.internal/orders/purge'"
+            " instead of 'https://api.example.com/users'") in collapsed
+    assert FETCH_AND_LOG in collapsed
+    assert FETCH_USERS in collapsed
+
+def test_collapse_leaves_unparseable_code_alone():
+    assert collapse_duplicates("def broken(:\n    pass\n") == "def broken(:\n    pass\n"
+
+def test_only_exact_copies_are_folded_into_one_search_hit():
+    code = FETCH_USERS + LOAD_USERS + DELETE_ORDERS
+    passages = merge_duplicate_hits(extract_passages(code))
+    qualnames = [passage.get("qualname") for passage in passages]
+    assert "load_users" not in qualnames
+    assert "delete_orders" in qualnames
+    assert "also implemented by load_users" in passages[qualnames.index("fetch_users")]["title"]
+    assert "other literals as fetch_users" in passages[qualnames.index("delete_orders")]["title"]
+    hits = RetrievalIndex.build(extract_passages(code)).search("purge billing", top_k=1)
+    assert hits[0][1]["qualname"] == "delete_orders"
+
+def test_summary_tree_copies_summaries_only_for_exact_and_literal_variants():
+    code = FETCH_USERS + LOAD_USERS + DELETE_ORDERS + FETCH_AND_LOG
+    root = build_module_tree(code, "api")
+    links = {node.name: note for node, (_, note) in duplicate_links(root, code).items()}
+    assert links["load_users"] == "Same implementation as `fetch_users`."
+    assert "'https://billing.internal/orders/purge'" in links["delete_orders"]
+    assert "fetch_and_log" not in links
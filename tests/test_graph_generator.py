@@ -0,0 +1,19 @@
+# code_summarizer/tests/test_graph_generator.py
+
+import networkx as nx
+
+from code_summarizer.graph_generator import limit_graph
+
+def test_edges_beyond_the_limit_are_dropped_and_reported():
+    graph = nx.complete_graph(30, create_using=nx.DiGraph)
+    graph.add_node("lonely", size=3)
+    limited, note = limit_graph(graph, max_nodes=100, max_edges=100)
+    assert limited.number_of_edges() == 100
+    assert limited.number_of_nodes() == 31
+    assert limited.nodes["lonely"]["size"] == 3
+    assert note == "Dropped 770 of 870 edges."
+    assert graph.number_of_edges() == 870
+
+def test_small_graphs_are_left_alone():
+    graph = nx.path_graph(5, create_using=nx.DiGraph)
+    assert limit_graph(graph, max_nodes=10, max_edges=10) == (graph, "")
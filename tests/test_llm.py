@@ -0,0 +1,33 @@
+# code_summarizer/tests/test_llm.py
+
+from code_summarizer import llm
+from code_summarizer.cache import ResponseCache, make_key
+from code_summarizer.project_index import ProjectIndex
+from code_summarizer.summary_tree import SummaryTree
+
+def use_mock(monkeypatch):
+    monkeypatch.setenv("CODE_NAVIGATOR_BACKEND", "mock")
+    monkeypatch.setenv("MOCK_LATENCY", "0")
+    monkeypatch.setenv("MOCK_JITTER", "0")
+    monkeypatch.setattr(llm, "_models", {})
+    monkeypatch.setattr(llm, "_configured", False)
+    cache = ResponseCache(":memory:")
+    monkeypatch.setattr(llm, "get_response_cache", lambda: cache)
+    return cache
+
+def test_mock_responses_are_not_cached_under_the_real_model(monkeypatch):
+    cache = use_mock(monkeypatch)
+    text = llm.generate_text("Explain this code.", "models/real")
+    assert "".join(llm.stream_text("Explain that code.", "models/real")).startswith("## Mock response")
+    assert cache.get(make_key("models/real", "Explain this code.")) is None
+    assert cache.get(make_key("models/real", "Explain that code.")) is None
+    assert cache.get(make_key("mock:models/real", "Explain this code.")) == text
+
+def test_mock_summaries_are_not_stored_under_the_real_model(monkeypatch):
+    use_mock(monkeypatch)
+    store = ProjectIndex(":memory:")
+    root = SummaryTree("models/real", store=store, max_workers=1).summarize_module(
+        "def f(x):\n    return x\n", "m")
+    keys = [node.key for node in root.walk()]
+    assert store.get_summaries(keys, "models/real") == {}
+    assert len(store.get_summaries(keys, "mock:models/real")) == len(keys)
@@ -0,0 +1,49 @@
+# code_summarizer/tests/test_project_index.py
+
+from code_summarizer.project_index import ProjectIndex
+
+CODE = '''def load(path):
+    return parse(read(path))
+
+def read(path):
+    return open(path).read()
+
+def parse(text):
+    return text.split()
+'''
+
+def test_update_returns_the_call_edges_it_stored():
+    index = ProjectIndex(":memory:")
+    diff = index.update("a.py", CODE)
+    assert diff.calls == index.calls("a.py")
+    assert diff.calls["load"] == {"parse", "read"}
+    assert index.update("a.py", CODE).calls == diff.calls
+
+def test_files_are_tracked_separately():
+    index = ProjectIndex(":memory:")
+    index.update("sessions/one/pasted.py", CODE)
+    other = index.update("sessions/two/pasted.py", "def load(path):\n    return path\n")
+    assert other.calls == {"load": set()}
+    assert index.calls("sessions/one/pasted.py")["load"] == {"parse", "read"}
+
+def test_only_changed_definitions_are_recomputed_and_resummarized():
+    index = ProjectIndex(":memory:")
+    sent = []
+
+    def summarize(code):
+        sent.append(code.split("(")[0])
+        return f"summary of {code.split('(')[0]}"
+
+    index.update("a.py", CODE)
+    index.summarize_definitions("a.py", CODE, summarize, "model")
+    assert sorted(sent) == ["def load", "def parse", "def read"]
+
+    edited = CODE.replace("return text.split()", "return text.split(',')")
+    diff = index.update("a.py", edited)
+    assert diff.changed == ["parse"]
+    assert sorted(diff.unchanged) == ["load", "read"]
+    assert diff.added == diff.removed == []
+    sent.clear()
+    summaries = index.summarize_definitions("a.py", edited, summarize, "model")
+    assert sent == ["def parse"]
+    assert summaries["load"] == "summary of def load"
@@ -0,0 +1,29 @@
+# code_summarizer/tests/test_repository.py
+
+from code_summarizer.repository import index_repository
+
+FILES = {
+    "pkg/__init__.py": "",
+    "pkg/a.py": "from .b import helper\nimport pkg.c\n\ndef run():\n    return helper() + pkg.c.value()\n",
+    "pkg/b.py": "class Helper:\n    def go(self):\n        return self.step()\n\n    def step(self):\n        return 1\n\n"
+                "def helper():\n    return Helper().go()\n",
+    "pkg/c.py": "def value():\n    return 2\n",
+    "pkg/broken.py": "def broken(:\n",
+}
+
+def test_imports_and_calls_are_resolved_across_files(tmp_path):
+    for name, code in FILES.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(code)
+    progress = []
+    graph = index_repository(str(tmp_path), max_workers=2,
+                             on_progress=lambda done, total, module: progress.append((done, total)))
+    assert progress[-1] == (5, 5)
+    assert ("pkg.a", "pkg.b") in graph.module_edges
+    assert ("pkg.a", "pkg.c") in graph.module_edges
+    assert ("pkg.a.run", "pkg.b.helper") in graph.call_edges
+    assert ("pkg.a.run", "pkg.c.value") in graph.call_edges
+    assert ("pkg.b.Helper.go", "pkg.b.Helper.step") in graph.call_edges
+    assert graph.cross_module_edges() == {("pkg.a.run", "pkg.b.helper"), ("pkg.a.run", "pkg.c.value")}
+    assert graph.modules["pkg.broken"]["error"].startswith("SyntaxError")
+    assert graph.modules["pkg.a"]["path"] == "pkg/a.py"
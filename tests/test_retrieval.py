@@ -0,0 +1,36 @@
+# code_summarizer/tests/test_retrieval.py
+
+import os
+import time
+
+from code_summarizer import retrieval
+
+CODE = '''
+def load_config(path):
+    """Reads the settings file."""
+    return open(path).read()
+
+def send_email(address, body):
+    return smtp_send(address, body)
+'''
+
+def test_index_is_saved_atomically_and_reloaded(tmp_path, monkeypatch):
+    monkeypatch.setenv("CODE_NAVIGATOR_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(retrieval, "_loaded_indexes", retrieval.OrderedDict())
+    assert [p["qualname"] for p in retrieval.retrieve(CODE, "settings config")] == ["load_config"]
+    saved = os.listdir(tmp_path / "retrieval")
+    assert len(saved) == 1 and not saved[0].startswith(".tmp-")
+
+    monkeypatch.setattr(retrieval, "_loaded_indexes", retrieval.OrderedDict())
+    monkeypatch.setattr(retrieval, "extract_passages", lambda code: 1 / 0)
+    assert [p["qualname"] for p in retrieval.retrieve(CODE, "email")] == ["send_email"]
+
+def test_prune_drops_expired_and_least_recently_used_indexes(tmp_path):
+    now = time.time()
+    for name, age in (("old", 40 * 24 * 3600), ("stale", 3600), ("fresh", 0), (".tmp-dead", 7200)):
+        directory = tmp_path / name
+        directory.mkdir()
+        (directory / "meta.json").write_bytes(b"x" * 100)
+        os.utime(directory, (now - age, now - age))
+    retrieval.prune_retrieval_cache(str(tmp_path), max_bytes=150)
+    assert os.listdir(tmp_path) == ["fresh"]
@@ -0,0 +1,45 @@
+# code_summarizer/tests/test_sandbox.py
+
+import pytest
+
+from code_summarizer.sandbox import ExecutionLimits, SandboxPool
+
+@pytest.fixture
+def pool():
+    pool = SandboxPool(size=1, limits=ExecutionLimits(cpu_seconds=2, wall_seconds=5))
+    yield pool
+    pool.shutdown()
+
+def test_state_does_not_leak_between_runs(pool):
+    polluting = "import json, os\nos.environ['SANDBOX_LEAK'] = '1'\njson.dumps = lambda *args: 'patched'\n"
+    assert list(pool.run(polluting)) == [("functions", [])]
+    events = list(pool.run("import json, os\nprint(os.environ.get('SANDBOX_LEAK'), json.dumps(1))\n"))
+    assert ("stdout", "None 1") in events
+
+def test_wall_clock_limit_stops_the_run_and_the_pool_recovers(pool):
+    events = list(pool.run("while True:\n    pass\n", limits=ExecutionLimits(cpu_seconds=5, wall_seconds=0.5)))
+    assert events[-1][0] == "error"
+    assert list(pool.run("print('after')\n")) == [("stdout", "after"), ("functions", [])]
+
+def test_functions_are_called_in_the_worker_that_ran_the_module_once(pool):
+    code = "print('top level')\ncounter = []\ndef greet(name):\n    counter.append(name)\n    return len(counter)\n"
+    events = list(pool.run(code, call_functions=True))
+    assert events == [("stdout", "top level"), ("functions", ["greet"]), ("call", "greet"),
+                      ("args", "['World']"), ("result", "1")]
+
+def test_stderr_is_forwarded(pool):
+    code = "import sys, traceback\ntry:\n    1 / 0\nexcept ZeroDivisionError:\n    traceback.print_exc()\n"
+    events = list(pool.run(code))
+    assert ("stderr", "ZeroDivisionError: division by zero") in events
+
+def test_output_limit_stops_the_run(pool):
+    limits = ExecutionLimits(cpu_seconds=5, wall_seconds=5, output_chars=1000)
+    events = list(pool.run("while True:\n    print('x' * 100)\n", limits=limits))
+    assert len(events) == 11
+    assert events[:9] == [("stdout", "x" * 100)] * 9
+    assert events[9] == ("stdout", "x" * 91)
+    assert events[-1] == ("error", "Output limit of 1000 characters exceeded; the run was stopped.")
+    events = list(pool.run("print('y' * 10 ** 7, end='')\n", limits=limits))
+    assert events == [("stdout", "y" * 1000), events[-1]]
+    assert events[-1][0] == "error"
+    assert list(pool.run("print('after')\n")) == [("stdout", "after"), ("functions", [])]
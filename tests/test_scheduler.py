@@ -0,0 +1,75 @@
+# code_summarizer/tests/test_scheduler.py
+
+import threading
+import time
+
+import pytest
+from google.api_core import exceptions as api_exceptions
+
+from code_summarizer.scheduler import BULK, INTERACTIVE, RequestScheduler, TokenBucket
+
+def test_token_bucket_starts_full_and_refills_at_its_rate():
+    bucket = TokenBucket(per_minute=60)
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60, now)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 0.5) == pytest.approx(0.5)
+    assert bucket.wait_time(1, now + 1.0) == 0
+
+def test_token_bucket_caps_oversized_requests_at_capacity():
+    bucket = TokenBucket(per_minute=60, capacity=10)
+    now = bucket.updated
+    assert bucket.wait_time(1000, now) == 0
+    bucket.take(1000, now)
+    assert bucket.available == 0
+
+def test_waiting_requests_are_admitted_by_priority():
+    scheduler = RequestScheduler(requests_per_minute=600)
+    scheduler.requests.take(scheduler.requests.capacity, time.monotonic())
+    admitted = []
+
+    def request(priority, name):
+        scheduler.acquire(priority=priority)
+        admitted.append(name)
+
+    bulk = threading.Thread(target=request, args=(BULK, "bulk"))
+    interactive = threading.Thread(target=request, args=(INTERACTIVE, "interactive"))
+    bulk.start()
+    time.sleep(0.02)
+    interactive.start()
+    bulk.join(5)
+    interactive.join(5)
+    assert admitted == ["interactive", "bulk"]
+
+def test_acquire_times_out_at_the_deadline():
+    scheduler = RequestScheduler(requests_per_minute=1)
+    scheduler.requests.take(1, time.monotonic())
+    with pytest.raises(TimeoutError):
+        scheduler.acquire(deadline=time.monotonic() + 0.05)
+    assert scheduler.stats["timeouts"] == 1
+
+def test_call_retries_transient_errors():
+    scheduler = RequestScheduler(requests_per_minute=6000, base_delay=0.001, max_delay=0.001)
+    attempts = []
+
+    def flaky(remaining):
+        attempts.append(remaining)
+        if len(attempts) < 3:
+            raise api_exceptions.ServiceUnavailable("try again")
+        return "ok"
+
+    assert scheduler.call(flaky, timeout=5) == "ok"
+    assert len(attempts) == 3
+    assert all(0 < remaining <= 5 for remaining in attempts)
+    assert scheduler.stats["retries"] == 2
+
+def test_call_gives_up_after_max_retries():
+    scheduler = RequestScheduler(requests_per_minute=6000, max_retries=1, base_delay=0.001, max_delay=0.001)
+
+    def failing(remaining):
+        raise api_exceptions.ServiceUnavailable("down")
+
+    with pytest.raises(api_exceptions.ServiceUnavailable):
+        scheduler.call(failing)
+    assert scheduler.stats["failures"] == 1
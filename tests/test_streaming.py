@@ -0,0 +1,79 @@
+# code_summarizer/tests/test_streaming.py
+
+import pytest
+
+from code_summarizer.completer import strip_code_fences
+
+def split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 100])
+@pytest.mark.parametrize("response", [
+    "```python\ndef f():\n    return 1\n```\n",
+    "```\ndef f():\n    return 1\n```",
+    "  def f():\n    return 1\n",
+])
+def test_fences_are_stripped_however_the_text_is_split(response, size):
+    assert "".join(strip_code_fences(split(response, size))) == "def f():\n    return 1"
+
+def test_backticks_inside_the_code_are_kept():
+    response = '```python\nDOC = "``inline``"\nx = 1\n```'
+    assert "".join(strip_code_fences(split(response, 4))) == 'DOC = "``inline``"\nx = 1'
+
+def test_text_is_yielded_before_the_stream_ends():
+    pieces = iter(["```python\n", "def f():\n", "    return 1\n", "```"])
+    stripped = strip_code_fences(pieces)
+    assert next(stripped) == "def f():"
+
+class BlockedChunk:
+    @property
+    def text(self):
+        raise ValueError("The response was blocked.")
+
+class StreamingModel:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        return iter(self.chunks)
+
+def test_streamed_chunks_without_text_are_skipped_inside_the_span(monkeypatch):
+    from code_summarizer import llm
+    from code_summarizer.mock_backend import MockResponse
+    from code_summarizer.tracing import trace
+
+    chunks = [BlockedChunk(), MockResponse("  Hello"), BlockedChunk(), MockResponse(" world")]
+    monkeypatch.setattr(llm, "get_model", lambda model_name: StreamingModel(chunks))
+    with trace("stream") as run:
+        assert "".join(llm.stream_text("prompt", use_cache=False)) == "Hello world"
+    stage = run.summary()["llm.stream"]
+    assert stage["count"] == 1
+    assert stage["empty_chunks"] == 2
+
+def test_streaming_works_outside_a_trace(monkeypatch):
+    from code_summarizer import llm
+    from code_summarizer.mock_backend import MockResponse
+
+    monkeypatch.setattr(llm, "get_model", lambda model_name: StreamingModel([MockResponse("Hi")]))
+    assert list(llm.stream_text("prompt", use_cache=False)) == ["Hi"]
+
+def test_spans_opened_between_pieces_are_not_nested_under_the_stream(monkeypatch):
+    from code_summarizer import llm
+    from code_summarizer.mock_backend import MockResponse
+    from code_summarizer.tracing import span, trace
+
+    chunks = [MockResponse("one "), MockResponse("two "), MockResponse("three")]
+    monkeypatch.setattr(llm, "get_model", lambda model_name: StreamingModel(chunks))
+    with trace("stream") as run:
+        with span("consumer"):
+            for _ in llm.stream_text("prompt", use_cache=False):
+                with span("render"):
+                    pass
+        stream = llm.stream_text("prompt", use_cache=False)
+        next(stream)
+        stream.close()
+    spans = run.spans
+    streams = [s for s in spans if s.name == "llm.stream"]
+    assert [s.parent.name for s in streams] == ["consumer", "run"]
+    assert {s.parent.name for s in spans if s.name == "render"} == {"consumer"}
+    assert streams[1].end is not None and streams[1].attrs["closed"]
@@ -0,0 +1,51 @@
+# code_summarizer/tests/test_summarizer.py
+
+import ast
+
+from code_summarizer import tokens
+from code_summarizer.summarizer import chunk_code
+from code_summarizer.tokens import calibrate, estimate_tokens
+
+def function(name, lines=3):
+    body = "".join(f"    value_{n} = compute(value_{n - 1}, {n})\n" for n in range(1, lines + 1))
+    return f"def {name}(value_0):\n{body}    return value_{lines}\n"
+
+def test_estimate_counts_words_punctuation_and_indentation():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("x") == 1
+    assert estimate_tokens("x = 1") == 3
+    assert estimate_tokens("a_very_long_identifier_name") == 7
+    assert estimate_tokens("def f():\n    return 1") == 9
+
+def test_calibration_scales_the_estimate(monkeypatch):
+    monkeypatch.setattr(tokens, "_calibration", 1.0)
+    text = function("f", lines=20)
+    raw = estimate_tokens(text)
+    calibrate(text, raw * 2)
+    assert estimate_tokens(text) == raw * 2
+
+def test_definitions_are_packed_whole():
+    code = "\n".join(function(f"f{n}") for n in range(40))
+    budget = estimate_tokens(function("f0")) * 5
+    chunks = chunk_code(code, max_tokens=budget)
+    assert 1 < len(chunks) < 40
+    for chunk in chunks:
+        assert estimate_tokens(chunk) <= budget
+        ast.parse(chunk)
+    assert "\n".join(chunks).split() == code.split()
+
+def test_an_oversized_definition_is_split_by_lines():
+    big = function("big", lines=200)
+    code = function("small") + "\n" + big + "\n" + function("after")
+    chunks = chunk_code(code, max_tokens=500)
+    assert chunks[0].strip() == function("small").strip()
+    assert chunks[-1].strip() == function("after").strip()
+    assert len(chunks) > 3
+    assert "\n".join(chunks[1:-1]).strip().splitlines() == big.strip().splitlines()
+
+def test_unparsable_code_is_split_by_lines():
+    code = "def broken(:\n" + "".join(f"    line_{n} = {n}\n" for n in range(300))
+    chunks = chunk_code(code, max_tokens=200)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 200 for chunk in chunks)
+    assert "\n".join(chunks).splitlines() == code.splitlines()
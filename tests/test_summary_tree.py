@@ -0,0 +1,118 @@
+# code_summarizer/tests/test_summary_tree.py
+
+from code_summarizer.project_index import ProjectIndex
+from code_summarizer.summary_tree import SummaryTree, build_module_tree
+from code_summarizer.tests.test_dedup import FETCH_USERS, LOAD_USERS
+
+CODE = '''"""Orders."""
+
+TAX = 0.2
+
+def total(items):
+    return sum(item.price for item in items)
+
+def with_tax(amount):
+    return amount * (1 + TAX)
+
+class Cart:
+    def __init__(self):
+        self.items = []
+
+    def add(self, item):
+        self.items.append(item)
+
+    def checkout(self):
+        return with_tax(total(self.items))
+'''
+
+class RecordingTree(SummaryTree):
+    """Summarizes without a model and records which nodes were sent to it."""
+
+    def __init__(self, store, model_name="model-a"):
+        super().__init__(model_name=model_name, store=store, max_workers=2)
+        self.sent = []
+
+    def _summarize_leaf(self, node):
+        self.sent.append(node.name)
+        return f"leaf {node.name}"
+
+    def _summarize_parent(self, node):
+        self.sent.append(node.name)
+        return f"parent {node.name}: " + ", ".join(child.summary for child in node.children)
+
+def test_tree_groups_methods_under_classes():
+    root = build_module_tree(CODE, "orders")
+    assert [child.name for child in root.children] == ["total", "with_tax", "Cart"]
+    assert [child.name for child in root.find("Cart").children] == ["Cart.__init__", "Cart.add", "Cart.checkout"]
+    assert root.find("total").is_leaf and not root.find("Cart").is_leaf
+
+def test_every_node_is_summarized_once_children_first():
+    tree = RecordingTree(ProjectIndex(":memory:"))
+    root = tree.summarize_module(CODE, "orders")
+    assert sorted(tree.sent) == sorted(node.name for node in root.walk())
+    assert tree.sent.index("Cart.add") < tree.sent.index("Cart") < tree.sent.index("orders")
+    assert "leaf Cart.checkout" in root.find("Cart").summary
+
+def test_only_the_edited_definition_and_its_ancestors_are_resummarized():
+    store = ProjectIndex(":memory:")
+    RecordingTree(store).summarize_module(CODE, "orders")
+
+    tree = RecordingTree(store)
+    edited = CODE.replace("self.items.append(item)", "self.items.insert(0, item)")
+    root = tree.summarize_module(edited, "orders")
+    assert sorted(tree.sent) == ["Cart", "Cart.add", "orders"]
+    assert root.find("total").summary == "leaf total"
+
+def test_unchanged_code_is_not_resummarized():
+    store = ProjectIndex(":memory:")
+    RecordingTree(store).summarize_module(CODE, "orders")
+    tree = RecordingTree(store)
+    tree.summarize_module(CODE, "orders")
+    assert tree.sent == []
+
+def test_keys_change_with_module_level_code():
+    before = build_module_tree(CODE, "orders")
+    after = build_module_tree(CODE.replace("TAX = 0.2", "TAX = 0.25"), "orders")
+    assert before.key != after.key
+    assert before.find("Cart").key == after.find("Cart").key
+
+def test_summaries_are_not_shared_between_models():
+    store = ProjectIndex(":memory:")
+    RecordingTree(store, model_name="model-a").summarize_module(CODE, "orders")
+    tree = RecordingTree(store, model_name="model-b")
+    root = tree.summarize_module(CODE, "orders")
+    assert sorted(tree.sent) == sorted(node.name for node in root.walk())
+
+def test_least_recently_used_summaries_are_evicted():
+    store = ProjectIndex(":memory:", max_summary_bytes=20)
+    store.set_summary("old", "x" * 10, "model-a")
+    store.set_summary("used", "y" * 10, "model-a")
+    assert store.get_summary("used", "model-a") == "y" * 10
+    store.set_summary("new", "z" * 10, "model-a")
+    assert store.get_summary("old", "model-a") is None
+    assert store.get_summary("used", "model-a") == "y" * 10
+    assert store.get_summary("new", "model-b") is None
+
+def test_copied_summaries_follow_their_representative():
+    code = FETCH_USERS + LOAD_USERS
+    store = ProjectIndex(":memory:")
+    root = RecordingTree(store).summarize_module(code, "api")
+    assert root.find("load_users").summary == "Same implementation as `fetch_users`. leaf fetch_users"
+
+    class EditedTree(RecordingTree):
+        def _summarize_leaf(self, node):
+            self.sent.append(node.name)
+            return f"edited {node.name}"
+
+    # Both copies edited alike: still duplicates, and the copy follows the new summary.
+    both = code.replace("timeout=10", "timeout=30")
+    tree = EditedTree(store)
+    root = tree.summarize_module(both, "api")
+    assert "load_users" not in tree.sent
+    assert root.find("load_users").summary == "Same implementation as `fetch_users`. edited fetch_users"
+
+    # Only the representative edited: the unchanged copy still follows it.
+    tree = EditedTree(store)
+    root = tree.summarize_module(code.replace("timeout=10", "timeout=30", 1), "api")
+    assert root.find("load_users").summary == (
+        "Same implementation as `fetch_users`, but with 10 instead of 30. edited fetch_users")
@@ -0,0 +1,138 @@
+# code_summarizer/tests/test_ts_parser.py
+
+import pytest
+
+from code_summarizer import navigator, ts_parser
+from code_summarizer.project_index import ProjectIndex
+
+needs_tree_sitter = pytest.mark.skipif(not ts_parser.is_available(),
+                                       reason="tree-sitter or the compiled Python grammar is not installed")
+
+VALID = '''import os
+
+def load(path):
+    return parse(path)
+
+def parse(text):
+    return text.split()
+
+class Store:
+    @property
+    def root(self):
+        return os.getcwd()
+'''
+BROKEN = VALID + '''
+def main(:
+    data = load("x")
+    for item in data
+'''
+
+def _spans(index):
+    return [(s.qualname, s.kind, s.lineno, s.end_lineno, s.decorator_lineno, s.body_lineno, sorted(s.calls))
+            for s in index.symbols]
+
+def test_syntax_errors_are_raised_without_tree_sitter(monkeypatch):
+    monkeypatch.setattr(ts_parser, "is_available", lambda: False)
+    with pytest.raises(SyntaxError):
+        navigator.extract_functions_and_calls(BROKEN)
+
+def test_valid_code_is_parsed_with_ast():
+    index = navigator.parse_source(VALID)
+    assert not index.partial
+    assert [s.qualname for s in index.symbols] == ["load", "parse", "Store", "Store.root"]
+
+@needs_tree_sitter
+def test_tree_sitter_index_matches_ast_on_valid_code():
+    assert _spans(ts_parser.parse_symbols(VALID)) == _spans(navigator.parse_source(VALID))
+
+@needs_tree_sitter
+def test_broken_code_still_gets_a_navigation_map():
+    functions, calls = navigator.extract_functions_and_calls(BROKEN)
+    assert [f.qualname for f in functions] == ["load", "parse", "Store.root", "main"]
+    assert calls["load"] == {"parse"}
+    assert calls["main"] == {"load"}
+
+@needs_tree_sitter
+def test_project_index_accepts_a_partial_index():
+    index = navigator.parse_source(BROKEN, path="broken.py")
+    assert index.partial
+    project_index = ProjectIndex(":memory:")
+    diff = project_index.update("broken.py", BROKEN, index=index)
+    assert sorted(diff.added) == ["Store", "Store.root", "load", "main", "parse"]
+    assert project_index.calls("broken.py")["main"] == {"load"}
+
+@needs_tree_sitter
+def test_incremental_updates_match_a_fresh_parse():
+    parser = ts_parser.IncrementalParser(BROKEN)
+    edited = BROKEN.replace("def main(:", "def main(argv):").replace("return parse(path)", "return parse(path, 1)")
+    parser.update(edited)
+    assert parser.source == edited
+    assert _spans(parser.index) == _spans(ts_parser.parse_symbols(edited))
+
+    parser.edit(0, 0, "# header\n")
+    assert _spans(parser.index) == _spans(ts_parser.parse_symbols("# header\n" + edited))
+
+@needs_tree_sitter
+def test_parse_symbols_reuses_the_parser_for_a_path():
+    ts_parser.parse_symbols(BROKEN, path="reused.py")
+    parser = ts_parser._parsers["reused.py"]
+    edited = BROKEN.replace("for item in data", "for entry in data")
+    index = ts_parser.parse_symbols(edited, path="reused.py")
+    assert ts_parser._parsers["reused.py"] is parser
+    assert _spans(index) == _spans(ts_parser.parse_symbols(edited))
+
+@needs_tree_sitter
+def test_edits_that_move_or_merge_statements_match_a_fresh_parse():
+    parser = ts_parser.IncrementalParser(VALID)
+    steps = [
+        lambda code: code.replace("    return parse(path)", "    text = open(path).read()\n    return parse(text)"),
+        lambda code: code.replace("def parse(text):", "def parse(text, sep=None):\n    \"\"\"Words.\"\"\""),
+        lambda code: code.replace("class Store:", "class Store(dict):"),
+        lambda code: code.replace("    return text.split()\n", "    return text.split(\n"),
+        lambda code: code.replace("    return text.split(\n", "    return text.split()\n"),
+        lambda code: code.replace("import os\n", ""),
+    ]
+    code = VALID
+    for step in steps:
+        code = step(code)
+        parser.update(code)
+        assert _spans(parser.index) == _spans(ts_parser.parse_symbols(code))
+        assert parser.index.imports == ts_parser.parse_symbols(code).imports
+
+@needs_tree_sitter
+def test_valid_code_of_an_edited_file_takes_the_incremental_path():
+    index = navigator.parse_source(VALID, path="valid.py")
+    assert not index.partial
+    assert "valid.py" in ts_parser._parsers
+    assert _spans(index) == _spans(navigator.parse_source(VALID))
+
+DECORATED = '''import functools
+
+def outer():
+    @functools.lru_cache(maxsize=make_size())
+    def inner(value=default_value(), *, key: make_type() = None) -> result_type():
+        return compute(value)
+
+    class Local(make_base(), metaclass=make_meta()):
+        field = make_field()
+    return inner
+
+@register("name")
+def top(limit=make_limit()):
+    return fetch(limit)
+'''
+
+def _calls(index):
+    return {s.qualname: sorted(s.calls) for s in index.symbols}
+
+def test_decorator_and_default_calls_belong_to_the_enclosing_scope():
+    calls = _calls(navigator.parse_source(DECORATED))
+    assert calls["outer"] == ["default_value", "functools.lru_cache", "make_base", "make_meta",
+                              "make_size", "make_type", "result_type"]
+    assert calls["outer.inner"] == ["compute"]
+    assert calls["outer.Local"] == ["make_field"]
+    assert calls["top"] == ["fetch"]
+
+@needs_tree_sitter
+def test_both_backends_credit_decorator_calls_alike():
+    assert _calls(ts_parser.parse_symbols(DECORATED)) == _calls(navigator.parse_source(DECORATED))
@@ -0,0 +1,46 @@
+# code_summarizer/tokens.py
+
+import re
+
+# Pieces a subword tokenizer treats as units: words, digit runs, whitespace runs
+# and single punctuation characters.
+_PIECE_RE = re.compile(r"[A-Za-z_]+|\d+|\n[ \t]*|[ \t]+|[^\w\s]|\w+")
+
+# Average characters per subword token inside long identifiers and numbers.
+_CHARS_PER_WORD_TOKEN = 4
+_CHARS_PER_DIGIT_TOKEN = 3
+
+# Ratio of real model tokens to the local estimate; adjusted by calibrate().
+_calibration = 1.0
+
+def _raw_estimate(text):
+    count = 0
+    for piece in _PIECE_RE.findall(text):
+        first = piece[0]
+        if first.isdigit():
+            count += -(-len(piece) // _CHARS_PER_DIGIT_TOKEN)
+        elif first.isalpha() or first == "_":
+            count += -(-len(piece) // _CHARS_PER_WORD_TOKEN)
+        elif piece != " ":
+            # Punctuation and whitespace runs (newline plus indentation) are one token each;
+            # a single space is merged into the following word.
+            count += 1
+    return count
+
+def estimate_tokens(text):
+    """Estimates how many model tokens text will use, without calling the API."""
+    if not text:
+        return 0
+    return max(1, round(_raw_estimate(text) * _calibration))
+
+def calibrate(sample_text, actual_tokens):
+    """
+    Scales future estimates so that sample_text counts as actual_tokens.
+    llm.generate_text calls this once per process with the prompt token count
+    reported in the first sufficiently long Gemini response.
+    """
+    global _calibration
+    raw = _raw_estimate(sample_text)
+    if raw and actual_tokens > 0:
+        _calibration = actual_tokens / raw
+    return _calibration
@@ -0,0 +1,220 @@
+# code_summarizer/tracing.py
+
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+
+# The span that new spans nest under; None when no trace is being recorded, which
+# makes every instrumentation call a cheap no-op.
+_current_span = contextvars.ContextVar("code_navigator_span", default=None)
+
+class Span:
+    """One timed stage of a run, with free-form attributes (token counts, cache outcome, ...)."""
+
+    __slots__ = ("trace", "name", "parent", "attrs", "start", "end", "thread_id", "_token")
+
+    def __init__(self, trace, name, parent, attrs):
+        self.trace = trace
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        self.end = None
+        self._token = None
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key, amount=1):
+        """Increments a counter attribute, e.g. span.add("retries")."""
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.perf_counter()
+            self.trace._record(self)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.finish()
+        _current_span.reset(self._token)
+        return False
+
+class _NullSpan:
+    """Stands in for a span when nothing is being traced."""
+
+    duration = 0.0
+
+    def set(self, **attrs):
+        pass
+
+    def add(self, key, amount=1):
+        pass
+
+    def finish(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class Trace:
+    """All spans recorded during one run, plus an optional cProfile report."""
+
+    def __init__(self, name):
+        self.name = name
+        self.spans = []
+        self.profile = ""
+        self._lock = threading.Lock()
+        self.root = Span(self, "run", None, {"name": name})
+
+    def _record(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self):
+        """Per-stage totals: {name: {"count", "total", "max", plus summed numeric attributes}}."""
+        with self._lock:
+            spans = list(self.spans)
+        stages = {}
+        for span in spans:
+            stage = stages.setdefault(span.name, {"count": 0, "total": 0.0, "max": 0.0})
+            stage["count"] += 1
+            stage["total"] += span.duration
+            stage["max"] = max(stage["max"], span.duration)
+            for key, value in span.attrs.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    stage[key] = stage.get(key, 0) + value
+                elif isinstance(value, (str, bool)):
+                    # Categorical outcomes are counted, e.g. "cache=hit": 3.
+                    label = f"{key}={value}"
+                    stage[label] = stage.get(label, 0) + 1
+        return stages
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        ids = {id(span): n for n, span in enumerate(spans)}
+        return {
+            "name": self.name,
+            "duration": self.root.duration,
+            "spans": [
+                {"id": ids[id(span)], "parent": ids.get(id(span.parent)), "name": span.name,
+                 "start": span.start - self.root.start, "duration": span.duration,
+                 "thread": span.thread_id, "attrs": span.attrs}
+                for span in spans
+            ],
+            "summary": self.summary(),
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent, default=str)
+
+    def to_chrome_trace(self):
+        """The trace in Chrome trace-event format, for chrome://tracing or Perfetto."""
+        with self._lock:
+            spans = list(self.spans)
+        pid = os.getpid()
+        events = [
+            {"name": span.name, "cat": span.name.split(".", 1)[0], "ph": "X", "pid": pid,
+             "tid": span.thread_id, "ts": (span.start - self.root.start) * 1e6,
+             "dur": span.duration * 1e6, "args": span.attrs}
+            for span in spans
+        ]
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, default=str)
+
+class trace:
+    """
+    Records every span opened inside the block (and in work submitted with
+    contextvars.copy_context(), see summarizer.map_concurrently) into a Trace:
+
+        with trace("summarize", profile=True) as run:
+            engine.summarize(code)
+        print(run.to_json())
+
+    With profile=True the calling thread is also profiled with cProfile, and the top
+    functions by cumulative time are kept in run.profile.
+    """
+
+    def __init__(self, name, profile=False):
+        self.trace = Trace(name)
+        self._profiler = cProfile.Profile() if profile else None
+
+    def __enter__(self):
+        self.trace.root.__enter__()
+        if self._profiler is not None:
+            self._profiler.enable()
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._profiler is not None:
+            self._profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(self._profiler, stream=report).sort_stats("cumulative").print_stats(40)
+            self.trace.profile = report.getvalue()
+        return self.trace.root.__exit__(exc_type, exc, tb)
+
+def span(name, **attrs):
+    """
+    Starts timing one stage under the current span. Use it as a context manager, keep
+    the returned span and call span.finish() for a stage with nothing nested in it, or,
+    for a generator (e.g. a streamed response), pass it to iterate_in_span. Outside a
+    trace it returns NULL_SPAN, so instrumented code costs almost nothing when not traced.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NULL_SPAN
+    return Span(parent.trace, name, parent, attrs)
+
+def current_span():
+    """The innermost open span, or NULL_SPAN outside a trace."""
+    return _current_span.get() or NULL_SPAN
+
+def iterate_in_span(span, iterator):
+    """
+    Yields the items of iterator (e.g. a generator streaming a response) with span
+    current only while iterator produces the next one, so spans the consumer opens
+    between items do not nest under it. span is finished when iterator is exhausted or
+    raises, or when the consumer stops early and the generator is closed.
+    """
+    try:
+        while True:
+            token = _current_span.set(span) if span is not NULL_SPAN else None
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                if token is not None:
+                    _current_span.reset(token)
+            yield item
+    except GeneratorExit:
+        span.set(closed=True)
+        raise
+    except BaseException as e:
+        span.set(error=type(e).__name__)
+        raise
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+        span.finish()
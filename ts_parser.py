@@ -0,0 +1,405 @@
+# code_summarizer/ts_parser.py
+
+import ast
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+
+try:
+    from tree_sitter import Language, Parser
+except ImportError:  # tree-sitter is optional; ast stays the primary parser.
+    Language = Parser = None
+
+from code_summarizer.symbols import SymbolIndex, Symbol, first_line
+
+# Grammar library compiled by build.py.
+DEFAULT_LIBRARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "build", "my-languages.so")
+
+# One query finds everything the index needs, so the tree is walked in C rather than in Python.
+_QUERY = """
+(function_definition) @definition
+(class_definition) @definition
+(call function: (_) @call)
+(import_statement) @import
+(import_from_statement) @import
+(ERROR) @error
+"""
+
+_language = None
+_query = None
+_language_lock = threading.Lock()
+
+def get_library_path():
+    """Path of the compiled grammar (CODE_NAVIGATOR_TS_LIBRARY or build/my-languages.so)."""
+    return os.getenv("CODE_NAVIGATOR_TS_LIBRARY", DEFAULT_LIBRARY_PATH)
+
+def is_available():
+    """True when tree-sitter is installed and the grammar has been built with build.py."""
+    return Language is not None and os.path.exists(get_library_path())
+
+def get_language():
+    """Loads the Python grammar once. Raises RuntimeError if it is not available."""
+    global _language, _query
+    with _language_lock:
+        if _language is None:
+            if not is_available():
+                raise RuntimeError("The Tree-sitter Python grammar is not available. "
+                                   "Install tree-sitter and run build.py to compile it.")
+            _language = Language(get_library_path(), "python")
+            _query = _language.query(_QUERY)
+    return _language
+
+def _text(node):
+    return node.text.decode("utf-8", errors="replace")
+
+def _call_name(node):
+    """Tree-sitter counterpart of symbols.call_name for the function part of a call."""
+    parts = []
+    while node.type == "attribute":
+        parts.append(_text(node.child_by_field_name("attribute")))
+        node = node.child_by_field_name("object")
+    if node.type == "identifier":
+        parts.append(_text(node))
+        return ".".join(reversed(parts))
+    if parts:
+        return "." + parts[0]
+    return ""
+
+def _docstring(body):
+    if body is None or not body.named_children:
+        return ""
+    statement = body.named_children[0]
+    if statement.type != "expression_statement" or statement.named_children[0].type != "string":
+        return ""
+    text = _text(statement.named_children[0])
+    try:
+        return first_line(ast.literal_eval(text))
+    except (SyntaxError, ValueError):
+        # An unterminated docstring in incomplete code.
+        return first_line(text.lstrip("rRbBuU").strip("\"'"))
+
+class _Definition:
+    """A definition span found in the tree, before it becomes a Symbol."""
+
+    __slots__ = ("name", "is_class", "is_async", "start", "end", "body_start", "body_lineno",
+                 "docstring", "bases", "decorator_lineno", "position")
+
+    def __init__(self, name, is_class, is_async, start, end, body_start, body_lineno, docstring="",
+                 bases=(), decorator_lineno=None):
+        self.name = name
+        self.is_class = is_class
+        self.is_async = is_async
+        self.start = start    # first node of the definition
+        self.end = end        # last node of the definition
+        # Calls before this byte (defaults, annotations, bases) run in the enclosing scope.
+        self.body_start = body_start
+        self.body_lineno = body_lineno
+        self.docstring = docstring
+        self.bases = bases
+        self.decorator_lineno = decorator_lineno
+        self.position = None  # index among the definitions of its top-level statement
+
+def _definition(node):
+    name = node.child_by_field_name("name")
+    if name is None or name.is_missing:
+        return None
+    body = node.child_by_field_name("body")
+    body_lineno = body.start_point[0] + 1 if body is not None and body.named_children else node.start_point[0] + 2
+    bases = ()
+    if node.type == "class_definition":
+        superclasses = node.child_by_field_name("superclasses")
+        if superclasses is not None:
+            bases = tuple(filter(None, (_call_name(base) for base in superclasses.named_children
+                                        if base.type in ("identifier", "attribute"))))
+    decorated = node.parent is not None and node.parent.type == "decorated_definition"
+    return _Definition(_text(name), node.type == "class_definition", node.children[0].type == "async",
+                       node, node, body.start_byte if body is not None else node.end_byte,
+                       min(body_lineno, node.end_point[0] + 1), _docstring(body), bases,
+                       node.parent.start_point[0] + 1 if decorated else None)
+
+def _recovered_definitions(error):
+    """
+    Definitions whose syntax is broken are left as "def"/"class" tokens inside an ERROR
+    node. Each one is taken to run up to the next such token or the end of the node.
+    """
+    children = error.children
+    starts = [i for i, child in enumerate(children[:-1])
+              if child.type in ("def", "class") and children[i + 1].type == "identifier"]
+    definitions = []
+    for n, i in enumerate(starts):
+        first = i - 1 if i and children[i - 1].type == "async" else i
+        last = (starts[n + 1] - 1 if n + 1 < len(starts) else len(children) - 1)
+        if last > first and children[last].type == "async":
+            last -= 1
+        colon = next((child for child in children[i:last + 1] if child.type == ":"), None)
+        body_lineno = (colon.end_point[0] + 2) if colon is not None else children[i].start_point[0] + 2
+        body_start = (colon if colon is not None else children[i + 1]).end_byte
+        definitions.append(_Definition(_text(children[i + 1]), children[i].type == "class",
+                                       children[first].type == "async", children[first], children[last],
+                                       body_start, min(body_lineno, children[last].end_point[0] + 1)))
+    return definitions
+
+def _add_import(index, node):
+    if node.type == "import_statement":
+        for item in node.named_children:
+            if item.type == "aliased_import":
+                index.imports[_text(item.child_by_field_name("alias"))] = _text(item.child_by_field_name("name"))
+            elif item.type == "dotted_name":
+                name = _text(item)
+                head = name.split(".", 1)[0]
+                index.imports[head] = head
+                index.imported_modules.append(name)
+        return
+    module = node.child_by_field_name("module_name")
+    if module is None:
+        return
+    prefix = _text(module)
+    for item in node.children_by_field_name("name"):
+        if item.type == "aliased_import":
+            name, alias = _text(item.child_by_field_name("name")), _text(item.child_by_field_name("alias"))
+        else:
+            name = alias = _text(item)
+        index.imports[alias] = f"{prefix}.{name}" if prefix.lstrip(".") else prefix + name
+
+class _Facts:
+    """
+    What the index needs from one top-level statement, kept between edits so that
+    statements an edit did not touch are not extracted again. Definitions are tuples
+    (name, kind, parent position or -1, lineno, col_offset, end_lineno, end_col_offset,
+    body_lineno, docstring, bases, decorator_lineno, calls) with the line numbers the
+    statement had when it was extracted, at first_row.
+    """
+
+    __slots__ = ("first_row", "definitions", "imports", "imported_modules")
+
+    def __init__(self, first_row):
+        self.first_row = first_row
+        self.definitions = []
+        self.imports = {}
+        self.imported_modules = []
+
+def _extract(statement):
+    """Extracts the _Facts of one top-level statement (a child of the root node)."""
+    facts = _Facts(statement.start_point[0])
+    definitions, calls = [], []
+    for node, capture in _query.captures(statement):
+        if capture == "definition":
+            definition = _definition(node)
+            if definition is not None:
+                definitions.append(definition)
+        elif capture == "call":
+            calls.append(node)
+        elif capture == "import":
+            _add_import(facts, node)
+        else:
+            definitions.extend(_recovered_definitions(node))
+
+    # Outer definitions first, so a stack of open definitions gives each one its parent.
+    definitions.sort(key=lambda d: (d.start.start_byte, -d.end.end_byte))
+    stack, parents, kinds, calls_of = [], [], [], []
+    for position, definition in enumerate(definitions):
+        while stack and stack[-1].end.end_byte <= definition.start.start_byte:
+            stack.pop()
+        parent = stack[-1].position if stack else -1
+        if definition.is_class:
+            kind = "class"
+        else:
+            kind = "function" if parent < 0 or kinds[parent] != "class" else "method"
+            if definition.is_async:
+                kind = "async_" + kind
+        definition.position = position
+        parents.append(parent)
+        kinds.append(kind)
+        calls_of.append([])
+        stack.append(definition)
+
+    # Each call belongs to the innermost definition whose body contains it.
+    starts = [definition.start.start_byte for definition in definitions]
+    for node in calls:
+        position = node.start_byte
+        i = bisect_right(starts, position) - 1
+        while i >= 0 and (definitions[i].end.end_byte <= position or position < definitions[i].body_start):
+            i -= 1
+        name = _call_name(node) if i >= 0 else ""
+        if name:
+            calls_of[i].append(name)
+
+    for definition, parent, kind, calls in zip(definitions, parents, kinds, calls_of):
+        facts.definitions.append((
+            definition.name, kind, parent,
+            definition.start.start_point[0] + 1, definition.start.start_point[1],
+            definition.end.end_point[0] + 1, definition.end.end_point[1],
+            definition.body_lineno, definition.docstring, definition.bases,
+            definition.decorator_lineno, calls,
+        ))
+    return facts
+
+def _add_facts(index, facts, first_row):
+    """Adds the symbols and imports of one statement's facts, moved to start at first_row."""
+    shift = first_row - facts.first_row
+    symbols = []
+    for (name, kind, parent, lineno, col_offset, end_lineno, end_col_offset, body_lineno,
+         docstring, bases, decorator_lineno, calls) in facts.definitions:
+        symbol = Symbol(index, name, kind, symbols[parent] if parent >= 0 else None,
+                        lineno + shift, col_offset, end_lineno + shift, end_col_offset,
+                        body_lineno + shift, docstring,
+                        None if decorator_lineno is None else decorator_lineno + shift)
+        symbol.bases = bases
+        symbol.calls = list(calls)
+        symbols.append(symbol)
+    index.symbols.extend(symbols)
+    index.imports.update(facts.imports)
+    index.imported_modules.extend(facts.imported_modules)
+
+def _index_from_facts(source_code, statements, partial):
+    index = SymbolIndex(source_code)
+    index.partial = partial
+    for _, _, first_row, facts in statements:
+        _add_facts(index, facts, first_row)
+    return index
+
+def _extract_all(tree):
+    """(start byte, end byte, first row, facts) of every top-level statement of tree."""
+    get_language()
+    return [(node.start_byte, node.end_byte, node.start_point[0], _extract(node))
+            for node in tree.root_node.children]
+
+def build_index_from_tree(tree, source_code):
+    """
+    Builds a SymbolIndex with the same shape as symbols.build_symbol_index from a
+    Tree-sitter tree. Parts of the code with syntax errors are skipped or recovered as
+    well as possible, and index.partial is set.
+    """
+    return _index_from_facts(source_code, _extract_all(tree), tree.root_node.has_error)
+
+def _common_prefix_length(a, b):
+    """Length of the common prefix of two strings, comparing slices rather than characters."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def _point(text, offset):
+    """(row, byte column) of a character offset, relative to the start of text."""
+    row = text.count("\n", 0, offset)
+    line_start = text.rfind("\n", 0, offset) + 1
+    column = len(text[line_start:offset].encode("utf-8"))
+    return row, column
+
+class IncrementalParser:
+    """
+    Error-tolerant parser for one evolving source file. After an edit, only the changed
+    region is re-parsed: Tree-sitter reuses the rest of the previous tree. Symbols are
+    only extracted again for the top-level statements the edit touched; the others keep
+    their facts, moved by the lines the edit added or removed. The symbol index is
+    assembled lazily, the first time it is needed after an edit.
+    """
+
+    def __init__(self, source_code=""):
+        self.parser = Parser()
+        self.parser.set_language(get_language())
+        self.source = source_code
+        self._bytes = source_code.encode("utf-8")
+        self.tree = self.parser.parse(self._bytes)
+        self._statements = _extract_all(self.tree)
+        self._index = None
+
+    @property
+    def has_errors(self):
+        return self.tree.root_node.has_error
+
+    def edit(self, start, end, new_text):
+        """Replaces source[start:end] (character offsets) with new_text and re-parses."""
+        source = self.source
+        start_byte = len(source[:start].encode("utf-8"))
+        old_end_byte = start_byte + len(source[start:end].encode("utf-8"))
+        new_bytes = new_text.encode("utf-8")
+        new_end_byte = start_byte + len(new_bytes)
+
+        start_row, start_column = _point(source, start)
+        old_rows = source.count("\n", start, end)
+        old_end_column = (len(source[source.rfind("\n", start, end) + 1:end].encode("utf-8"))
+                          if old_rows else start_column + old_end_byte - start_byte)
+        new_rows = new_text.count("\n")
+        new_end_column = (len(new_text[new_text.rfind("\n") + 1:].encode("utf-8"))
+                          if new_rows else start_column + len(new_bytes))
+
+        self.source = source[:start] + new_text + source[end:]
+        self._bytes = self._bytes[:start_byte] + new_bytes + self._bytes[old_end_byte:]
+        self.tree.edit(
+            start_byte=start_byte, old_end_byte=old_end_byte, new_end_byte=new_end_byte,
+            start_point=(start_row, start_column),
+            old_end_point=(start_row + old_rows, old_end_column),
+            new_end_point=(start_row + new_rows, new_end_column),
+        )
+        old_tree = self.tree
+        self.tree = self.parser.parse(self._bytes, old_tree)
+        self._index = None
+
+        # Byte ranges (in the new text) whose statements must be extracted again: the
+        # edited text itself and wherever the edit changed how the code parses.
+        dirty = [(start_byte, new_end_byte)]
+        dirty.extend((r.start_byte, r.end_byte) for r in old_tree.changed_ranges(self.tree))
+        previous = {(start, end): facts for start, end, _, facts in self._statements}
+        delta = new_end_byte - old_end_byte
+        edit_end_row = start_row + new_rows
+        statements = []
+        for node in self.tree.root_node.children:
+            node_start, node_end = node.start_byte, node.end_byte
+            first_row = node.start_point[0]
+            facts = None
+            if not any(node_start <= end and node_end >= start for start, end in dirty):
+                if node_end < start_byte:
+                    facts = previous.get((node_start, node_end))
+                elif first_row != edit_end_row:
+                    # After the edit: same text, moved by delta bytes. A statement starting
+                    # on the edit's last row also moved sideways, so it is extracted again.
+                    facts = previous.get((node_start - delta, node_end - delta))
+            statements.append((node_start, node_end, first_row, facts or _extract(node)))
+        self._statements = statements
+
+    def update(self, source_code):
+        """Re-parses after the source was replaced wholesale, editing only the part that differs."""
+        old = self.source
+        if source_code == old:
+            return
+        prefix = _common_prefix_length(old, source_code)
+        # The common suffix must not overlap the common prefix in either string.
+        limit = min(len(old), len(source_code)) - prefix
+        suffix = _common_prefix_length(old[::-1][:limit], source_code[::-1][:limit])
+        self.edit(prefix, len(old) - suffix, source_code[prefix:len(source_code) - suffix])
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = _index_from_facts(self.source, self._statements, self.tree.root_node.has_error)
+        return self._index
+
+# Parsers kept per file path by parse_symbols, least recently used first.
+_PARSER_CACHE_SIZE = 16
+_parsers = OrderedDict()
+_parsers_lock = threading.Lock()
+
+def parse_symbols(source_code, path=None):
+    """
+    Error-tolerant counterpart of symbols.build_symbol_index, for code ast cannot parse.
+    With path, an IncrementalParser is kept for that file, so the next version of it
+    (e.g. after the user fixes a typo) only re-parses the region that changed.
+    """
+    if path is None:
+        return IncrementalParser(source_code).index
+    with _parsers_lock:
+        parser = _parsers.get(path)
+        if parser is None:
+            parser = _parsers[path] = IncrementalParser(source_code)
+            while len(_parsers) > _PARSER_CACHE_SIZE:
+                _parsers.popitem(last=False)
+        else:
+            _parsers.move_to_end(path)
+            parser.update(source_code)
+        return parser.index